@@ -21,10 +21,25 @@ JWT_EXPIRE_MINUTES = 60 * 24  # 24 小时
 CSV_PREVIEW_MAX_ROWS = 100
 CSV_PREVIEW_DEFAULT_ROWS = 50
 
+# 分析结果默认时间轴宽度（0 表示全分辨率）
+RESULT_DEFAULT_WIDTH = 256
+
 # 任务管理
 JOB_CLEANUP_AGE_HOURS = 24  # 任务保留时间（小时）
 JOB_POLL_INTERVAL_SECONDS = 2  # 前端轮询间隔建议值
 
+# 试次结果缓存
+TRIAL_CACHE_MAX_MB = 256  # 进程内试次缓存容量（MB）
+
+# Bootstrap 置信区间
+BOOTSTRAP_CHUNK_MB = 64  # 每批重采样中间数组的内存上限（MB）
+
+# 连续曲线导出
+TRACE_EXPORT_CHUNK_ROWS = 100_000  # 导出接口每块输出的样本数
+
+# 置换检验
+PERMUTATION_CHUNK_MB = 64  # 每批置换中间数组的内存上限（MB）
+
 # 数据库连接池
 DB_POOL_SIZE = 10
 DB_MAX_OVERFLOW = 20
@@ -5,7 +5,7 @@ import os
 from pathlib import Path
 from typing import Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
@@ -13,6 +13,9 @@ from app.database import get_db
 from app.dependencies.auth import require_access_token
 from app.models.data_item import DataItem
 from app.schemas.data_item import DataItemCreate, DataItemRead
+from app.services.fluorescence_service import is_fluorescence_file
+from app.utils.channel_store import build_channel_store
+from app.utils.logger import api_logger as logger
 
 router = APIRouter(
     prefix="/files",
@@ -73,8 +76,28 @@ def save_uploaded_file(file: UploadFile, project_id: int, user_id: int, relative
     return str(file_path.relative_to(UPLOAD_DIR))
 
 
+def build_channel_store_in_background(background_tasks: BackgroundTasks, data_item: DataItem) -> None:
+    """
+    Schedule the memory-mappable binary channel store build for a fluorescence file.
+    
+    The build runs after the response is sent (in the threadpool); a failure there
+    must not affect the upload, since analysis falls back to parsing the CSV.
+    """
+    if not is_fluorescence_file(data_item):
+        return
+    
+    def build(file_path: str) -> None:
+        try:
+            build_channel_store(file_path)
+        except Exception as e:
+            logger.warning(f"Failed to build channel store for {file_path}: {e}")
+    
+    background_tasks.add_task(build, str(UPLOAD_DIR / data_item.filePath))
+
+
 @router.post("/upload", response_model=DataItemRead, status_code=201)
 async def upload_file(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     projectId: int = Form(...),
     name: Optional[str] = Form(None),
@@ -117,6 +140,8 @@ async def upload_file(
         db.commit()
         db.refresh(data_item)
         
+        build_channel_store_in_background(background_tasks, data_item)
+        
         return data_item
     
     except Exception as e:
@@ -126,6 +151,7 @@ async def upload_file(
 
 @router.post("/upload-folder", response_model=dict, status_code=201)
 async def upload_folder(
+    background_tasks: BackgroundTasks,
     files: list[UploadFile] = File(...),
     projectId: int = Form(...),
     relativePaths: Optional[str] = Form(None),  # JSON string of relative paths
@@ -238,6 +264,7 @@ async def upload_folder(
             )
             db.add(data_item)
             db.flush()
+            build_channel_store_in_background(background_tasks, data_item)
             
             uploaded_items.append({
                 'dataItemId': data_item.dataItemId,
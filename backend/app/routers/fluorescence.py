@@ -2,10 +2,12 @@
 荧光分析路由
 提供 CSV 预览、分析提交、进度查询、结果获取、行为映射等接口
 """
-from typing import Dict, List
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 
+from app.constants import RESULT_DEFAULT_WIDTH
 from app.database import get_db
 from app.dependencies.auth import require_access_token
 from app.models.data_item import DataItem
@@ -166,11 +168,35 @@ def submit_analysis(
             )
         if not request.events:
             raise HTTPException(status_code=400, detail="Single mode requires at least one event")
+        if request.sweep and (request.metrics or request.cohort or request.bootstrap or request.statistics):
+            raise HTTPException(
+                status_code=400,
+                detail="Window sweep does not support metrics, cohort, bootstrap or statistics"
+            )
     elif request.mode == 'multi':
         if not request.groups:
             raise HTTPException(status_code=400, detail="Multi mode requires groups")
         if len(request.groups) == 0:
             raise HTTPException(status_code=400, detail="Multi mode requires at least one group")
+        if request.algorithmType == 'rolling':
+            raise HTTPException(status_code=400, detail="Multi mode does not support the rolling algorithm")
+    elif request.mode == 'continuous':
+        if request.bleachCorrection or request.filter:
+            raise HTTPException(
+                status_code=400,
+                detail="Continuous mode does not support bleachCorrection or filter"
+            )
+        if (request.statistics or request.cohort or request.metrics or request.bootstrap
+                or request.sweep or request.streaming):
+            raise HTTPException(
+                status_code=400,
+                detail="Continuous mode does not support statistics, cohort, metrics, bootstrap, sweep or streaming"
+            )
+        if request.algorithmType == 'warping':
+            raise HTTPException(status_code=400, detail="Continuous mode does not support the warping algorithm")
+        # 连续曲线的掩码固定以 NaN 填充（保留时间基准）
+        if 'maskMode' in request.model_fields_set and request.maskMode == 'remove':
+            raise HTTPException(status_code=400, detail="Continuous mode only supports maskMode 'nan'")
     
     # 验证数据选择
     if not request.selection.dataItemIds and not request.selection.tagFilter:
@@ -179,8 +205,10 @@ def submit_analysis(
     if request.selection.dataItemIds and len(request.selection.dataItemIds) == 0:
         raise HTTPException(status_code=400, detail="dataItemIds cannot be empty")
     
-    # 验证列映射
-    if not request.columnMap.behavior or not request.columnMap.start:
+    # 验证列映射（连续曲线模式不读取打标文件）
+    if request.mode != 'continuous' and (
+        not request.columnMap or not request.columnMap.behavior or not request.columnMap.start
+    ):
         raise HTTPException(status_code=400, detail="columnMap must include behavior and start fields")
     
     # 创建任务
@@ -271,6 +299,7 @@ def get_job_status(
 def get_job_results(
     project_id: int,
     job_id: str,
+    width: int = Query(RESULT_DEFAULT_WIDTH, ge=0, description="时间轴宽度上限（默认降采样视图），0 返回全分辨率"),
     db: Session = Depends(get_db),
     current_user: dict = Depends(require_access_token)
 ):
@@ -280,9 +309,10 @@ def get_job_results(
     Args:
         project_id: 项目 ID
         job_id: 任务 ID
+        width: 时间轴宽度上限（默认 RESULT_DEFAULT_WIDTH，返回不超过该宽度的降采样视图；显式传 0 返回全分辨率）
     
     Returns:
-        ResultResponse: 分析结果
+        ResultResponse: 分析结果（服务端已序列化的 JSON，直接返回）
     
     Raises:
         404: 任务不存在或结果未生成
@@ -306,11 +336,129 @@ def get_job_results(
         )
     
     # 获取结果
-    result = fluorescence_service.get_job_result(project_id, job_id)
+    result = fluorescence_service.get_job_result(project_id, job_id, width=width)
     if not result:
         raise HTTPException(status_code=404, detail="Job result not found")
     
-    return result
+    return Response(content=result, media_type="application/json")
+
+
+@router.get("/projects/{project_id}/jobs/{job_id}/results/artifact")
+def get_job_result_artifact(
+    project_id: int,
+    job_id: str,
+    part: str = Query("data", pattern="^(data|manifest)$", description="data 返回 result.npz，manifest 返回 manifest.json"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_access_token)
+):
+    """
+    获取任务结果的二进制存储
+    
+    Args:
+        project_id: 项目 ID
+        job_id: 任务 ID
+        part: data（npz 数组）或 manifest（JSON 清单，描述 key、trialIds 与数组名称）
+    
+    Returns:
+        FileResponse: result.npz 或 manifest.json
+    
+    Raises:
+        404: 任务不存在或没有二进制结果
+        400: 任务尚未完成
+    """
+    # 验证项目访问权限
+    verify_project_access(project_id, db, current_user)
+    
+    # 检查任务状态
+    status = fluorescence_service.get_job_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if status.projectId != project_id:
+        raise HTTPException(status_code=403, detail="Job does not belong to this project")
+    
+    if status.status != "succeeded":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job has not completed successfully. Current status: {status.status}"
+        )
+    
+    artifact_file = fluorescence_service.get_result_artifact_file(project_id, job_id, part=part)
+    if not artifact_file:
+        raise HTTPException(status_code=404, detail="Job result artifact not found")
+    
+    return FileResponse(
+        path=str(artifact_file),
+        filename=artifact_file.name,
+        media_type="application/json" if part == "manifest" else "application/octet-stream",
+    )
+
+
+@router.get("/projects/{project_id}/jobs/{job_id}/results/traces/{data_item_id}")
+def export_job_trace(
+    project_id: int,
+    job_id: str,
+    data_item_id: int,
+    format: str = Query("binary", pattern="^(binary|csv)$", description="binary 原始数组，csv 带时间列的文本"),
+    start: float = Query(0.0, ge=0, description="起始时间（秒）"),
+    end: Optional[float] = Query(None, ge=0, description="结束时间（秒），默认记录末尾"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(require_access_token)
+):
+    """
+    分块流式导出连续 ΔF/F 曲线（continuous 模式）
+    
+    Args:
+        project_id: 项目 ID
+        job_id: 任务 ID
+        data_item_id: 荧光数据项 ID
+        format: binary（shape (样本数, 通道数) 的小端数组，按样本行优先）或 csv
+        start: 起始时间（秒）
+        end: 结束时间（秒）
+    
+    Returns:
+        StreamingResponse: 曲线数据；binary 时通过 X-Trace-* 响应头给出通道、类型与样本范围
+    
+    Raises:
+        404: 任务或曲线不存在
+        400: 任务尚未完成
+    """
+    # 验证项目访问权限
+    verify_project_access(project_id, db, current_user)
+    
+    # 检查任务状态
+    status = fluorescence_service.get_job_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if status.projectId != project_id:
+        raise HTTPException(status_code=403, detail="Job does not belong to this project")
+    
+    if status.status != "succeeded":
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job has not completed successfully. Current status: {status.status}"
+        )
+    
+    export = fluorescence_service.iter_trace_export(project_id, job_id, data_item_id, format, start, end)
+    if not export:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    
+    info, first, last, chunks = export
+    extension = "csv" if format == "csv" else "bin"
+    headers = {
+        "Content-Disposition": f'attachment; filename="trace_{data_item_id}.{extension}"',
+        "X-Trace-Channels": ",".join(info.channels),
+        "X-Trace-Dtype": info.dtype,
+        "X-Trace-Fps": str(info.fps),
+        "X-Trace-Start": str(first),
+        "X-Trace-Samples": str(last - first),
+    }
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv" if format == "csv" else "application/octet-stream",
+        headers=headers,
+    )
 
 
 @router.post("/projects/{project_id}/label-map", response_model=LabelMapResponse)
@@ -3,7 +3,7 @@
 定义所有请求和响应的数据结构
 """
 from typing import List, Dict, Optional, Any, Union
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 # ==================== 通用模型 ====================
@@ -32,6 +32,89 @@ class EventGroup(BaseModel):
     events: List[str] = Field(..., description="事件标签列表")
 
 
+class WindowPair(BaseModel):
+    """基线窗口与响应窗口组合"""
+    baselineWindow: TimeWindow = Field(..., description="基线窗口")
+    responseWindow: TimeWindow = Field(..., description="响应窗口")
+
+
+class WindowSweep(BaseModel):
+    """窗口参数扫描（single 模式）"""
+    windows: List[WindowPair] = Field(..., min_length=1, description="待评估的窗口组合列表")
+    fullResults: List[int] = Field(default_factory=list, description="返回完整矩阵与曲线的窗口下标")
+
+
+class MetricWindow(TimeWindow):
+    """响应指标子窗口"""
+    name: str = Field(..., description="窗口名称")
+
+
+class MetricsOptions(BaseModel):
+    """响应指标选项（single 模式）"""
+    windows: List[MetricWindow] = Field(default_factory=list, description="额外的子窗口；响应窗口始终以 'response' 计算")
+
+
+class ContinuousOptions(BaseModel):
+    """连续 ΔF/F 曲线选项（continuous 模式）"""
+    normalization: str = Field("global", pattern="^(global|rolling)$", description="基线：global 整段记录，rolling 此前 windowSeconds 秒")
+    windowSeconds: Optional[float] = Field(None, gt=0, description="滑动基线窗口（秒，rolling 必填）")
+    
+    @model_validator(mode='after')
+    def validate_window(self):
+        if self.normalization == 'rolling' and self.windowSeconds is None:
+            raise ValueError("rolling normalization requires windowSeconds")
+        return self
+
+
+class RollingOptions(BaseModel):
+    """滑动基线选项（algorithmType 为 rolling 时使用）"""
+    windowSeconds: float = Field(..., gt=0, description="基线窗口（秒）：每个样本以此前 windowSeconds 秒内的信号为基线")
+    method: str = Field("mean", pattern="^(mean|percentile)$", description="基线：mean 滑动均值，percentile 滑动分位数（均除以滑动标准差）")
+    percentile: float = Field(10.0, gt=0, lt=100, description="基线分位数（仅 percentile）")
+
+
+class FilterOptions(BaseModel):
+    """零相位 Butterworth 滤波选项"""
+    type: str = Field(..., pattern="^(lowpass|bandpass)$", description="滤波类型：lowpass 或 bandpass")
+    highHz: float = Field(..., gt=0, description="上截止频率（Hz），须低于各记录原始采样率的一半（滤波在重采样之前进行）")
+    lowHz: Optional[float] = Field(None, gt=0, description="下截止频率（Hz，仅 bandpass）")
+    order: int = Field(4, ge=1, le=10, description="滤波器阶数")
+    
+    @model_validator(mode='after')
+    def validate_band(self):
+        if self.type == 'bandpass' and (self.lowHz is None or self.lowHz >= self.highHz):
+            raise ValueError("bandpass filter requires lowHz < highHz")
+        return self
+
+
+class BootstrapOptions(BaseModel):
+    """均值曲线 bootstrap 置信区间选项"""
+    iterations: int = Field(1000, ge=10, le=100000, description="重采样次数")
+    confidence: float = Field(0.95, gt=0, lt=1, description="置信水平")
+    seed: Optional[int] = Field(None, ge=0, description="随机种子（相同种子结果可复现）")
+
+
+class ConditionPair(BaseModel):
+    """待比较的两个条件（single 模式为事件标签，multi 模式为分组名）"""
+    conditionA: str = Field(..., description="条件 A")
+    conditionB: str = Field(..., description="条件 B")
+
+
+class StatisticsOptions(BaseModel):
+    """条件间置换检验选项"""
+    comparisons: List[ConditionPair] = Field(..., min_length=1, description="比较列表")
+    permutations: int = Field(1000, ge=100, le=100000, description="置换次数")
+    clusterAlpha: float = Field(0.05, gt=0, lt=1, description="簇形成阈值（逐点 t 检验的双侧显著性水平）")
+    alpha: float = Field(0.05, gt=0, lt=1, description="簇显著性水平")
+    seed: Optional[int] = Field(None, ge=0, description="随机种子（相同种子结果可复现）")
+
+
+class CohortOptions(BaseModel):
+    """队列聚合选项（single 模式）"""
+    weighting: str = Field("trial", pattern="^(trial|animal)$", description="加权方式：trial 合并所有试次，animal 先按动物平均再等权平均")
+    groupBy: str = Field("none", pattern="^(none|subject|tag)$", description="分组方式：none 全部数据集，subject 按受试者，tag 按标签")
+
+
 class ColumnMap(BaseModel):
     """CSV 列映射"""
     behavior: str = Field(..., description="行为列名")
@@ -93,9 +176,14 @@ class PreviewResponse(BaseModel):
 class AnalyzeRequest(BaseModel):
     """荧光分析请求"""
     selection: DataSelection = Field(..., description="数据选择")
-    fps: float = Field(50.0, gt=0, description="采样率（帧/秒）")
-    mode: str = Field(..., pattern="^(single|multi)$", description="分析模式：single 或 multi")
-    algorithmType: str = Field("zscore", pattern="^(zscore|warping)$", description="算法类型：zscore 或 warping")
+    fps: float = Field(50.0, gt=0, description="分析采样率（帧/秒）；原始采样率不同的记录在加载时重采样到此采样率")
+    datasetFps: Dict[str, float] = Field(default_factory=dict, description="各数据集的原始采样率（key 为 dataItemId），优先于同名 JSON 旁注文件中的 fps；未提供时视为 fps")
+    mode: str = Field(..., pattern="^(single|multi|continuous)$", description="分析模式：single、multi 或 continuous（整段连续 ΔF/F 曲线）")
+    algorithmType: str = Field("zscore", pattern="^(zscore|warping|rolling)$", description="算法类型：zscore、warping 或 rolling（整段通道滑动基线归一化，single / continuous 模式）")
+    rolling: Optional[RollingOptions] = Field(None, validate_default=True, description="滑动基线选项（algorithmType 为 rolling 时必填；continuous 模式下替代 continuous 选项中的基线）")
+    precision: str = Field("float64", pattern="^(float64|float32)$", description="计算精度：float64（默认）或 float32（内存与带宽减半，结果按 float32 精度存储与序列化）")
+    bleachCorrection: Optional[str] = Field(None, pattern="^(biexp|poly)$", description="光漂白校正：biexp 双指数或 poly 多项式拟合整段记录并去除趋势（结果按文件缓存）")
+    filter: Optional[FilterOptions] = Field(None, description="零相位滤波（在光漂白校正之后、掩码之前；结果按文件与滤波参数缓存）")
     
     # 单事件模式
     events: Optional[List[Event]] = Field(None, description="事件列表（single 模式）")
@@ -105,16 +193,56 @@ class AnalyzeRequest(BaseModel):
     # 多事件模式
     groups: Optional[List[EventGroup]] = Field(None, description="事件组列表（multi 模式）")
     
+    # 连续曲线模式
+    continuous: ContinuousOptions = Field(default_factory=ContinuousOptions, description="连续曲线选项（continuous 模式）")
+    
     # 可选参数
     offsetWindow: Optional[TimeWindow] = Field(None, description="实验前偏移窗口")
     outputs: OutputOptions = Field(default_factory=OutputOptions, description="输出选项")
     
     # 列映射与标签映射
-    columnMap: ColumnMap = Field(..., description="CSV 列名映射")
+    columnMap: Optional[ColumnMap] = Field(None, validate_default=True, description="CSV 列名映射（single / multi 模式必填）")
     labelMapping: Dict[str, str] = Field(default_factory=dict, description="原始标签到显示名称的映射")
     
     # 掩码（key 格式："{dataItemId}:{channel}"）
     masks: Dict[str, List[MaskRange]] = Field(default_factory=dict, description="时间掩码")
+    maskMode: str = Field("remove", pattern="^(remove|nan)$", description="掩码方式：remove 删除样本，nan 以 NaN 填充保留时间基准（continuous 模式固定为 nan）")
+    
+    # 并行执行
+    parallel: bool = Field(False, description="是否将数据集 × 通道 × 事件分发到多进程并行计算")
+    maxWorkers: Optional[int] = Field(None, ge=1, description="并行工作进程数（默认 CPU 核数）")
+    streaming: bool = Field(False, description="流式分析：按块读取荧光文件，仅保留事件窗口（仅 single 模式）")
+    trialCache: bool = Field(True, description="复用此前任务中参数相同的试次结果（仅 single 模式非并行计算）")
+    
+    # Bootstrap 置信区间
+    bootstrap: Optional[BootstrapOptions] = Field(None, description="按试次重采样计算均值曲线的置信区间")
+    
+    # 置换检验
+    statistics: Optional[StatisticsOptions] = Field(None, description="条件间逐时间点置换检验与显著簇")
+    
+    # 响应指标
+    metrics: Optional[MetricsOptions] = Field(None, description="逐试次峰值、峰值时间、AUC 与窗口均值（仅 single 模式）")
+    
+    # 队列聚合
+    cohort: Optional[CohortOptions] = Field(None, description="跨数据集的队列均值/SEM 曲线（仅 single 模式）")
+    
+    # 窗口参数扫描
+    sweep: Optional[WindowSweep] = Field(None, description="窗口参数扫描，一个任务内评估多组窗口（仅 single 模式）")
+    
+    @field_validator('datasetFps')
+    @classmethod
+    def check_dataset_fps(cls, v):
+        for key, fps in v.items():
+            if fps <= 0:
+                raise ValueError(f"datasetFps[{key}] must be positive")
+        return v
+    
+    @field_validator('rolling')
+    @classmethod
+    def check_rolling(cls, v, info):
+        if info.data.get('algorithmType') == 'rolling' and v is None:
+            raise ValueError("rolling is required for rolling algorithm")
+        return v
     
     @field_validator('events', 'baselineWindow', 'responseWindow')
     @classmethod
@@ -131,6 +259,14 @@ class AnalyzeRequest(BaseModel):
         if values.get('mode') == 'multi' and v is None:
             raise ValueError("groups is required for multi mode")
         return v
+    
+    @field_validator('columnMap')
+    @classmethod
+    def check_column_map(cls, v, info):
+        values = info.data
+        if values.get('mode') in ('single', 'multi') and v is None:
+            raise ValueError("columnMap is required for single and multi mode")
+        return v
 
 
 class JobCreateResponse(BaseModel):
@@ -150,6 +286,7 @@ class JobStatusResponse(BaseModel):
     progress: int = Field(..., ge=0, le=100, description="进度百分比")
     message: str = Field(..., description="当前状态描述")
     error: Optional[str] = Field(None, description="错误信息（如果失败）")
+    metadata: Dict[str, Any] = Field(default_factory=dict, description="任务附加信息，如 trialCache 命中/未命中次数")
     createdAt: str = Field(..., description="创建时间（ISO 格式）")
     updatedAt: str = Field(..., description="更新时间（ISO 格式）")
 
@@ -159,7 +296,7 @@ class JobStatusResponse(BaseModel):
 class MatrixResult(BaseModel):
     """热力图矩阵结果"""
     key: str = Field(..., description="标识，如 'CH1/w' 表示通道1的事件w")
-    heatmap: List[List[float]] = Field(..., description="热力图数据矩阵")
+    heatmap: List[List[Optional[float]]] = Field(..., description="热力图数据矩阵")
     xAxis: List[float] = Field(..., description="X轴时间点")
     trialIds: List[str] = Field(..., description="试次标识列表")
 
@@ -167,9 +304,99 @@ class MatrixResult(BaseModel):
 class CurveResult(BaseModel):
     """均值曲线结果"""
     key: str = Field(..., description="标识")
-    mean: List[float] = Field(..., description="均值曲线")
-    sem: Optional[List[float]] = Field(None, description="标准误差曲线")
+    mean: List[Optional[float]] = Field(..., description="均值曲线")
+    sem: Optional[List[Optional[float]]] = Field(None, description="标准误差曲线")
+    ciLower: Optional[List[Optional[float]]] = Field(None, description="bootstrap 置信区间下界")
+    ciUpper: Optional[List[Optional[float]]] = Field(None, description="bootstrap 置信区间上界")
+    xAxis: List[float] = Field(..., description="X轴时间点")
+
+
+class SweepSummary(BaseModel):
+    """窗口扫描摘要"""
+    windowIndex: int = Field(..., description="窗口组合下标")
+    key: str = Field(..., description="标识，如 'CH1/w'")
+    baselineWindow: TimeWindow
+    responseWindow: TimeWindow
+    nTrials: int = Field(..., description="有效试次数")
+    mean: List[Optional[float]] = Field(..., description="均值曲线")
     xAxis: List[float] = Field(..., description="X轴时间点")
+    peak: Optional[float] = Field(None, description="响应窗口内均值曲线峰值")
+    peakTime: Optional[float] = Field(None, description="峰值时间（秒）")
+    auc: Optional[float] = Field(None, description="响应窗口内曲线下面积")
+
+
+class CohortCurve(BaseModel):
+    """队列聚合曲线"""
+    key: str = Field(..., description="标识，如 'all/CH1/w'、'subject:3/CH1/w'")
+    group: str = Field(..., description="分组名：all、subject:{id}（无受试者时为 dataset:{数据项 ID}）或 tag:{id}")
+    channel: str = Field(..., description="通道名")
+    label: str = Field(..., description="事件标签")
+    weighting: str = Field(..., description="加权方式：trial 或 animal")
+    nTrials: int = Field(..., description="参与聚合的试次数")
+    nAnimals: int = Field(..., description="参与聚合的动物数")
+    nDatasets: int = Field(..., description="参与聚合的数据集数")
+    mean: List[Optional[float]] = Field(..., description="均值曲线")
+    sem: List[Optional[float]] = Field(..., description="标准误差曲线")
+    xAxis: List[float] = Field(..., description="X轴时间点")
+
+
+class WindowMetrics(BaseModel):
+    """单个窗口内的逐试次指标（与 trialIds 一一对应）"""
+    name: str = Field(..., description="窗口名称")
+    start: float = Field(..., description="窗口起始（秒）")
+    end: float = Field(..., description="窗口结束（秒）")
+    peak: List[Optional[float]] = Field(..., description="峰值")
+    peakTime: List[Optional[float]] = Field(..., description="峰值时间（秒）")
+    auc: List[Optional[float]] = Field(..., description="曲线下面积")
+    mean: List[Optional[float]] = Field(..., description="窗口均值")
+
+
+class MetricsTable(BaseModel):
+    """单个 (通道, 事件) 的响应指标表"""
+    key: str = Field(..., description="标识，如 'CH1/w'")
+    trialIds: List[str] = Field(..., description="试次标识列表")
+    windows: List[WindowMetrics] = Field(default_factory=list, description="各窗口指标")
+
+
+class ClusterResult(BaseModel):
+    """置换检验中的簇"""
+    startIndex: int = Field(..., description="起始下标")
+    endIndex: int = Field(..., description="结束下标（含）")
+    start: float = Field(..., description="起始时间（秒）")
+    end: float = Field(..., description="结束时间（秒）")
+    sign: int = Field(..., description="方向：1 为 A > B，-1 为 A < B")
+    mass: float = Field(..., description="簇质量（|t| 之和）")
+    pValue: float = Field(..., description="簇水平 p 值（最大簇质量零分布）")
+    significant: bool = Field(..., description="是否显著")
+
+
+class ComparisonResult(BaseModel):
+    """单个通道上两个条件的置换检验结果"""
+    key: str = Field(..., description="标识，如 'CH1/a-vs-b'")
+    channel: str = Field(..., description="通道名")
+    conditionA: str = Field(..., description="条件 A")
+    conditionB: str = Field(..., description="条件 B")
+    nA: int = Field(..., description="条件 A 试次数")
+    nB: int = Field(..., description="条件 B 试次数")
+    nPermutations: int = Field(..., description="置换次数")
+    threshold: float = Field(..., description="簇形成 t 阈值")
+    tValues: List[Optional[float]] = Field(..., description="逐时间点 Welch t 值")
+    pValues: List[Optional[float]] = Field(..., description="逐时间点置换 p 值（未校正）")
+    xAxis: List[float] = Field(..., description="X轴时间点")
+    clusters: List[ClusterResult] = Field(default_factory=list, description="簇列表")
+
+
+class TraceInfo(BaseModel):
+    """单个数据集的连续 ΔF/F 曲线（数据通过导出接口分块获取）"""
+    dataItemId: int = Field(..., description="荧光数据项 ID")
+    channels: List[str] = Field(..., description="通道名（导出列顺序）")
+    nSamples: int = Field(..., description="样本数")
+    fps: float = Field(..., description="采样率")
+    dtype: str = Field(..., description="二进制导出的数值类型（小端、按样本行优先）")
+    normalization: str = Field(..., description="基线：global 或 rolling")
+    windowSeconds: Optional[float] = Field(None, description="滑动基线窗口（秒）")
+    method: Optional[str] = Field(None, description="滑动基线：mean 或 percentile")
+    percentile: Optional[float] = Field(None, description="滑动基线分位数（仅 percentile）")
 
 
 class ResultMeta(BaseModel):
@@ -183,11 +410,17 @@ class ResultMeta(BaseModel):
 
 
 class ResultResponse(BaseModel):
-    """分析结果响应"""
+    """分析结果响应（数值数组中的非有限值 NaN、±inf 序列化为 null）"""
     jobId: str
     meta: ResultMeta = Field(..., description="元信息")
     matrices: List[MatrixResult] = Field(default_factory=list, description="热力图矩阵列表")
     curves: List[CurveResult] = Field(default_factory=list, description="均值曲线列表")
+    sweep: List[SweepSummary] = Field(default_factory=list, description="窗口扫描摘要（仅 sweep 模式）")
+    cohort: List[CohortCurve] = Field(default_factory=list, description="队列聚合曲线")
+    metrics: List[MetricsTable] = Field(default_factory=list, description="逐试次响应指标表")
+    statistics: List[ComparisonResult] = Field(default_factory=list, description="条件间置换检验结果")
+    traces: List[TraceInfo] = Field(default_factory=list, description="连续 ΔF/F 曲线（仅 continuous 模式）")
+    lodFactor: int = Field(1, ge=1, description="时间轴降采样因子（1 为全分辨率）")
     assets: Dict[str, str] = Field(default_factory=dict, description="可选的导出文件 URL")
 
 
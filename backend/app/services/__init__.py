@@ -1,12 +1,9 @@
-from . import (
-	auth_service,
-	data_item_service,
-	log_entry_service,
-	project_service,
-	subject_service,
-	tag_service,
-	user_service,
-)
+"""
+服务层
+子模块按需导入：算法子包（app.services.algorithms）可在不初始化数据库连接的情况下单独导入，
+供 forkserver/spawn 启动的进程池工作进程使用
+"""
+import importlib
 
 __all__ = [
 	"auth_service",
@@ -17,3 +14,9 @@ __all__ = [
 	"tag_service",
 	"user_service",
 ]
+
+
+def __getattr__(name):
+	if name in __all__:
+		return importlib.import_module(f".{name}", __name__)
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,107 @@
+"""
+试次自助法（bootstrap）置信区间
+- 每批重采样生成 (batch, n_trials) 的计数矩阵，与试次矩阵相乘一次得到该批全部重采样均值
+- 沿时间轴分块，逐块求分位数；块宽与批大小按内存上限（含索引、计数与分位数的临时数组）自动确定
+- 每条曲线的随机数流由 (seed, key) 派生，结果与计算顺序、并行方式无关
+"""
+import zlib
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.constants import BOOTSTRAP_CHUNK_MB
+
+
+def curve_rng(seed: Optional[int], key: str) -> np.random.Generator:
+    """
+    按 (seed, 曲线 key) 派生随机数生成器；seed 为 None 时不可复现
+    """
+    if seed is None:
+        return np.random.default_rng()
+    return np.random.default_rng([seed, zlib.crc32(key.encode('utf-8'))])
+
+
+def _block_width(n_trials: int, n_samples: int, n_resamples: int, itemsize: int, chunk_bytes: int) -> int:
+    # 每个时间点占用：均值块一列 + np.quantile 的分区副本一列 + 试次块一列，至多使用一半内存上限
+    per_sample = (2 * n_resamples + n_trials) * itemsize
+    return min(n_samples, max(1, chunk_bytes // 2 // max(per_sample, 1)))
+
+
+def _batch_size(n_trials: int, itemsize: int, chunk_bytes: int) -> int:
+    # 每个重采样占用：int64 索引矩阵、展平索引与 bincount 结果各一行 + 转换精度后的计数矩阵一行
+    per_resample = n_trials * (3 * np.dtype(np.int64).itemsize + itemsize)
+    return max(1, chunk_bytes // max(per_resample, 1))
+
+
+def iter_bootstrap_means(
+    df_f: np.ndarray,
+    n_resamples: int,
+    rng: np.random.Generator,
+    chunk_bytes: int = BOOTSTRAP_CHUNK_MB * 1024 * 1024
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    对试次有放回重采样，按时间块输出每次重采样的均值曲线
+
+    每个时间块从相同的随机数状态重新生成计数矩阵，各块使用同一组重采样；
+    结果与内存上限（块宽、批大小）无关
+
+    Args:
+        df_f: shape (n_trials, n_samples)
+        n_resamples: 重采样次数
+        rng: 随机数生成器
+        chunk_bytes: 中间数组（均值块、分位数副本、索引与计数矩阵）的内存上限
+
+    Yields:
+        (start, stop, 均值块)，均值块 shape (n_resamples, stop - start)
+    """
+    n_trials, n_samples = df_f.shape
+    itemsize = df_f.dtype.itemsize
+    width = _block_width(n_trials, n_samples, n_resamples, itemsize, chunk_bytes)
+    batch = _batch_size(n_trials, itemsize, chunk_bytes - chunk_bytes // 2)
+    state = rng.bit_generator.state
+
+    for t_start in range(0, n_samples, width):
+        t_stop = min(t_start + width, n_samples)
+        block = np.ascontiguousarray(df_f[:, t_start:t_stop])
+        means = np.empty((n_resamples, t_stop - t_start), dtype=df_f.dtype)
+        rng.bit_generator.state = state
+
+        for start in range(0, n_resamples, batch):
+            stop = min(start + batch, n_resamples)
+            size = stop - start
+            # 索引矩阵 → 计数矩阵：counts[b, i] 为第 b 次重采样中试次 i 被抽中的次数
+            indices = rng.integers(0, n_trials, size=(size, n_trials))
+            flat = (indices + (np.arange(size) * n_trials)[:, None]).ravel()
+            del indices
+            counts = np.bincount(flat, minlength=size * n_trials).reshape(size, n_trials)
+            del flat
+            np.matmul(counts.astype(df_f.dtype), block, out=means[start:stop])
+
+        means /= n_trials
+        yield t_start, t_stop, means
+
+
+def bootstrap_ci(
+    df_f: np.ndarray,
+    n_resamples: int,
+    confidence: float,
+    rng: np.random.Generator,
+    chunk_bytes: int = BOOTSTRAP_CHUNK_MB * 1024 * 1024
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    均值曲线的百分位 bootstrap 置信区间
+
+    Returns:
+        (lower, upper)，各为 shape (n_samples,)；试次少于 2 个时上下界均为均值
+    """
+    if len(df_f) < 2:
+        mean_curve = np.mean(df_f, axis=0)
+        return mean_curve, mean_curve.copy()
+
+    alpha = (1.0 - confidence) / 2
+    lower = np.empty(df_f.shape[1], dtype=df_f.dtype)
+    upper = np.empty(df_f.shape[1], dtype=df_f.dtype)
+    # 逐时间块求分位数，不保存完整的 (n_resamples, n_samples) 均值矩阵
+    for start, stop, means in iter_bootstrap_means(df_f, n_resamples, rng, chunk_bytes):
+        lower[start:stop], upper[start:stop] = np.quantile(means, [alpha, 1.0 - alpha], axis=0)
+    return lower, upper
@@ -0,0 +1,173 @@
+"""
+队列（cohort）聚合
+在序列化之前，用每个 (数据集, 通道, 事件) 的试次累加量计算跨数据集的均值/SEM 曲线：
+- trial 加权：所有试次合并后求均值与标准误
+- animal 加权：先在每只动物（受试者；无受试者时为数据集）内平均，再对动物均值等权平均
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.utils.logger import algo_logger as logger
+
+
+@dataclass
+class TrialSummary:
+    """单个 (数据集, 通道, 事件) 的试次累加量"""
+    dataset_idx: int
+    channel: str
+    label: str
+    n_trials: int
+    total: np.ndarray      # 各时间点试次和
+    total_sq: np.ndarray   # 各时间点试次平方和
+    time_axis: np.ndarray
+
+    @classmethod
+    def from_trials(
+        cls,
+        dataset_idx: int,
+        channel: str,
+        label: str,
+        df_f: np.ndarray,
+        time_axis: np.ndarray
+    ) -> 'TrialSummary':
+        values = np.asarray(df_f, dtype=np.float64)
+        return cls(
+            dataset_idx=dataset_idx,
+            channel=channel,
+            label=label,
+            n_trials=len(values),
+            total=values.sum(axis=0),
+            total_sq=np.einsum('ij,ij->j', values, values),
+            time_axis=np.asarray(time_axis, dtype=np.float64)
+        )
+
+
+def _animal_id(dataset: Any) -> str:
+    metadata = dataset.metadata or {}
+    subject_id = metadata.get('subjectId')
+    return f"subject:{subject_id}" if subject_id is not None else f"dataset:{dataset.data_item_id}"
+
+
+def dataset_groups(datasets: List[Any], group_by: str = 'none') -> Dict[str, List[int]]:
+    """
+    按受试者或标签对数据集分组
+
+    Args:
+        group_by: 'none' 全部数据集为一组；'subject' 按受试者（无受试者的数据集单独成组，
+            与 animal 加权的动物划分一致）；'tag' 按标签（一个数据集可属于多组）
+
+    Returns:
+        {组名: [数据集下标, ...]}，按首次出现顺序
+    """
+    groups: Dict[str, List[int]] = {}
+    for dataset_idx, dataset in enumerate(datasets):
+        metadata = dataset.metadata or {}
+        if group_by == 'subject':
+            names = [_animal_id(dataset)]
+        elif group_by == 'tag':
+            names = [f"tag:{tag_id}" for tag_id in (metadata.get('tagIds') or [])]
+        else:
+            names = ['all']
+        for name in names:
+            groups.setdefault(name, []).append(dataset_idx)
+    return groups
+
+
+def _combine(summaries: List[TrialSummary], animals: List[str], weighting: str):
+    """
+    合并同一 (组, 通道, 事件) 的试次累加量
+
+    Returns:
+        (mean, sem, n_animals)
+    """
+    n_total = sum(summary.n_trials for summary in summaries)
+
+    if weighting == 'animal':
+        animal_totals: Dict[str, List[Any]] = {}
+        for summary, animal in zip(summaries, animals):
+            entry = animal_totals.setdefault(animal, [0, 0.0])
+            entry[0] += summary.n_trials
+            entry[1] = entry[1] + summary.total
+        animal_means = np.stack([total / n for n, total in animal_totals.values()])
+        mean = animal_means.mean(axis=0)
+        n_animals = len(animal_means)
+        sem = animal_means.std(axis=0) / np.sqrt(n_animals) if n_animals > 1 else np.zeros_like(mean)
+        return mean, sem, n_animals
+
+    total = np.sum([summary.total for summary in summaries], axis=0)
+    total_sq = np.sum([summary.total_sq for summary in summaries], axis=0)
+    mean = total / n_total
+    std = np.sqrt(np.maximum(total_sq / n_total - mean * mean, 0.0))
+    sem = std / np.sqrt(n_total) if n_total > 1 else np.zeros_like(mean)
+    return mean, sem, len(set(animals))
+
+
+def aggregate_cohort(
+    summaries: List[TrialSummary],
+    datasets: List[Any],
+    weighting: str = 'trial',
+    group_by: str = 'none',
+    labels: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    计算各组、各 (通道, 事件) 的队列均值/SEM 曲线
+
+    Args:
+        summaries: 每个 (数据集, 通道, 事件) 的试次累加量
+        datasets: 数据集列表（用于受试者与标签）
+        weighting: 'trial' 或 'animal'
+        group_by: 'none'、'subject' 或 'tag'
+        labels: 输出的事件顺序（默认按出现顺序）
+
+    Returns:
+        队列曲线列表
+    """
+    groups = dataset_groups(datasets, group_by)
+    animals = [_animal_id(dataset) for dataset in datasets]
+
+    channels = list(dict.fromkeys(summary.channel for summary in summaries))
+    label_order = labels or list(dict.fromkeys(summary.label for summary in summaries))
+
+    cohort = []
+    for group_name, members in groups.items():
+        member_set = set(members)
+        for channel in channels:
+            for label in label_order:
+                selected = [
+                    summary for summary in summaries
+                    if summary.dataset_idx in member_set and summary.channel == channel
+                    and summary.label == label and summary.n_trials > 0
+                ]
+                if not selected:
+                    continue
+
+                # 时间轴不一致（如采样率不同）的数据集无法逐点合并
+                time_axis = selected[0].time_axis
+                aligned = [summary for summary in selected if np.array_equal(summary.time_axis, time_axis)]
+                if len(aligned) < len(selected):
+                    logger.warning(
+                        f"Skipping {len(selected) - len(aligned)} dataset(s) with mismatched time axis "
+                        f"in cohort {group_name}/{channel}/{label}"
+                    )
+
+                mean, sem, n_animals = _combine(
+                    aligned, [animals[summary.dataset_idx] for summary in aligned], weighting
+                )
+                cohort.append({
+                    'key': f"{group_name}/{channel}/{label}",
+                    'group': group_name,
+                    'channel': channel,
+                    'label': label,
+                    'weighting': weighting,
+                    'nTrials': int(sum(summary.n_trials for summary in aligned)),
+                    'nAnimals': n_animals,
+                    'nDatasets': len(aligned),
+                    'mean': mean.tolist(),
+                    'sem': sem.tolist(),
+                    'xAxis': time_axis.tolist()
+                })
+
+    logger.info(f"Aggregated {len(cohort)} cohort curve(s) ({weighting} weighting, group by {group_by})")
+    return cohort
@@ -0,0 +1,163 @@
+"""
+整段记录的连续 ΔF/F 曲线（continuous 模式）
+与 z-score 算法一致：F = 470 - k·410，再以基线均值/标准差归一化
+- k 由整段记录（有限样本）回归得到
+- global：基线为整段记录的 F（均值/方差由回归累加量直接推出，无需额外遍历）
+- rolling：基线为此前 window 秒内的 F（滑动均值或分位数，见 rolling.py；跨块携带窗口尾部）
+按块读取荧光文件，共两遍（累加、输出），内存与记录长度无关；掩码样本输出 NaN（保留时间基准）
+"""
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.logger import algo_logger as logger
+from app.utils.channel_store import iter_channel_chunks
+from app.services.algorithms.fluorescence_algo import merge_mask_intervals, pair_channel_columns
+from app.services.algorithms.rolling import RollingBaseline, rolling_normalize
+from app.services.algorithms.streaming import DEFAULT_CHUNK_ROWS, chunk_intervals
+
+
+@dataclass
+class TraceMoments:
+    """各通道整段记录的回归累加量（减去平移量后累加，降低舍入误差）"""
+    shift_410: np.ndarray
+    shift_470: np.ndarray
+    n: np.ndarray
+    s_410: np.ndarray
+    s_470: np.ndarray
+    s_410_410: np.ndarray
+    s_410_470: np.ndarray
+    s_470_470: np.ndarray
+
+    def slope(self) -> np.ndarray:
+        """
+        470 对 410 的回归斜率 k（样本不足或 410 方差为 0 时为 1）
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = self.s_410_470 - self.s_410 * self.s_470 / self.n
+            var = self.s_410_410 - self.s_410 * self.s_410 / self.n
+            k = cov / var
+        return np.where((self.n > 1) & (var > 0), k, 1.0)
+
+    def f_stats(self, k: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        F = 470 - k·410 的整段均值与标准差
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 平移后的 F' = F - (shift_470 - k·shift_410)
+            s_f = self.s_470 - k * self.s_410
+            s_ff = self.s_470_470 - 2 * k * self.s_410_470 + k * k * self.s_410_410
+            mean = s_f / self.n
+            std = np.sqrt(np.maximum(s_ff / self.n - mean * mean, 0.0))
+        return mean + self.shift_470 - k * self.shift_410, std
+
+
+def _masked_chunks(
+    file_path: str,
+    fps: float,
+    masks: Optional[List[Tuple[float, float]]],
+    chunk_rows: int
+) -> Iterator[Tuple[List[str], np.ndarray, np.ndarray]]:
+    """
+    按块读取 (n_channels, chunk_len) 的 410/470，掩码样本置为 NaN
+    """
+    intervals = merge_mask_intervals(masks, fps, np.iinfo(np.int64).max) if masks else np.empty((0, 2), dtype=np.int64)
+    channel_cols = None
+    offset = 0
+
+    for chunk in iter_channel_chunks(file_path, chunk_rows):
+        if channel_cols is None:
+            channel_cols = pair_channel_columns(list(chunk))
+            if not channel_cols:
+                raise ValueError("No valid channel pairs found in CSV file")
+        names = [f"CH{ch_num}" for ch_num in channel_cols]
+        data_410 = np.stack([chunk[wavelengths['410']] for wavelengths in channel_cols.values()]).astype(np.float64)
+        data_470 = np.stack([chunk[wavelengths['470']] for wavelengths in channel_cols.values()]).astype(np.float64)
+
+        chunk_len = data_410.shape[1]
+        for start_idx, end_idx in chunk_intervals(intervals, offset, chunk_len):
+            data_410[:, start_idx:end_idx] = np.nan
+            data_470[:, start_idx:end_idx] = np.nan
+        offset += chunk_len
+
+        yield names, data_410, data_470
+
+
+def trace_moments(
+    file_path: str,
+    fps: float,
+    masks: Optional[List[Tuple[float, float]]] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Tuple[List[str], TraceMoments]:
+    """
+    第一遍：累加各通道有限样本的回归累加量
+    """
+    names: List[str] = []
+    moments = None
+    for names, data_410, data_470 in _masked_chunks(file_path, fps, masks, chunk_rows):
+        if moments is None:
+            zeros = np.zeros(len(names))
+            moments = TraceMoments(
+                shift_410=np.nan_to_num(np.nanmean(data_410, axis=1)) if data_410.size else zeros.copy(),
+                shift_470=np.nan_to_num(np.nanmean(data_470, axis=1)) if data_470.size else zeros.copy(),
+                n=zeros.copy(), s_410=zeros.copy(), s_470=zeros.copy(),
+                s_410_410=zeros.copy(), s_410_470=zeros.copy(), s_470_470=zeros.copy()
+            )
+        finite = np.isfinite(data_410) & np.isfinite(data_470)
+        x = np.where(finite, data_410 - moments.shift_410[:, None], 0.0)
+        y = np.where(finite, data_470 - moments.shift_470[:, None], 0.0)
+        moments.n += finite.sum(axis=1)
+        moments.s_410 += x.sum(axis=1)
+        moments.s_470 += y.sum(axis=1)
+        moments.s_410_410 += np.einsum('ij,ij->i', x, x)
+        moments.s_410_470 += np.einsum('ij,ij->i', x, y)
+        moments.s_470_470 += np.einsum('ij,ij->i', y, y)
+
+    if moments is None:
+        raise ValueError("Fluorescence file contains no samples")
+    return names, moments
+
+
+def iter_continuous_trace(
+    file_path: str,
+    fps: float,
+    masks: Optional[List[Tuple[float, float]]] = None,
+    baseline: Optional[RollingBaseline] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    dtype: str = 'float64'
+) -> Tuple[List[str], Iterator[np.ndarray]]:
+    """
+    计算整段记录的连续 ΔF/F 曲线
+
+    Args:
+        file_path: 荧光 CSV 文件路径
+        fps: 采样率
+        masks: 掩码时间范围列表（掩码样本输出 NaN）
+        baseline: 滑动基线参数（None 表示以整段记录为基线）
+        chunk_rows: 每块样本数
+        dtype: 输出精度
+
+    Returns:
+        (通道名列表, 按块产出 shape (chunk_len, n_channels) 数组的迭代器)
+    """
+    names, moments = trace_moments(file_path, fps, masks, chunk_rows)
+    k = moments.slope()
+    mean, std = moments.f_stats(k)
+    logger.info(f"Continuous trace for {file_path}: {len(names)} channel(s), {int(moments.n.max())} samples, {'rolling' if baseline else 'global'} baseline")
+
+    def chunks() -> Iterator[np.ndarray]:
+        tail = np.empty((len(names), 0))
+        for _, data_410, data_470 in _masked_chunks(file_path, fps, masks, chunk_rows):
+            # 先减去整段均值（滑动统计对平移不变，可减小累积和的舍入误差）
+            centered = data_470 - k[:, None] * data_410 - mean[:, None]
+            if baseline is not None:
+                trace, tail = rolling_normalize(
+                    centered, tail, baseline.window_samples(fps), baseline.method, baseline.percentile
+                )
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    trace = np.where(std[:, None] > 1e-10, centered / std[:, None], centered)
+            yield np.ascontiguousarray(trace.T, dtype=dtype)
+
+    return names, chunks()
@@ -0,0 +1,118 @@
+"""
+零相位滤波（二阶节 SOS + sosfiltfilt）
+- 所有通道的 410 与 470 曲线按块堆叠为 (n_traces, chunk) 后做二维 sosfiltfilt 调用
+- 超长记录按块处理：输入逐块读取（通常为通道存储的 memmap），每块两侧各带 overlap 个样本
+  （sosfiltfilt 的 padlen 与滤波器冲激响应衰减长度中的较大者），只保留块中心部分写入输出
+  （通常为预处理存储的可写 memmap），内存占用与记录长度无关
+- 非有限样本在各块内线性插值后滤波，输出中恢复为 NaN
+"""
+import math
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from scipy import signal
+
+
+# 每块样本数（不含重叠）
+FILTER_CHUNK_SAMPLES = 1_000_000
+# 块重叠须覆盖冲激响应衰减到该相对幅度所需的样本数
+FILTER_SETTLE_TOLERANCE = 1e-9
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """滤波参数"""
+    kind: str                       # 'lowpass' 或 'bandpass'
+    high_hz: float                  # 上截止频率（Hz）
+    low_hz: Optional[float] = None  # 下截止频率（Hz，仅 bandpass）
+    order: int = 4                  # Butterworth 阶数
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def design_sos(spec: FilterSpec, fps: float) -> np.ndarray:
+    """
+    设计 Butterworth SOS 滤波器
+
+    Raises:
+        ValueError: 参数无效或截止频率不低于 Nyquist 频率
+    """
+    nyquist = fps / 2
+    if spec.high_hz >= nyquist:
+        raise ValueError(f"Filter cutoff {spec.high_hz} Hz must be below Nyquist frequency {nyquist} Hz")
+
+    if spec.kind == 'lowpass':
+        return signal.butter(spec.order, spec.high_hz, btype='lowpass', fs=fps, output='sos')
+    if spec.kind == 'bandpass':
+        if spec.low_hz is None or not 0 < spec.low_hz < spec.high_hz:
+            raise ValueError("Band-pass filter requires 0 < low_hz < high_hz")
+        return signal.butter(spec.order, [spec.low_hz, spec.high_hz], btype='bandpass', fs=fps, output='sos')
+    raise ValueError(f"Unknown filter type: {spec.kind}")
+
+
+def overlap_samples(sos: np.ndarray) -> int:
+    """
+    分块重叠长度：sosfiltfilt 默认 padlen 与冲激响应衰减到 FILTER_SETTLE_TOLERANCE 所需样本数中的较大者
+    """
+    padlen = 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+    radius = float(np.abs(signal.sos2zpk(sos)[1]).max())
+    settle = math.ceil(math.log(FILTER_SETTLE_TOLERANCE) / math.log(radius)) if 0 < radius < 1 else 0
+    return max(int(padlen), settle)
+
+
+def fill_nonfinite(traces: np.ndarray) -> Optional[np.ndarray]:
+    """
+    对含非有限值的行做线性插值（原地），返回非有限位置掩码；全部有限时返回 None
+    """
+    nonfinite = ~np.isfinite(traces)
+    if not nonfinite.any():
+        return None
+
+    positions = np.arange(traces.shape[-1])
+    for row in np.flatnonzero(nonfinite.any(axis=-1)):
+        good = ~nonfinite[row]
+        traces[row] = np.interp(positions, positions[good], traces[row, good]) if good.any() else 0.0
+    return nonfinite
+
+
+def filter_traces(
+    traces: Sequence[np.ndarray],
+    fps: float,
+    spec: FilterSpec,
+    out: Optional[Sequence[np.ndarray]] = None,
+    chunk_samples: int = FILTER_CHUNK_SAMPLES
+) -> Sequence[np.ndarray]:
+    """
+    对所有曲线做零相位滤波（分块，块间重叠 overlap_samples 个样本）
+
+    Args:
+        traces: 各曲线（二维数组或等长一维数组序列，如 memmap；按块切片读取）
+        fps: 采样率
+        spec: 滤波参数
+        out: 输出曲线（与 traces 等长的可写数组序列，如 memmap）；None 时分配 float64 数组
+        chunk_samples: 每块样本数（不含重叠）
+
+    Returns:
+        out（或新分配的 (n_traces, n_samples) 数组）
+    """
+    sos = design_sos(spec, fps)
+    n_samples = len(traces[0]) if len(traces) else 0
+    if out is None:
+        out = np.empty((len(traces), n_samples), dtype=np.float64)
+
+    pad = overlap_samples(sos)
+    step = n_samples if n_samples <= chunk_samples + 2 * pad else chunk_samples
+    for start in range(0, n_samples, max(step, 1)):
+        stop = min(start + step, n_samples)
+        lo, hi = max(0, start - pad), min(n_samples, stop + pad)
+        segment = np.stack([np.asarray(trace[lo:hi], dtype=np.float64) for trace in traces])
+        nonfinite = fill_nonfinite(segment)
+
+        filtered = signal.sosfiltfilt(sos, segment, axis=-1)
+        if nonfinite is not None:
+            filtered[nonfinite] = np.nan
+        for row, target in zip(filtered, out):
+            target[start:stop] = row[start - lo:stop - lo]
+    return out
@@ -1,16 +1,111 @@
 """
 算法层契约与接口定义
 与 create_DA_dataset.py 的参数风格对齐，但不绑定其实现
-实现两种 dF/F 计算方法：zscore 和 warping
+实现三种 dF/F 计算方法：zscore、warping 和 rolling（滑动基线）
 """
+import hashlib
+import json
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
-from scipy import interpolate, signal
+from typing import List, Dict, Any, Optional, Tuple, Union
+from dataclasses import dataclass, field
+from scipy import signal
 
 from app.utils.logger import algo_logger as logger
+from app.utils.csv_reader import sniff_csv_header, read_csv_columns
+from app.services.algorithms.bootstrap import bootstrap_ci, curve_rng
+from app.services.algorithms.cohort import TrialSummary, aggregate_cohort
+from app.services.algorithms.filtering import (
+    FILTER_CHUNK_SAMPLES,
+    FILTER_SETTLE_TOLERANCE,
+    FilterSpec,
+    filter_traces,
+)
+from app.services.algorithms.photobleaching import correct_photobleaching, fit_parameters
+from app.services.algorithms.resampling import resample_parameters, resample_traces
+from app.services.algorithms.rolling import RollingBaseline, rolling_trace
+from app.services.algorithms.trial_cache import TrialCacheSession, make_scope, source_digest
+from app.services.algorithms.parallel import (
+    SharedArrayPool,
+    SharedArrayRef,
+    attach_shared_arrays,
+    resolve_worker_count,
+    run_in_process_pool,
+)
+from app.utils.channel_store import (
+    CHANNEL_COLUMN_PATTERN,
+    allocate_derived_store,
+    finish_derived_store,
+    open_channel_store,
+    open_derived_store,
+    read_channel_columns,
+    write_derived_store,
+)
+
+
+class BaselinePrefixSums:
+    """
+    基线统计前缀和
+    
+    对整条通道一次性计算 410、470、410²、470²、410·470 的累积和，
+    之后任意 [lo, hi) 区间的回归系数 k、F = 470 - k·410 的均值与方差
+    都可以 O(1) 差分得到，与基线窗口长度无关。
+    为减小累积误差，先减去全局均值再累加（k 与方差对平移不变）。
+    信号可以是单通道 (n_samples,) 或多通道 (n_channels, n_samples)，沿最后一维累加。
+    """
+
+    def __init__(self, signal_410: np.ndarray, signal_470: np.ndarray):
+        x = np.asarray(signal_410, dtype=np.float64)
+        y = np.asarray(signal_470, dtype=np.float64)
+        finite = np.isfinite(x) & np.isfinite(y)
+        n_finite = np.maximum(finite.sum(axis=-1, keepdims=True), 1)
+        self.mean_410 = np.where(finite, x, 0.0).sum(axis=-1, keepdims=True) / n_finite
+        self.mean_470 = np.where(finite, y, 0.0).sum(axis=-1, keepdims=True) / n_finite
+        
+        # NaN 样本按 0 累加；含 NaN 的窗口会在上层被剔除
+        xc = np.where(finite, x - self.mean_410, 0.0)
+        yc = np.where(finite, y - self.mean_470, 0.0)
+        self.c_x = self._prefix(xc)
+        self.c_y = self._prefix(yc)
+        self.c_xx = self._prefix(xc * xc)
+        self.c_yy = self._prefix(yc * yc)
+        self.c_xy = self._prefix(xc * yc)
+
+    @staticmethod
+    def _prefix(values: np.ndarray) -> np.ndarray:
+        out = np.empty(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.float64)
+        out[..., 0] = 0.0
+        np.cumsum(values, axis=-1, out=out[..., 1:])
+        return out
+
+    def window_stats(self, lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        批量计算 [lo, hi) 区间的基线统计量
+        
+        Returns:
+            (k, mean, std)：470 对 410 的线性回归斜率，
+            以及 F = 470 - k·410 在区间内的均值与（总体）标准差；
+            多通道时各为 (n_channels, n_windows)
+        """
+        n = (hi - lo).astype(np.float64)
+        s_x = self.c_x[..., hi] - self.c_x[..., lo]
+        s_y = self.c_y[..., hi] - self.c_y[..., lo]
+        s_xx = self.c_xx[..., hi] - self.c_xx[..., lo]
+        s_yy = self.c_yy[..., hi] - self.c_yy[..., lo]
+        s_xy = self.c_xy[..., hi] - self.c_xy[..., lo]
+        
+        # 闭式最小二乘斜率（与 np.polyfit(deg=1) 一致）
+        var_x = s_xx - s_x * s_x / n
+        cov_xy = s_xy - s_x * s_y / n
+        fit = (n > 1) & (var_x > 1e-12 * np.maximum(s_xx, 1e-300))
+        k = np.where(fit, cov_xy / np.where(fit, var_x, 1.0), 1.0)
+        
+        mean_c = (s_y - k * s_x) / n
+        mean_sq = (s_yy - 2 * k * s_xy + k * k * s_xx) / n
+        std = np.sqrt(np.maximum(mean_sq - mean_c * mean_c, 0.0))
+        mean = mean_c + self.mean_470 - k * self.mean_410
+        return k, mean, std
 
 
 @dataclass
@@ -19,6 +114,95 @@ class Channel:
     name: str  # 如 "CH1"
     baseline_410: np.ndarray  # 410nm 数据
     signal_470: np.ndarray    # 470nm 数据
+    
+    # 基线前缀和（按需构建，同一通道的多个事件标签共享）
+    _prefix_sums: Optional[BaselinePrefixSums] = field(default=None, init=False, repr=False, compare=False)
+
+    def baseline_prefix_sums(self) -> BaselinePrefixSums:
+        """
+        获取（必要时构建）本通道的基线前缀和
+        """
+        if self._prefix_sums is None:
+            self._prefix_sums = BaselinePrefixSums(self.baseline_410, self.signal_470)
+        return self._prefix_sums
+
+    @property
+    def has_prefix_sums(self) -> bool:
+        return self._prefix_sums is not None
+
+
+@dataclass
+class ChannelBlock:
+    """
+    多通道块
+    一条记录的所有通道按 (n_channels, n_samples) 连续存放，
+    z-score 与 warping 的块版本内核沿通道轴一次向量化计算
+    """
+    names: List[str]          # 通道名，如 ["CH1", "CH2"]
+    data_410: np.ndarray      # shape (n_channels, n_samples)
+    data_470: np.ndarray      # shape (n_channels, n_samples)
+    
+    # 多通道基线前缀和（按需构建）
+    _prefix_sums: Optional[BaselinePrefixSums] = field(default=None, init=False, repr=False, compare=False)
+    # 滑动基线归一化曲线（按需构建，同一块的多个事件标签共享）
+    _rolling_traces: Dict[Tuple[float, RollingBaseline], np.ndarray] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def n_samples(self) -> int:
+        return self.data_410.shape[1]
+
+    @classmethod
+    def from_channels(cls, channels: List[Channel]) -> 'ChannelBlock':
+        """
+        由通道列表构建（单通道时直接取视图，不拷贝）
+        """
+        if not channels:
+            raise ValueError("No channels to build a channel block from")
+        if len({len(channel.baseline_410) for channel in channels}) > 1:
+            raise ValueError("All channels in a block must have the same number of samples")
+        
+        if len(channels) == 1:
+            data_410 = np.asarray(channels[0].baseline_410)[None, :]
+            data_470 = np.asarray(channels[0].signal_470)[None, :]
+        else:
+            data_410 = np.stack([channel.baseline_410 for channel in channels])
+            data_470 = np.stack([channel.signal_470 for channel in channels])
+        return cls(names=[channel.name for channel in channels], data_410=data_410, data_470=data_470)
+
+    def channels(self) -> List[Channel]:
+        """
+        按通道拆分为 Channel 列表（每行为块的连续视图，不拷贝）
+        """
+        return [
+            Channel(name=name, baseline_410=self.data_410[idx], signal_470=self.data_470[idx])
+            for idx, name in enumerate(self.names)
+        ]
+
+    def baseline_prefix_sums(self) -> BaselinePrefixSums:
+        """
+        获取（必要时构建）所有通道的基线前缀和
+        """
+        if self._prefix_sums is None:
+            self._prefix_sums = BaselinePrefixSums(self.data_410, self.data_470)
+        return self._prefix_sums
+
+    @property
+    def has_prefix_sums(self) -> bool:
+        return self._prefix_sums is not None
+
+    def rolling_trace(self, fps: float, baseline: RollingBaseline) -> np.ndarray:
+        """
+        获取（必要时计算）所有通道整段的滑动基线归一化曲线，shape (n_channels, n_samples)
+        """
+        key = (fps, baseline)
+        if key not in self._rolling_traces:
+            self._rolling_traces[key] = rolling_trace(self.data_410, self.data_470, fps, baseline)
+        return self._rolling_traces[key]
 
 
 @dataclass
@@ -30,6 +214,173 @@ class LabelEvent:
     is_point: bool = False  # 是否为点事件
 
 
+@dataclass
+class EventTable:
+    """
+    事件表（列式存储）
+    标签以类别编码保存，起止时间为 float64 数组；
+    构造时一次性建立全局与按标签的时间排序索引
+    """
+    categories: List[str]  # 标签类别，codes 为其下标
+    codes: np.ndarray      # 每个事件的标签编码
+    start_times: np.ndarray  # 开始时间（秒）
+    stop_times: np.ndarray   # 结束时间（秒）
+    is_point: np.ndarray     # 是否为点事件（布尔）
+    
+    # 索引（构造时生成）
+    _time_order: np.ndarray = field(init=False, repr=False)
+    _sorted_starts: np.ndarray = field(init=False, repr=False)
+    _label_order: np.ndarray = field(init=False, repr=False)
+    _label_bounds: np.ndarray = field(init=False, repr=False)
+    _category_codes: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.codes = np.asarray(self.codes, dtype=np.int32)
+        self.start_times = np.asarray(self.start_times, dtype=np.float64)
+        self.stop_times = np.asarray(self.stop_times, dtype=np.float64)
+        self.is_point = np.asarray(self.is_point, dtype=bool)
+        self._category_codes = {label: code for code, label in enumerate(self.categories)}
+        
+        # 全局时间顺序（稳定排序，与 sorted(key=start_time) 一致）
+        self._time_order = np.argsort(self.start_times, kind='stable')
+        self._sorted_starts = self.start_times[self._time_order]
+        
+        # 按标签分段、段内按时间排序：_label_order[_label_bounds[c]:_label_bounds[c+1]]
+        self._label_order = self._time_order[np.argsort(self.codes[self._time_order], kind='stable')]
+        self._label_bounds = np.searchsorted(
+            self.codes[self._label_order],
+            np.arange(len(self.categories) + 1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def from_events(cls, events: List[LabelEvent]) -> 'EventTable':
+        """
+        由 LabelEvent 列表构造事件表
+        """
+        categorical = pd.Categorical([e.label for e in events])
+        return cls(
+            categories=[str(c) for c in categorical.categories],
+            codes=categorical.codes,
+            start_times=np.array([e.start_time for e in events], dtype=np.float64),
+            stop_times=np.array([e.stop_time for e in events], dtype=np.float64),
+            is_point=np.array([e.is_point for e in events], dtype=bool)
+        )
+
+    @classmethod
+    def concat(cls, tables: List['EventTable']) -> 'EventTable':
+        """
+        合并多个事件表（如同一荧光文件对应的多个打标文件），保持原有顺序
+        """
+        categories = sorted({label for table in tables for label in table.categories})
+        category_codes = {label: code for code, label in enumerate(categories)}
+        remapped = [
+            np.array([category_codes[label] for label in table.categories], dtype=np.int32)[table.codes]
+            if len(table) else np.empty(0, dtype=np.int32)
+            for table in tables
+        ]
+        return cls(
+            categories=categories,
+            codes=np.concatenate(remapped) if remapped else np.empty(0, dtype=np.int32),
+            start_times=np.concatenate([t.start_times for t in tables]) if tables else np.empty(0),
+            stop_times=np.concatenate([t.stop_times for t in tables]) if tables else np.empty(0),
+            is_point=np.concatenate([t.is_point for t in tables]) if tables else np.empty(0, dtype=bool)
+        )
+
+    @property
+    def labels(self) -> np.ndarray:
+        """
+        每个事件的标签字符串
+        """
+        return np.asarray(self.categories, dtype=object)[self.codes]
+
+    def indices_for_label(self, label: str) -> np.ndarray:
+        """
+        指定标签的全部事件下标（按开始时间排序），O(1) 定位 + O(k) 拷贝
+        """
+        code = self._category_codes.get(label)
+        if code is None:
+            return np.empty(0, dtype=np.intp)
+        return self._label_order[self._label_bounds[code]:self._label_bounds[code + 1]]
+
+    def select(self, labels: Optional[List[str]] = None) -> np.ndarray:
+        """
+        指定标签集合的事件下标（保持原始顺序）；labels 为空时返回全部
+        """
+        if not labels:
+            return np.arange(len(self))
+        parts = [self.indices_for_label(label) for label in set(labels)]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+
+    def in_range(self, start: float, end: float, label: Optional[str] = None) -> np.ndarray:
+        """
+        开始时间落在 [start, end] 内的事件下标（按时间排序），通过二分查找定位
+        """
+        if label is None:
+            order, sorted_starts = self._time_order, self._sorted_starts
+        else:
+            order = self.indices_for_label(label)
+            sorted_starts = self.start_times[order]
+        lo = np.searchsorted(sorted_starts, start, side='left')
+        hi = np.searchsorted(sorted_starts, end, side='right')
+        return order[lo:hi]
+
+    def label_sequences(self, labels: List[str], min_length: int = 2) -> List[np.ndarray]:
+        """
+        按时间顺序找出由指定标签连续组成的事件序列
+
+        任何不在 labels 中的事件都会打断当前序列；
+        仅返回长度不少于 min_length 的序列（每个元素为事件下标数组）
+        """
+        label_codes = [self._category_codes[l] for l in labels if l in self._category_codes]
+        if not label_codes or len(self) == 0:
+            return []
+        
+        member = np.isin(self.codes[self._time_order], label_codes)
+        # 连续 True 段的起止位置
+        edges = np.diff(np.concatenate(([0], member.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        
+        return [
+            self._time_order[lo:hi]
+            for lo, hi in zip(run_starts, run_ends)
+            if hi - lo >= min_length
+        ]
+
+    def to_events(self, indices: Optional[np.ndarray] = None) -> List[LabelEvent]:
+        """
+        转换为 LabelEvent 列表（兼容按对象访问的调用方）
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        return [
+            LabelEvent(
+                label=self.categories[code],
+                start_time=start_time,
+                stop_time=stop_time,
+                is_point=is_point
+            )
+            for code, start_time, stop_time, is_point in zip(
+                self.codes[indices].tolist(),
+                self.start_times[indices].tolist(),
+                self.stop_times[indices].tolist(),
+                self.is_point[indices].tolist()
+            )
+        ]
+
+
+def as_event_table(events: Union[EventTable, List[LabelEvent]]) -> EventTable:
+    """
+    将事件列表统一为 EventTable（已是 EventTable 时直接返回）
+    """
+    if isinstance(events, EventTable):
+        return events
+    return EventTable.from_events(events or [])
+
+
 @dataclass
 class Dataset:
     """单个数据集（一个荧光文件 + 对应的打标文件）"""
@@ -37,17 +388,32 @@ class Dataset:
     fluorescence_file: str
     label_files: List[str]
     channels: List[Channel]
-    events: List[LabelEvent]
+    events: EventTable  # 兼容 List[LabelEvent]
     fps: float
     metadata: Dict[str, Any] = None
+    block: Optional[ChannelBlock] = None  # channels 的多通道块表示
+
+
+def as_channel_block(dataset: Dataset) -> ChannelBlock:
+    """
+    获取数据集的多通道块（未提供时由 channels 构建并缓存）
+    """
+    if dataset.block is None:
+        dataset.block = ChannelBlock.from_channels(dataset.channels)
+    return dataset.block
 
 
 @dataclass
 class AnalysisParams:
     """分析参数"""
-    mode: str  # 'single' or 'multi'
+    mode: str  # 'single'、'multi' 或 'continuous'
     fps: float
-    algorithm_type: str = 'zscore'  # 'zscore' or 'warping'
+    algorithm_type: str = 'zscore'  # 'zscore'、'warping' 或 'rolling'
+    precision: str = 'float64'      # 'float64' or 'float32'，加载与计算的浮点精度
+    bleach_correction: Optional[str] = None  # 加载时的光漂白校正：None、'biexp' 或 'poly'
+    filter_spec: Optional[FilterSpec] = None  # 加载时的零相位滤波（在光漂白校正之后）
+    # 滑动基线（rolling 算法；continuous 模式下为 None 时以整段记录为基线）
+    rolling_baseline: Optional[RollingBaseline] = None
     
     # 单事件模式
     events: Optional[List[str]] = None  # 事件标签列表
@@ -62,6 +428,26 @@ class AnalysisParams:
     output_df_f: bool = True
     output_zscore: bool = False
     output_warping: bool = False
+    
+    # 并行执行（数据集 × 通道 × 事件 单元分发到进程池）
+    parallel: bool = False
+    max_workers: Optional[int] = None  # 默认使用 CPU 核数
+    
+    # 窗口参数扫描：[(baseline_window, response_window), ...]
+    sweep_windows: Optional[List[Tuple[Tuple[float, float], Tuple[float, float]]]] = None
+    sweep_full_results: Optional[List[int]] = None  # 返回完整矩阵的窗口下标
+    
+    # Bootstrap 置信区间：重采样次数 0 表示不计算
+    bootstrap_resamples: int = 0
+    bootstrap_confidence: float = 0.95
+    bootstrap_seed: Optional[int] = None
+    
+    # 响应指标（single 模式）：[(名称, start, end), ...]，None 表示不计算
+    metric_windows: Optional[List[Tuple[str, float, float]]] = None
+    
+    # 队列聚合（single 模式）：'trial' 或 'animal' 加权，None 表示不聚合
+    cohort_weighting: Optional[str] = None
+    cohort_group_by: str = 'none'  # 'none'、'subject' 或 'tag'
 
 
 @dataclass
@@ -70,96 +456,399 @@ class AnalysisResult:
     matrices: List[Dict[str, Any]]  # 热力图矩阵
     curves: List[Dict[str, Any]]     # 均值曲线
     metadata: Dict[str, Any]
+    sweep: List[Dict[str, Any]] = field(default_factory=list)  # 窗口扫描摘要
+    cohort: List[Dict[str, Any]] = field(default_factory=list)  # 队列聚合曲线
+    metrics: List[Dict[str, Any]] = field(default_factory=list)  # 逐试次响应指标表
+    # 与 matrices 对应的 (key, 试次数组, 时间轴)，仅保留在内存中供置换检验使用
+    trials: List[Tuple[str, np.ndarray, np.ndarray]] = field(default_factory=list)
 
 
-def load_fluorescence_data(
-    file_path: str,
+def merge_mask_intervals(
+    masks: List[Tuple[float, float]],
     fps: float,
-    masks: Optional[List[Tuple[float, float]]] = None
-) -> List[Channel]:
+    n_samples: int
+) -> np.ndarray:
     """
-    加载荧光数据文件并解析通道
+    将掩码时间范围转换为合并后的有序样本区间
     
     Args:
-        file_path: 荧光 CSV 文件路径
+        masks: 掩码时间范围列表 [(start, end), ...]（秒）
         fps: 采样率
-        masks: 掩码时间范围列表 [(start, end), ...]
+        n_samples: 记录样本数
     
     Returns:
-        通道列表
-    
-    Raises:
-        ValueError: 通道不成对或缺失
+        shape (n_intervals, 2) 的 [start_idx, end_idx) 数组，互不重叠且按起点排序
+    """
+    if not masks:
+        return np.empty((0, 2), dtype=np.int64)
+    
+    bounds = np.array(masks, dtype=float).reshape(-1, 2)
+    intervals = (bounds * fps).astype(np.int64)
+    intervals = np.clip(intervals, 0, n_samples)
+    intervals = intervals[intervals[:, 0] < intervals[:, 1]]
+    if len(intervals) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    
+    intervals = intervals[np.argsort(intervals[:, 0], kind='stable')]
+    
+    # 合并重叠/相邻区间：当前起点大于此前最大终点时开启新区间
+    running_end = np.maximum.accumulate(intervals[:, 1])
+    new_group = np.empty(len(intervals), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = intervals[1:, 0] > running_end[:-1]
+    group_starts = np.flatnonzero(new_group)
+    group_ends = np.append(group_starts[1:], len(intervals)) - 1
+    
+    return np.column_stack((intervals[group_starts, 0], running_end[group_ends]))
+
+
+def build_keep_mask(intervals: np.ndarray, n_samples: int) -> np.ndarray:
+    """
+    由掩码区间构建布尔保留掩码（切片赋值，不生成逐样本索引）
+    """
+    keep_mask = np.ones(n_samples, dtype=bool)
+    for start_idx, end_idx in intervals:
+        keep_mask[start_idx:end_idx] = False
+    return keep_mask
+
+
+def apply_mask_intervals(
+    data: np.ndarray,
+    intervals: np.ndarray,
+    keep_mask: Optional[np.ndarray] = None,
+    mode: str = 'remove'
+) -> np.ndarray:
     """
-    logger.info(f"Loading fluorescence data from {file_path} with fps={fps}")
+    对信号应用已合并的掩码区间（沿最后一维，支持多通道块）
     
-    # 读取 CSV 文件
-    try:
-        df = pd.read_csv(file_path)
-    except Exception as e:
-        raise ValueError(f"Failed to read CSV file: {e}")
+    Args:
+        data: 原始信号，shape (n_samples,) 或 (n_channels, n_samples)
+        intervals: merge_mask_intervals 的结果
+        keep_mask: 预先构建的保留掩码（remove 模式下复用，避免每个通道重复构建）
+        mode: 'remove' 删除掩码样本；'nan' 以 NaN 填充并保留时间基准
+    
+    Returns:
+        掩码后的信号
+    """
+    if len(intervals) == 0:
+        return data
+    
+    if mode == 'nan':
+        filled = np.array(data, dtype=np.result_type(data.dtype, np.float32))
+        for start_idx, end_idx in intervals:
+            filled[..., start_idx:end_idx] = np.nan
+        return filled
+    
+    if keep_mask is None:
+        keep_mask = build_keep_mask(intervals, data.shape[-1])
+    return data[..., keep_mask]
+
+
+def pair_channel_columns(columns: List[str]) -> Dict[str, Dict[str, str]]:
+    """
+    检测通道列（匹配 CHx-410 和 CHx-470 模式）并验证成对
     
-    # 检测通道列（匹配 CHx-410 和 CHx-470 模式）
-    import re
-    channel_pattern = re.compile(r'^CH(\d+)-(410|470)$', re.IGNORECASE)
+    Returns:
+        {通道号: {'410': 列名, '470': 列名}}
     
+    Raises:
+        ValueError: 通道不成对
+    """
     channel_cols = {}
-    for col in df.columns:
-        match = channel_pattern.match(col.strip())
-        if match:
-            ch_num = match.group(1)
-            wavelength = match.group(2)
-            if ch_num not in channel_cols:
-                channel_cols[ch_num] = {}
-            channel_cols[ch_num][wavelength] = col
-    
-    # 验证通道成对
-    channels = []
+    for col in columns:
+        match = CHANNEL_COLUMN_PATTERN.match(col.strip())
+        if not match:
+            continue
+        ch_num = match.group(1)
+        wavelength = match.group(2)
+        if ch_num not in channel_cols:
+            channel_cols[ch_num] = {}
+        channel_cols[ch_num][wavelength] = col
+    
     for ch_num, wavelengths in channel_cols.items():
         if '410' not in wavelengths or '470' not in wavelengths:
             raise ValueError(f"Channel {ch_num} is missing 410 or 470 wavelength data")
-        
-        # 提取数据
-        data_410 = df[wavelengths['410']].values.astype(float)
-        data_470 = df[wavelengths['470']].values.astype(float)
-        
-        # 应用掩码（删除指定时间范围的数据点）
-        if masks and len(masks) > 0:
-            mask_indices = []
-            for start, end in masks:
-                start_idx = int(start * fps)
-                end_idx = int(end * fps)
-                mask_indices.extend(range(start_idx, min(end_idx, len(data_410))))
-            
-            # 创建布尔掩码并保留非掩码数据
-            keep_mask = np.ones(len(data_410), dtype=bool)
-            if mask_indices:
-                keep_mask[mask_indices] = False
-                data_410 = data_410[keep_mask]
-                data_470 = data_470[keep_mask]
-                logger.debug(f"Applied masks, removed {len(mask_indices)} samples from CH{ch_num}")
-        
-        channel = Channel(
-            name=f"CH{ch_num}",
-            baseline_410=data_410,
-            signal_470=data_470
-        )
-        channels.append(channel)
     
-    if not channels:
+    return channel_cols
+
+
+def bleach_corrected_columns(
+    file_path: str,
+    fps: float,
+    column_data: Dict[str, np.ndarray],
+    method: str
+) -> Dict[str, np.ndarray]:
+    """
+    整段记录的光漂白校正（掩码之前，所有通道的 410/470 一次拟合）
+    
+    校正结果按文件写入旁路存储，源文件与拟合参数不变时后续任务直接内存映射复用
+    
+    Returns:
+        {列名: 校正后数组}
+    """
+    name = f"bleach-{method}"
+    fit_params = fit_parameters(method)
+    stored = _open_derived_columns(file_path, name, fit_params, column_data)
+    if stored is not None:
+        logger.debug(f"Using cached photobleaching correction ({method}) for {file_path}")
+        return stored
+    
+    columns = list(column_data)
+    traces = correct_photobleaching(np.stack([column_data[col] for col in columns]), fps, method)
+    corrected = dict(zip(columns, traces))
+    write_derived_store(file_path, name, corrected, fit_params)
+    logger.info(f"Applied photobleaching correction ({method}) to {len(columns)} trace(s) in {file_path}")
+    return corrected
+
+
+def _open_derived_columns(
+    file_path: str,
+    name: str,
+    spec: Dict[str, Any],
+    column_data: Dict[str, np.ndarray]
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    打开预处理结果存储，且包含所需全部列时按原列名返回
+    """
+    stored = open_derived_store(file_path, name, spec)
+    if stored is None or not all(col.strip() in stored for col in column_data):
+        return None
+    return {col: stored[col.strip()] for col in column_data}
+
+
+def filter_store_spec(fps: float, filter_spec: FilterSpec, bleach_correction: Optional[str]) -> Dict[str, Any]:
+    """
+    滤波结果存储的校验信息（包含上游的光漂白校正参数）
+    """
+    return {
+        'filter': filter_spec.to_dict(),
+        'fps': fps,
+        'bleach': fit_parameters(bleach_correction) if bleach_correction else None,
+        'chunkSamples': FILTER_CHUNK_SAMPLES,
+        'settleTolerance': FILTER_SETTLE_TOLERANCE,
+    }
+
+
+def preprocess_columns(
+    file_path: str,
+    fps: float,
+    column_data: Dict[str, np.ndarray],
+    bleach_correction: Optional[str] = None,
+    filter_spec: Optional[FilterSpec] = None
+) -> Dict[str, np.ndarray]:
+    """
+    整段记录预处理（掩码之前）：光漂白校正 → 零相位滤波
+    
+    滤波结果按 (文件, 滤波参数, 上游校正参数) 写入旁路存储，命中时跳过全部预处理；
+    滤波按块从输入 memmap 读取并直接写入存储的可写 memmap，内存占用与记录长度无关
+    
+    Returns:
+        {列名: 预处理后数组}
+    """
+    if filter_spec is None:
+        if bleach_correction:
+            return bleach_corrected_columns(file_path, fps, column_data, bleach_correction)
+        return column_data
+    
+    spec = filter_store_spec(fps, filter_spec, bleach_correction)
+    name = "filter-" + hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    stored = _open_derived_columns(file_path, name, spec, column_data)
+    if stored is not None:
+        logger.debug(f"Using cached filtered traces ({filter_spec.kind}) for {file_path}")
+        return stored
+    
+    if bleach_correction:
+        column_data = bleach_corrected_columns(file_path, fps, column_data, bleach_correction)
+    
+    columns = list(column_data)
+    n_samples = len(column_data[columns[0]]) if columns else 0
+    traces = [column_data[col] for col in columns]
+    filtered = allocate_derived_store(file_path, name, columns, n_samples)
+    if filtered is None:
+        # 存储不可写时在内存中滤波（不缓存）
+        filtered = dict(zip(columns, filter_traces(traces, fps, filter_spec)))
+    else:
+        filter_traces(traces, fps, filter_spec, out=[filtered[col] for col in columns])
+        finish_derived_store(file_path, name, filtered, spec)
+    logger.info(f"Applied {filter_spec.kind} filter to {len(columns)} trace(s) in {file_path}")
+    return filtered
+
+
+def resampled_columns(
+    file_path: str,
+    source_fps: float,
+    target_fps: float,
+    column_data: Dict[str, np.ndarray],
+    bleach_correction: Optional[str] = None,
+    filter_spec: Optional[FilterSpec] = None
+) -> Dict[str, np.ndarray]:
+    """
+    整段记录重采样到分析采样率（预处理之后、掩码之前，所有通道的 410/470 一次计算）
+    
+    结果按 (文件, 采样率, 上游预处理参数) 写入旁路存储，命中时跳过预处理与重采样
+    
+    Returns:
+        {列名: 重采样后数组}
+    """
+    spec = {
+        'resample': resample_parameters(source_fps, target_fps),
+        'bleach': fit_parameters(bleach_correction) if bleach_correction else None,
+        'filter': filter_store_spec(source_fps, filter_spec, bleach_correction) if filter_spec is not None else None,
+    }
+    name = "resample-" + hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    stored = _open_derived_columns(file_path, name, spec, column_data)
+    if stored is not None:
+        logger.debug(f"Using cached resampled traces ({source_fps} -> {target_fps} Hz) for {file_path}")
+        return stored
+    
+    if bleach_correction or filter_spec is not None:
+        column_data = preprocess_columns(file_path, source_fps, column_data, bleach_correction, filter_spec)
+    
+    columns = list(column_data)
+    traces = resample_traces(np.stack([column_data[col] for col in columns]), source_fps, target_fps)
+    resampled = dict(zip(columns, traces))
+    write_derived_store(file_path, name, resampled, spec)
+    logger.info(f"Resampled {len(columns)} trace(s) in {file_path} from {source_fps} to {target_fps} Hz")
+    return resampled
+
+
+def read_sidecar_fps(file_path: str) -> Optional[float]:
+    """
+    读取荧光文件同名 JSON 旁注文件（如 fluorescence.csv → fluorescence.json）中的 "fps"
+    
+    Returns:
+        原始采样率；旁注文件不存在或无有效 fps 时为 None
+    """
+    sidecar = Path(file_path).with_suffix('.json')
+    if not sidecar.is_file():
+        return None
+    try:
+        with open(sidecar, 'r', encoding='utf-8') as f:
+            fps = float(json.load(f)['fps'])
+    except (OSError, ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring invalid sidecar {sidecar}: {e}")
+        return None
+    if fps <= 0:
+        logger.warning(f"Ignoring non-positive fps {fps} in sidecar {sidecar}")
+        return None
+    return fps
+
+
+def load_fluorescence_block(
+    file_path: str,
+    fps: float,
+    masks: Optional[List[Tuple[float, float]]] = None,
+    mask_mode: str = 'remove',
+    dtype: str = 'float64',
+    bleach_correction: Optional[str] = None,
+    filter_spec: Optional[FilterSpec] = None,
+    source_fps: Optional[float] = None
+) -> ChannelBlock:
+    """
+    加载荧光数据文件，所有通道存放为一个 (n_channels, n_samples) 多通道块
+    
+    Args:
+        file_path: 荧光 CSV 文件路径
+        fps: 分析采样率（返回的块与掩码时间均按此采样率）
+        masks: 掩码时间范围列表 [(start, end), ...]
+        mask_mode: 掩码方式，'remove' 删除样本，'nan' 以 NaN 填充保留时间基准
+        dtype: 数据精度，'float64' 或 'float32'
+        bleach_correction: 光漂白校正方法（None、'biexp' 或 'poly'）
+        filter_spec: 零相位滤波参数（None 表示不滤波）
+        source_fps: 记录的原始采样率（None 表示与 fps 相同；不同时预处理后重采样到 fps）
+    
+    Returns:
+        多通道块
+    
+    Raises:
+        ValueError: 通道不成对或缺失
+    """
+    source_fps = source_fps or fps
+    logger.info(f"Loading fluorescence data from {file_path} with fps={fps}" + (f" (recorded at {source_fps})" if source_fps != fps else ""))
+    
+    # 优先打开上传时生成的二进制列存储，不存在时回退到 CSV
+    column_data = open_channel_store(file_path)
+    if column_data is not None:
+        logger.debug(f"Using binary channel store for {file_path}")
+    else:
+        # 仅解析通道列，跳过时间戳、LED、TTL 等辅助列
+        try:
+            column_data = read_channel_columns(file_path, dtype=dtype)
+        except Exception as e:
+            raise ValueError(f"Failed to read CSV file: {e}")
+    
+    channel_cols = pair_channel_columns(list(column_data))
+    if not channel_cols:
         raise ValueError("No valid channel pairs found in CSV file")
     
-    logger.info(f"Loaded {len(channels)} channel(s)")
-    return channels
+    if bleach_correction or filter_spec is not None or source_fps != fps:
+        paired = {col: column_data[col] for wavelengths in channel_cols.values() for col in wavelengths.values()}
+        if source_fps != fps:
+            column_data = resampled_columns(file_path, source_fps, fps, paired, bleach_correction, filter_spec)
+        else:
+            column_data = preprocess_columns(file_path, fps, paired, bleach_correction, filter_spec)
+    
+    # 各通道拷贝到连续的 (n_channels, n_samples) 数组（按所需精度）
+    names = [f"CH{ch_num}" for ch_num in channel_cols]
+    data_410 = np.stack([column_data[wavelengths['410']] for wavelengths in channel_cols.values()]).astype(dtype, copy=False)
+    data_470 = np.stack([column_data[wavelengths['470']] for wavelengths in channel_cols.values()]).astype(dtype, copy=False)
+    
+    # 应用掩码（区间与保留掩码按文件只计算一次，整块一次应用）
+    if masks:
+        n_samples = data_410.shape[1]
+        intervals = merge_mask_intervals(masks, fps, n_samples)
+        if len(intervals) > 0:
+            keep_mask = build_keep_mask(intervals, n_samples) if mask_mode != 'nan' else None
+            removed = int((intervals[:, 1] - intervals[:, 0]).sum())
+            logger.debug(f"Applying {len(intervals)} merged mask interval(s) covering {removed} samples ({mask_mode})")
+            data_410 = apply_mask_intervals(data_410, intervals, keep_mask, mask_mode)
+            data_470 = apply_mask_intervals(data_470, intervals, keep_mask, mask_mode)
+    
+    logger.info(f"Loaded {len(names)} channel(s) as {data_410.dtype}")
+    return ChannelBlock(names=names, data_410=data_410, data_470=data_470)
 
 
-def load_label_data(
+def load_fluorescence_data(
+    file_path: str,
+    fps: float,
+    masks: Optional[List[Tuple[float, float]]] = None,
+    mask_mode: str = 'remove',
+    dtype: str = 'float64',
+    bleach_correction: Optional[str] = None,
+    filter_spec: Optional[FilterSpec] = None,
+    source_fps: Optional[float] = None
+) -> List[Channel]:
+    """
+    加载荧光数据文件并解析通道
+    
+    Args:
+        file_path: 荧光 CSV 文件路径
+        fps: 分析采样率
+        masks: 掩码时间范围列表 [(start, end), ...]
+        mask_mode: 掩码方式，'remove' 删除样本，'nan' 以 NaN 填充保留时间基准
+        dtype: 数据精度，'float64' 或 'float32'
+        bleach_correction: 光漂白校正方法（None、'biexp' 或 'poly'）
+        filter_spec: 零相位滤波参数（None 表示不滤波）
+        source_fps: 记录的原始采样率（None 表示与 fps 相同）
+    
+    Returns:
+        通道列表（各通道为多通道块的行视图）
+    
+    Raises:
+        ValueError: 通道不成对或缺失
+    """
+    return load_fluorescence_block(
+        file_path, fps, masks, mask_mode, dtype, bleach_correction, filter_spec, source_fps
+    ).channels()
+
+
+def load_label_table(
     file_path: str,
     column_map: Dict[str, str],
     label_mapping: Dict[str, str] = None
-) -> List[LabelEvent]:
+) -> EventTable:
     """
-    加载打标数据文件
+    加载打标数据文件为列式事件表（向量化，无逐行循环）
     
     Args:
         file_path: 打标 CSV 文件路径
@@ -167,16 +856,11 @@ def load_label_data(
         label_mapping: 原始标签到显示名称的映射
     
     Returns:
-        事件列表
+        事件表
     """
     logger.info(f"Loading label data from {file_path}")
     logger.debug(f"Column map: {column_map}")
     
-    try:
-        df = pd.read_csv(file_path)
-    except Exception as e:
-        raise ValueError(f"Failed to read label CSV file: {e}")
-    
     # 获取列名
     behavior_col = column_map.get('behavior')
     start_col = column_map.get('start')
@@ -186,39 +870,85 @@ def load_label_data(
     if not behavior_col or not start_col:
         raise ValueError("behavior and start columns must be specified")
     
-    if behavior_col not in df.columns:
+    # 先探测表头，只解析 behavior/start/stop 三列
+    try:
+        header_row, header, encoding = sniff_csv_header(
+            file_path,
+            is_header=lambda row: behavior_col in row and start_col in row
+        )
+    except ValueError:
+        header_row, header, encoding = None, [], None
+    except Exception as e:
+        raise ValueError(f"Failed to read label CSV file: {e}")
+    
+    if behavior_col not in header:
         raise ValueError(f"Behavior column '{behavior_col}' not found in CSV")
-    if start_col not in df.columns:
+    if start_col not in header:
         raise ValueError(f"Start column '{start_col}' not found in CSV")
     
-    events = []
-    for idx, row in df.iterrows():
-        label = str(row[behavior_col]).strip()
-        
-        # 应用标签映射
-        if label_mapping and label in label_mapping:
-            label = label_mapping[label]
-        
-        start_time = float(row[start_col])
-        
-        # 处理点事件和区间事件
-        if is_point_event or not stop_col or stop_col not in df.columns:
-            stop_time = start_time
-            is_point = True
-        else:
-            stop_time = float(row[stop_col])
-            is_point = (start_time == stop_time)
-        
-        event = LabelEvent(
-            label=label,
-            start_time=start_time,
-            stop_time=stop_time,
-            is_point=is_point
+    use_cols = [behavior_col, start_col]
+    if stop_col and stop_col in header and stop_col not in use_cols:
+        use_cols.append(stop_col)
+    
+    try:
+        df = read_csv_columns(
+            file_path,
+            columns=use_cols,
+            dtypes={behavior_col: str, start_col: 'float64', stop_col: 'float64'},
+            header_row=header_row,
+            encoding=encoding
         )
-        events.append(event)
+    except Exception as e:
+        raise ValueError(f"Failed to read label CSV file: {e}")
+    
+    # 标签：缺失值与原先 str(NaN) 的结果保持一致
+    labels = df[behavior_col].fillna('nan').astype(str).str.strip()
+    
+    # 应用标签映射
+    if label_mapping:
+        mapped = labels.map(label_mapping)
+        labels = mapped.where(mapped.notna(), labels)
+    
+    start_times = df[start_col].to_numpy(dtype=np.float64)
+    
+    # 处理点事件和区间事件
+    if is_point_event or not stop_col or stop_col not in df.columns:
+        stop_times = start_times.copy()
+        is_point = np.ones(len(start_times), dtype=bool)
+    else:
+        stop_times = df[stop_col].to_numpy(dtype=np.float64)
+        is_point = start_times == stop_times
+    
+    categorical = pd.Categorical(labels)
+    table = EventTable(
+        categories=[str(c) for c in categorical.categories],
+        codes=categorical.codes.astype(np.int32),
+        start_times=start_times,
+        stop_times=stop_times,
+        is_point=is_point
+    )
+    
+    logger.info(f"Loaded {len(table)} events")
+    return table
+
+
+def load_label_data(
+    file_path: str,
+    column_map: Dict[str, str],
+    label_mapping: Dict[str, str] = None
+) -> List[LabelEvent]:
+    """
+    加载打标数据文件
     
-    logger.info(f"Loaded {len(events)} events")
-    return events
+    Args:
+        file_path: 打标 CSV 文件路径
+        column_map: 列名映射 {'behavior': '...', 'start': '...', 'stop': '...', 'isPointEvent': bool}
+        label_mapping: 原始标签到显示名称的映射
+    
+    Returns:
+        事件列表
+    """
+    return load_label_table(file_path, column_map, label_mapping).to_events()
 
 
 def calculate_df_f_zscore(
@@ -296,30 +1026,332 @@ def calculate_df_f_zscore(
     
     # 生成时间轴
     time_axis = np.arange(len(F_window)) / fps + window_start
-    
+
     return df_f, time_axis
 
 
-def calculate_df_f(
-    channel: Channel,
-    events: List[LabelEvent],
-    baseline_window: Tuple[float, float],
-    response_window: Tuple[float, float],
+def event_window_layout(
     fps: float,
-    event_filter: Optional[List[str]] = None,
-    algorithm: str = "zscore"
-) -> Dict[str, np.ndarray]:
+    baseline_start: float,
+    baseline_end: float,
+    window_start: float,
+    window_end: float
+) -> Tuple[int, int, int, int, np.ndarray]:
     """
-    计算 ΔF/F
-    
-    Args:
-        channel: 通道数据
-        events: 事件列表
+    计算事件锁定窗口的样本布局（与单试次版本一致：先截断到样本索引，再加相对偏移）
+
+    Returns:
+        (window_offset, n_samples, baseline_lo, baseline_hi, time_axis)
+        window_offset: 窗口起点相对事件样本的偏移
+        n_samples: 窗口样本数
+        baseline_lo/baseline_hi: 基线在窗口内的列范围
+    """
+    window_offset = int(window_start * fps)
+    n_samples = int(window_end * fps) - window_offset
+    baseline_lo = int(baseline_start * fps) - window_offset
+    baseline_hi = int(baseline_end * fps) - window_offset
+
+    if n_samples <= 0 or baseline_lo >= baseline_hi:
+        raise ValueError("Invalid time window indices")
+
+    time_axis = np.arange(n_samples) / fps + window_start
+    return window_offset, n_samples, baseline_lo, baseline_hi, time_axis
+
+
+def normalize_zscore_windows(
+    windows_410: np.ndarray,
+    windows_470: np.ndarray,
+    baseline_lo: int,
+    baseline_hi: int,
+    baseline_stats: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    对已收集的 (n_trials, n_samples) 窗口矩阵做基线拟合与 z-score 归一化
+
+    Args:
+        baseline_stats: 可选的每行 (k, mean, std)（如由前缀和得到），
+                        提供时跳过逐试次的基线扫描
+
+    Returns:
+        (df_f, finite)
+        df_f: 仅包含 finite 行的 ΔF/F 矩阵
+        finite: 窗口内不含 NaN 的试次掩码
+    """
+    # 窗口内含 NaN（如 NaN 填充的掩码区间）的试次无法归一化，剔除
+    finite = np.isfinite(windows_410).all(axis=1) & np.isfinite(windows_470).all(axis=1)
+    if not finite.all():
+        windows_410 = windows_410[finite]
+        windows_470 = windows_470[finite]
+        if baseline_stats is not None:
+            baseline_stats = tuple(stat[finite] for stat in baseline_stats)
+    if len(windows_410) == 0:
+        return np.empty((0, windows_410.shape[1]), dtype=windows_470.dtype), finite
+
+    return zscore_window_rows(windows_410, windows_470, baseline_lo, baseline_hi, baseline_stats), finite
+
+
+def zscore_window_rows(
+    windows_410: np.ndarray,
+    windows_470: np.ndarray,
+    baseline_lo: int,
+    baseline_hi: int,
+    baseline_stats: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+) -> np.ndarray:
+    """
+    z-score 归一化内核：沿最后一维对每个窗口独立拟合与归一化
+
+    窗口可以带任意前导维度（如 (n_channels, n_trials, n_samples)），
+    含 NaN 的窗口结果为 NaN，由调用方剔除。结果保持窗口的数据精度。
+
+    Args:
+        baseline_stats: 可选的 (k, mean, std)，形状与窗口的前导维度一致
+    """
+    if baseline_stats is not None:
+        # 前缀和统计以 float64 计算，归一化按窗口精度进行
+        k, baseline_mean, baseline_std = (
+            stat.astype(windows_470.dtype, copy=False) for stat in baseline_stats
+        )
+        scale = np.where(baseline_std > 1e-10, baseline_std, 1.0)
+        return (windows_470 - k[..., None] * windows_410 - baseline_mean[..., None]) / scale[..., None]
+
+    # 闭式最小二乘拟合 470 = k * 410 + b（与 np.polyfit(deg=1) 斜率一致）
+    base_410 = windows_410[..., baseline_lo:baseline_hi]
+    base_470 = windows_470[..., baseline_lo:baseline_hi]
+    if base_410.shape[-1] > 1:
+        centered_410 = base_410 - base_410.mean(axis=-1, keepdims=True)
+        centered_470 = base_470 - base_470.mean(axis=-1, keepdims=True)
+        var_410 = np.einsum('...j,...j->...', centered_410, centered_410)
+        cov = np.einsum('...j,...j->...', centered_410, centered_470)
+        safe_var = np.where(var_410 > 0, var_410, 1.0)
+        k = np.where(var_410 > 0, cov / safe_var, 1.0)
+    else:
+        k = np.ones(windows_410.shape[:-1], dtype=windows_470.dtype)
+
+    F = windows_470 - k[..., None] * windows_410
+
+    # 基线统计量并整体归一化
+    F_baseline = F[..., baseline_lo:baseline_hi]
+    baseline_mean = F_baseline.mean(axis=-1, keepdims=True)
+    baseline_std = F_baseline.std(axis=-1, keepdims=True)
+    scale = np.where(baseline_std > 1e-10, baseline_std, 1.0)
+    return (F - baseline_mean) / scale
+
+
+def calculate_df_f_zscore_batch(
+    signal_410: np.ndarray,
+    signal_470: np.ndarray,
+    fps: float,
+    baseline_start: float,
+    baseline_end: float,
+    event_times: np.ndarray,
+    window_start: float,
+    window_end: float,
+    prefix_sums: Optional[BaselinePrefixSums] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量 z-score ΔF/F 计算（calculate_df_f_zscore 的向量化版本）
+
+    一次性把所有事件窗口收集为 (n_trials, n_samples) 矩阵，
+    用闭式最小二乘同时拟合每个试次的基线系数 k，再整体归一化，
+    不再对每个事件重新计算整条记录的 F。
+
+    Args:
+        signal_410: 410nm 信号
+        signal_470: 470nm 信号
+        fps: 采样率
+        baseline_start: 基线窗口起始（相对于事件）
+        baseline_end: 基线窗口结束
+        event_times: 事件时间数组（秒）
+        window_start: 提取窗口起始（相对于事件）
+        window_end: 提取窗口结束
+        prefix_sums: 可选的通道基线前缀和，提供时每个试次的基线统计为 O(1)
+
+    Returns:
+        (df_f, time_axis, valid)
+        df_f: shape (n_valid, n_samples)
+        valid: 布尔数组，标记窗口完整落在记录内且不含 NaN 的事件
+    """
+    event_times = np.asarray(event_times, dtype=float)
+    n_total = len(signal_410)
+
+    window_offset, n_samples, baseline_lo, baseline_hi, time_axis = event_window_layout(
+        fps, baseline_start, baseline_end, window_start, window_end
+    )
+
+    starts = (event_times * fps).astype(np.int64) + window_offset
+    valid = (starts >= 0) & (starts + n_samples <= n_total)
+
+    if not valid.any():
+        return np.empty((0, n_samples)), time_axis, valid
+
+    # 以滑动窗口视图按起点索引，得到 (n_trials, n_samples) 矩阵
+    windows_410 = np.lib.stride_tricks.sliding_window_view(signal_410, n_samples)[starts[valid]]
+    windows_470 = np.lib.stride_tricks.sliding_window_view(signal_470, n_samples)[starts[valid]]
+
+    baseline_stats = None
+    if prefix_sums is not None:
+        valid_starts = starts[valid]
+        baseline_stats = prefix_sums.window_stats(valid_starts + baseline_lo, valid_starts + baseline_hi)
+
+    df_f, finite = normalize_zscore_windows(
+        windows_410, windows_470, baseline_lo, baseline_hi, baseline_stats
+    )
+    valid[np.flatnonzero(valid)[~finite]] = False
+
+    return df_f, time_axis, valid
+
+
+def calculate_df_f_zscore_block(
+    block: ChannelBlock,
+    fps: float,
+    baseline_start: float,
+    baseline_end: float,
+    event_times: np.ndarray,
+    window_start: float,
+    window_end: float,
+    prefix_sums: Optional[BaselinePrefixSums] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    多通道批量 z-score ΔF/F 计算（calculate_df_f_zscore_batch 的块版本）
+
+    所有通道、所有事件的窗口一次收集为 (n_channels, n_events, n_samples) 张量，
+    拟合与归一化沿通道轴一次向量化完成。
+
+    Args:
+        block: 多通道块
+        prefix_sums: 可选的多通道基线前缀和（block.baseline_prefix_sums()）
+        其余参数同 calculate_df_f_zscore_batch
+
+    Returns:
+        (df_f, time_axis, valid)
+        df_f: shape (n_channels, n_events, n_samples)，无效试次行为 NaN
+        valid: shape (n_channels, n_events)，窗口完整落在记录内且不含 NaN 的试次
+    """
+    event_times = np.asarray(event_times, dtype=float)
+    n_channels = len(block)
+
+    window_offset, n_samples, baseline_lo, baseline_hi, time_axis = event_window_layout(
+        fps, baseline_start, baseline_end, window_start, window_end
+    )
+
+    starts = (event_times * fps).astype(np.int64) + window_offset
+    in_range = (starts >= 0) & (starts + n_samples <= block.n_samples)
+
+    df_f = np.full((n_channels, len(starts), n_samples), np.nan, dtype=block.data_470.dtype)
+    valid = np.zeros((n_channels, len(starts)), dtype=bool)
+    if not in_range.any():
+        return df_f, time_axis, valid
+
+    # (n_channels, n_in_range, n_samples) 窗口张量
+    valid_starts = starts[in_range]
+    windows_410 = np.lib.stride_tricks.sliding_window_view(block.data_410, n_samples, axis=1)[:, valid_starts]
+    windows_470 = np.lib.stride_tricks.sliding_window_view(block.data_470, n_samples, axis=1)[:, valid_starts]
+
+    baseline_stats = None
+    if prefix_sums is not None:
+        baseline_stats = prefix_sums.window_stats(valid_starts + baseline_lo, valid_starts + baseline_hi)
+
+    finite = np.isfinite(windows_410).all(axis=2) & np.isfinite(windows_470).all(axis=2)
+    with np.errstate(invalid='ignore'):
+        df_f[:, in_range] = zscore_window_rows(windows_410, windows_470, baseline_lo, baseline_hi, baseline_stats)
+    valid[:, in_range] = finite
+
+    return df_f, time_axis, valid
+
+
+def calculate_df_f_rolling_block(
+    block: ChannelBlock,
+    fps: float,
+    baseline: RollingBaseline,
+    baseline_start: float,
+    baseline_end: float,
+    event_times: np.ndarray,
+    window_start: float,
+    window_end: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    多通道滑动基线 ΔF/F 计算（rolling 算法）
+
+    整段通道只归一化一次（block.rolling_trace() 缓存，同一块的其他标签直接复用），
+    事件窗口为归一化曲线的切片；baseline_start/baseline_end 仅参与窗口布局，
+    窗口样本数与 z-score 版本一致
+
+    Returns:
+        与 calculate_df_f_zscore_block 相同的 (df_f, time_axis, valid)
+    """
+    event_times = np.asarray(event_times, dtype=float)
+    n_channels = len(block)
+
+    window_offset, n_samples, _, _, time_axis = event_window_layout(
+        fps, baseline_start, baseline_end, window_start, window_end
+    )
+
+    starts = (event_times * fps).astype(np.int64) + window_offset
+    in_range = (starts >= 0) & (starts + n_samples <= block.n_samples)
+
+    df_f = np.full((n_channels, len(starts), n_samples), np.nan, dtype=block.data_470.dtype)
+    valid = np.zeros((n_channels, len(starts)), dtype=bool)
+    if not in_range.any():
+        return df_f, time_axis, valid
+
+    trace = block.rolling_trace(fps, baseline)
+    windows = np.lib.stride_tricks.sliding_window_view(trace, n_samples, axis=1)[:, starts[in_range]]
+    df_f[:, in_range] = windows
+    valid[:, in_range] = np.isfinite(windows).all(axis=2)
+
+    return df_f, time_axis, valid
+
+
+def collect_trials(
+    labels: np.ndarray,
+    event_times: np.ndarray,
+    df_f: np.ndarray,
+    time_axis: np.ndarray,
+    valid: np.ndarray
+) -> Dict[str, Any]:
+    """
+    汇总批量计算结果为 {'df_f', 'time_axis', 'trial_ids'}，并记录被跳过的事件
+
+    Raises:
+        ValueError: 没有任何有效试次
+    """
+    for i in np.flatnonzero(~valid):
+        logger.warning(f"Failed to process event {i} at {event_times[i]}s: window out of recording range or masked")
+
+    if len(df_f) == 0:
+        raise ValueError("No valid trials could be processed")
+
+    trial_ids = [f"trial_{i}_{labels[i]}" for i in np.flatnonzero(valid)]
+
+    return {
+        'df_f': df_f,
+        'time_axis': time_axis,
+        'trial_ids': trial_ids
+    }
+
+
+def calculate_df_f(
+    channel: Channel,
+    events: Union[EventTable, List[LabelEvent]],
+    baseline_window: Tuple[float, float],
+    response_window: Tuple[float, float],
+    fps: float,
+    event_filter: Optional[List[str]] = None,
+    algorithm: str = "zscore",
+    rolling: Optional[RollingBaseline] = None
+) -> Dict[str, np.ndarray]:
+    """
+    计算 ΔF/F
+    
+    Args:
+        channel: 通道数据
+        events: 事件表（或事件列表）
         baseline_window: 基线窗口 (start, end) 相对于事件时间
         response_window: 响应窗口
         fps: 采样率
         event_filter: 仅处理指定标签的事件
-        algorithm: 算法类型 "zscore" 或 "warping"
+        algorithm: 算法类型 "zscore"、"warping" 或 "rolling"
+        rolling: 滑动基线参数（rolling 算法必填）
     
     Returns:
         {
@@ -328,13 +1360,21 @@ def calculate_df_f(
             'trial_ids': List[str]
         }
     """
+    if algorithm == 'rolling':
+        # 整段归一化在块版本中实现（单通道块为视图，不拷贝）
+        return calculate_df_f_block(
+            ChannelBlock.from_channels([channel]), events, baseline_window, response_window,
+            fps, event_filter, algorithm, rolling=rolling
+        )[0]
+    
     logger.info(f"Calculating ΔF/F for channel {channel.name} using {algorithm}")
     logger.debug(f"Baseline window: {baseline_window}, Response window: {response_window}")
     
-    # 筛选事件
-    filtered_events = [e for e in events if not event_filter or e.label in event_filter]
+    # 通过标签索引筛选事件，无需线性扫描
+    table = as_event_table(events)
+    selected = table.select(event_filter)
     
-    if not filtered_events:
+    if len(selected) == 0:
         logger.warning(f"No events found matching filter {event_filter}")
         return {
             'df_f': np.array([]),
@@ -346,46 +1386,172 @@ def calculate_df_f(
     window_start = min(baseline_window[0], response_window[0])
     window_end = max(baseline_window[1], response_window[1])
     
-    df_f_list = []
-    time_axis = None
-    trial_ids = []
+    event_times = table.start_times[selected]
+
+    # 基线总扫描量超过通道长度时改用前缀和（构建后同一通道的其他标签直接复用）
+    baseline_len = int(baseline_window[1] * fps) - int(baseline_window[0] * fps)
+    use_prefix = channel.has_prefix_sums or len(event_times) * baseline_len >= len(channel.baseline_410)
+
+    # 批量计算所有试次
+    df_f_matrix, time_axis, valid = calculate_df_f_zscore_batch(
+        signal_410=channel.baseline_410,
+        signal_470=channel.signal_470,
+        fps=fps,
+        baseline_start=baseline_window[0],
+        baseline_end=baseline_window[1],
+        event_times=event_times,
+        window_start=window_start,
+        window_end=window_end,
+        prefix_sums=channel.baseline_prefix_sums() if use_prefix else None
+    )
+
+    return collect_trials(table.labels[selected], event_times, df_f_matrix, time_axis, valid)
+
+
+def calculate_df_f_block(
+    block: ChannelBlock,
+    events: Union[EventTable, List[LabelEvent]],
+    baseline_window: Tuple[float, float],
+    response_window: Tuple[float, float],
+    fps: float,
+    event_filter: Optional[List[str]] = None,
+    algorithm: str = "zscore",
+    cache: Optional[TrialCacheSession] = None,
+    cache_scope: Optional[str] = None,
+    rolling: Optional[RollingBaseline] = None
+) -> List[Dict[str, np.ndarray]]:
+    """
+    多通道 ΔF/F 计算（calculate_df_f 的块版本）
     
-    for i, event in enumerate(filtered_events):
-        event_time = event.start_time
-        
-        try:
-            df_f_trial, time_axis_trial = calculate_df_f_zscore(
-                signal_410=channel.baseline_410,
-                signal_470=channel.signal_470,
-                fps=fps,
-                baseline_start=baseline_window[0],
-                baseline_end=baseline_window[1],
-                event_time=event_time,
-                window_start=window_start,
-                window_end=window_end
+    提供 cache 与 cache_scope 时按 (作用域, 通道, 事件开始时间) 查询试次缓存，
+    只计算未命中的事件；algorithm 为 "rolling" 时使用 rolling 滑动基线参数
+    
+    Returns:
+        与 block.names 一一对应的结果列表，每项格式同 calculate_df_f
+    """
+    logger.info(f"Calculating ΔF/F for channels {block.names} using {algorithm}")
+    logger.debug(f"Baseline window: {baseline_window}, Response window: {response_window}")
+    
+    if algorithm == 'rolling' and rolling is None:
+        raise ValueError("Rolling algorithm requires rolling baseline parameters")
+    
+    table = as_event_table(events)
+    selected = table.select(event_filter)
+    
+    if len(selected) == 0:
+        logger.warning(f"No events found matching filter {event_filter}")
+        return [
+            {'df_f': np.array([]), 'time_axis': np.array([]), 'trial_ids': []}
+            for _ in block.names
+        ]
+    
+    window_start = min(baseline_window[0], response_window[0])
+    window_end = max(baseline_window[1], response_window[1])
+    
+    event_times = table.start_times[selected]
+    labels = table.labels[selected]
+    
+    baseline_len = int(baseline_window[1] * fps) - int(baseline_window[0] * fps)
+    
+    def compute(times: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if algorithm == 'rolling':
+            return calculate_df_f_rolling_block(
+                block, fps, rolling, baseline_window[0], baseline_window[1], times, window_start, window_end
             )
-            
-            df_f_list.append(df_f_trial)
-            if time_axis is None:
-                time_axis = time_axis_trial
-            
-            trial_ids.append(f"trial_{i}_{event.label}")
-            
-        except Exception as e:
-            logger.warning(f"Failed to process event {i} at {event_time}s: {e}")
-            continue
+        # 与单通道版本相同的前缀和启用条件
+        use_prefix = block.has_prefix_sums or len(times) * baseline_len >= block.n_samples
+        return calculate_df_f_zscore_block(
+            block=block,
+            fps=fps,
+            baseline_start=baseline_window[0],
+            baseline_end=baseline_window[1],
+            event_times=times,
+            window_start=window_start,
+            window_end=window_end,
+            prefix_sums=block.baseline_prefix_sums() if use_prefix else None
+        )
     
-    if not df_f_list:
-        raise ValueError("No valid trials could be processed")
+    if cache is not None and cache_scope is not None:
+        df_f, time_axis, valid = _cached_block_trials(block, event_times, cache, cache_scope, compute)
+    else:
+        df_f, time_axis, valid = compute(event_times)
+    
+    return [
+        collect_trials(labels, event_times, df_f[idx][valid[idx]], time_axis, valid[idx])
+        for idx in range(len(block))
+    ]
+
+
+def _cached_block_trials(
+    block: ChannelBlock,
+    event_times: np.ndarray,
+    cache: TrialCacheSession,
+    cache_scope: str,
+    compute
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    经试次缓存获取 (n_channels, n_events) 的试次矩阵
     
-    # 堆叠成矩阵
-    df_f_matrix = np.vstack(df_f_list)
+    任一通道未命中的事件一次批量计算，结果写回缓存；无效试次以空向量缓存
     
-    return {
-        'df_f': df_f_matrix,
-        'time_axis': time_axis,
-        'trial_ids': trial_ids
-    }
+    Returns:
+        与 calculate_df_f_zscore_block 相同的 (df_f, time_axis, valid)
+    """
+    n_channels, n_events = len(block), len(event_times)
+    keys = [(cache_scope, name, float(t)) for name in block.names for t in event_times]
+    cached = cache.lookup(keys)
+    missing = np.array([value is None for value in cached], dtype=bool).reshape(n_channels, n_events)
+    todo = np.flatnonzero(missing.any(axis=0))
+    
+    computed, time_axis, computed_valid = compute(event_times[todo])
+    
+    df_f = np.full((n_channels, n_events, len(time_axis)), np.nan, dtype=block.data_470.dtype)
+    valid = np.zeros((n_channels, n_events), dtype=bool)
+    df_f[:, todo] = computed
+    valid[:, todo] = computed_valid
+    
+    empty = np.empty(0, dtype=df_f.dtype)
+    cache.store([
+        (keys[channel_idx * n_events + event_idx], df_f[channel_idx, event_idx] if valid[channel_idx, event_idx] else empty)
+        for channel_idx, event_idx in zip(*np.nonzero(missing))
+    ])
+    
+    for channel_idx, event_idx in zip(*np.nonzero(~missing)):
+        value = cached[channel_idx * n_events + event_idx]
+        valid[channel_idx, event_idx] = len(value) > 0
+        if len(value):
+            df_f[channel_idx, event_idx] = value
+    
+    if n_events:
+        logger.debug(f"Trial cache: {int((~missing).sum())} hit(s), {int(missing.sum())} miss(es) for {block.names}")
+    return df_f, time_axis, valid
+
+
+def dataset_cache_scope(dataset: Dataset, params: AnalysisParams, algorithm: str) -> Optional[str]:
+    """
+    数据集在当前分析参数下的试次缓存作用域（文件不可读时返回 None，不使用缓存）
+    """
+    metadata = dataset.metadata or {}
+    try:
+        source_id = source_digest(dataset.fluorescence_file)
+    except OSError as e:
+        logger.warning(f"Trial cache disabled for {dataset.fluorescence_file}: {e}")
+        return None
+    
+    return make_scope(
+        source_id,
+        fps=params.fps,
+        baseline_window=params.baseline_window,
+        response_window=params.response_window,
+        algorithm=algorithm,
+        masks=metadata.get('masks'),
+        mask_mode=metadata.get('maskMode', 'remove'),
+        precision=params.precision,
+        bleach_correction=params.bleach_correction,
+        filter=params.filter_spec.to_dict() if params.filter_spec else None,
+        source_fps=metadata.get('sourceFps'),
+        rolling=params.rolling_baseline.to_dict() if algorithm == 'rolling' and params.rolling_baseline else None
+    )
 
 
 def calculate_zscore(df_f: np.ndarray) -> np.ndarray:
@@ -398,6 +1564,83 @@ def calculate_zscore(df_f: np.ndarray) -> np.ndarray:
     return zscore
 
 
+def time_warp_signals(
+    signal: np.ndarray,
+    event_groups: List[np.ndarray],
+    target_length: int = 100
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量 time warping：一次性计算所有组、所有片段的目标采样位置，
+    用一次 gather + 线性插值得到结果（与逐片段 interp1d 线性插值一致）
+    
+    Args:
+        signal: 完整信号，shape (n_samples,) 或 (n_channels, n_samples)
+        event_groups: 每组的事件时间点数组（单位：样本索引）
+        target_length: 每个片段归一化的目标长度
+    
+    Returns:
+        (warped, lengths)
+        warped: shape (..., n_groups, max_segments * target_length)，
+                各行超出自身长度的部分以末值填充
+        lengths: 每组 warped 信号的有效长度
+    """
+    n_total = signal.shape[-1]
+    n_groups = len(event_groups)
+    
+    # 收集所有组的片段 [start, end)
+    seg_group = []
+    seg_start = []
+    seg_end = []
+    for group_idx, events in enumerate(event_groups):
+        events = np.asarray(events).astype(np.int64)
+        starts, ends = events[:-1], events[1:]
+        # 与逐片段版本一致：跳过空/越界片段以及只有 1 个样本的片段
+        keep = (starts < ends) & (ends <= n_total) & (ends - starts > 1)
+        seg_group.append(np.full(int(keep.sum()), group_idx, dtype=np.int64))
+        seg_start.append(starts[keep])
+        seg_end.append(ends[keep])
+    
+    seg_group = np.concatenate(seg_group) if seg_group else np.empty(0, dtype=np.int64)
+    seg_start = np.concatenate(seg_start) if seg_start else np.empty(0, dtype=np.int64)
+    seg_end = np.concatenate(seg_end) if seg_end else np.empty(0, dtype=np.int64)
+    
+    segments_per_group = np.bincount(seg_group, minlength=n_groups)
+    lengths = np.where(segments_per_group > 0, segments_per_group * target_length, target_length)
+    width = int(lengths.max()) if n_groups else 0
+    warped = np.empty(signal.shape[:-1] + (n_groups, width), dtype=np.result_type(signal.dtype, np.float32))
+    
+    if len(seg_start):
+        # 每个片段的目标采样位置：start + t * (L - 1)，t ∈ linspace(0, 1, target_length)
+        t = np.linspace(0, 1, target_length)
+        positions = seg_start[:, None] + t[None, :] * (seg_end - seg_start - 1)[:, None]
+        left = np.minimum(np.floor(positions).astype(np.int64), (seg_end - 2)[:, None])
+        frac = (positions - left).astype(warped.dtype)
+        values = signal[..., left] * (1 - frac) + signal[..., left + 1] * frac
+        
+        # 片段在所属组内的序号，决定其在输出行中的列偏移
+        group_offsets = np.concatenate(([0], np.cumsum(segments_per_group)[:-1]))
+        seg_rank = np.arange(len(seg_group)) - group_offsets[seg_group]
+        columns = seg_rank[:, None] * target_length + np.arange(target_length)[None, :]
+        warped[..., seg_group[:, None], columns] = values
+    
+    # 没有有效片段的组：与原实现一致，取信号开头 target_length 个样本（不足补零）
+    empty_groups = np.flatnonzero(segments_per_group == 0)
+    if len(empty_groups):
+        head = signal[..., :target_length]
+        if head.shape[-1] < target_length:
+            pad = [(0, 0)] * (head.ndim - 1) + [(0, target_length - head.shape[-1])]
+            head = np.pad(head, pad)
+        warped[..., empty_groups, :target_length] = head[..., None, :]
+    
+    # 末值填充到统一宽度
+    if n_groups:
+        columns = np.arange(width)[None, :]
+        fill_from = np.minimum(columns, (lengths - 1)[:, None])
+        warped = np.take_along_axis(warped, np.broadcast_to(fill_from, warped.shape), axis=-1)
+    
+    return warped, lengths
+
+
 def time_warp_signal(
     signal: np.ndarray,
     events: List[float],
@@ -417,37 +1660,22 @@ def time_warp_signal(
     if len(events) < 2:
         return signal
     
-    warped_segments = []
-    
-    for i in range(len(events) - 1):
-        start_idx = int(events[i])
-        end_idx = int(events[i + 1])
-        
-        if start_idx >= end_idx or end_idx > len(signal):
-            continue
-        
-        segment = signal[start_idx:end_idx]
-        
-        # 使用插值将片段归一化到目标长度
-        if len(segment) > 1:
-            x_old = np.linspace(0, 1, len(segment))
-            x_new = np.linspace(0, 1, target_length)
-            f = interpolate.interp1d(x_old, segment, kind='linear', fill_value='extrapolate')
-            warped_segment = f(x_new)
-            warped_segments.append(warped_segment)
-    
-    if not warped_segments:
-        return signal[:target_length] if len(signal) >= target_length else np.pad(signal, (0, target_length - len(signal)))
-    
-    # 拼接所有归一化片段
-    warped_signal = np.concatenate(warped_segments)
-    
-    return warped_signal
+    warped, lengths = time_warp_signals(signal, [np.asarray(events)], target_length)
+    return warped[0, :lengths[0]]
+
+
+def _group_start_times(event_group: Union[np.ndarray, List[LabelEvent]]) -> np.ndarray:
+    """
+    事件组的开始时间数组（支持 LabelEvent 列表或时间数组）
+    """
+    if isinstance(event_group, np.ndarray):
+        return event_group.astype(np.float64)
+    return np.array([e.start_time for e in event_group], dtype=np.float64)
 
 
 def calculate_df_f_warping(
     channel: Channel,
-    event_groups: List[List[LabelEvent]],
+    event_groups: List[Union[np.ndarray, List[LabelEvent]]],
     fps: float,
     response_window: Tuple[float, float],
     target_segment_length: int = 100
@@ -459,7 +1687,7 @@ def calculate_df_f_warping(
     
     Args:
         channel: 通道数据
-        event_groups: 事件组列表，每组是一个事件序列
+        event_groups: 事件组列表，每组是一个事件序列（或其开始时间数组）
         fps: 采样率
         response_window: 响应窗口
         target_segment_length: 每个事件间隔归一化的目标长度
@@ -471,65 +1699,223 @@ def calculate_df_f_warping(
             'trial_ids': List[str]
         }
     """
+    return calculate_df_f_warping_block(
+        ChannelBlock.from_channels([channel]),
+        event_groups,
+        fps,
+        response_window,
+        target_segment_length
+    )[0]
+
+
+def calculate_df_f_warping_block(
+    block: ChannelBlock,
+    event_groups: List[Union[np.ndarray, List[LabelEvent]]],
+    fps: float,
+    response_window: Tuple[float, float],
+    target_segment_length: int = 100
+) -> List[Dict[str, np.ndarray]]:
+    """
+    多通道 time warping ΔF/F（calculate_df_f_warping 的块版本）
+    
+    基线校正系数、warping 插值与归一化沿通道轴一次向量化计算
+    
+    Returns:
+        与 block.names 一一对应的结果列表，每项格式同 calculate_df_f_warping
+    """
     logger.info(f"Calculating ΔF/F with time warping for {len(event_groups)} groups")
     
-    signal_410 = channel.baseline_410
-    signal_470 = channel.signal_470
+    # 计算基线校正系数（使用前10%数据作为基线，闭式最小二乘，与 np.polyfit 斜率一致）
+    baseline_len = block.n_samples // 10
+    base_410 = block.data_410[:, :baseline_len]
+    base_470 = block.data_470[:, :baseline_len]
+    finite = np.isfinite(base_410) & np.isfinite(base_470)
+    n_finite = finite.sum(axis=1, keepdims=True)
+    if (n_finite < 2).any():
+        raise ValueError("Not enough finite baseline samples to fit the isosbestic coefficient")
+    mean_410 = np.where(finite, base_410, 0.0).sum(axis=1, keepdims=True) / n_finite
+    mean_470 = np.where(finite, base_470, 0.0).sum(axis=1, keepdims=True) / n_finite
+    centered_410 = np.where(finite, base_410 - mean_410, 0.0)
+    centered_470 = np.where(finite, base_470 - mean_470, 0.0)
+    var_410 = np.einsum('ij,ij->i', centered_410, centered_410)
+    cov = np.einsum('ij,ij->i', centered_410, centered_470)
+    k = np.where(var_410 > 0, cov / np.where(var_410 > 0, var_410, 1.0), 1.0)
+    dtype = block.data_470.dtype
+    F = block.data_470 - k.astype(dtype)[:, None] * block.data_410
+    
+    # 只处理至少包含两个事件的组
+    group_ids = [group_idx for group_idx, event_group in enumerate(event_groups) if len(event_group) >= 2]
+    if not group_ids:
+        raise ValueError("No valid trial groups could be processed")
     
-    # 计算基线校正系数（使用前10%数据作为基线）
-    baseline_len = len(signal_410) // 10
-    k = np.polyfit(signal_410[:baseline_len], signal_470[:baseline_len], 1)[0]
-    F = signal_470 - k * signal_410
+    # 获取事件时间点（样本索引）
+    event_indices = [
+        (_group_start_times(event_groups[group_idx]) * fps).astype(np.int64)
+        for group_idx in group_ids
+    ]
+    
+    # 对所有通道、所有组一次性进行 warping，得到 (n_channels, n_groups, width) 末值填充张量
+    warped, lengths = time_warp_signals(F, event_indices, target_segment_length)
+    
+    # 计算归一化（使用每组 warped signal 的前20%作为基线）
+    baseline_lens = lengths // 5
+    baseline_mask = np.arange(warped.shape[-1])[None, :] < baseline_lens[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        baseline_mean = np.where(baseline_mask, warped, 0).sum(axis=-1) / baseline_lens
+        centered = np.where(baseline_mask, warped - baseline_mean[..., None], 0)
+        baseline_std = np.sqrt((centered ** 2).sum(axis=-1) / baseline_lens)
+    scale = np.where(baseline_std > 1e-10, baseline_std, 1.0).astype(dtype)
+    df_f = (warped - baseline_mean.astype(dtype)[..., None]) / scale[..., None]
+    
+    trial_ids = [f"trial_{group_idx}" for group_idx in group_ids]
+    
+    # 片段内含掩码（NaN）样本的试次剔除（与 z-score 路径一致，每个通道独立判断）
+    valid = np.isfinite(df_f).all(axis=-1)
+    for channel_idx, group_pos in zip(*np.nonzero(~valid)):
+        logger.warning(
+            f"Skipping group {group_ids[group_pos]} for channel {block.names[channel_idx]}: "
+            f"warped segment contains masked or non-finite samples"
+        )
     
-    df_f_list = []
-    trial_ids = []
+    # 归一化时间轴 (0 到 1)
+    time_axis = np.linspace(0, 1, df_f.shape[-1])
     
-    for group_idx, event_group in enumerate(event_groups):
-        if len(event_group) < 2:
-            continue
-        
-        # 获取事件时间点（样本索引）
-        event_times = [int(e.start_time * fps) for e in event_group]
-        
-        # 对信号进行 warping
-        warped_signal = time_warp_signal(F, event_times, target_segment_length)
-        
-        # 计算归一化（使用warped signal的前20%作为基线）
-        baseline_len = len(warped_signal) // 5
-        baseline_mean = np.mean(warped_signal[:baseline_len])
-        baseline_std = np.std(warped_signal[:baseline_len])
+    return [
+        {
+            'df_f': df_f[idx][valid[idx]],
+            'time_axis': time_axis,
+            'trial_ids': [trial_id for trial_id, ok in zip(trial_ids, valid[idx]) if ok]
+        }
+        for idx in range(len(block))
+    ]
+
+
+def _build_result_entries(
+    key: str,
+    df_f: np.ndarray,
+    time_axis: np.ndarray,
+    trial_ids: List[str],
+    params: Optional[AnalysisParams] = None
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]], Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    由 ΔF/F 矩阵构建热力图矩阵与均值曲线结果（按需附带 bootstrap 置信区间），
+    并返回 (key, 试次数组, 时间轴) 供置换检验直接使用
+    """
+    matrix = {
+        'key': key,
+        'heatmap': df_f.tolist(),
+        'xAxis': time_axis.tolist(),
+        'trialIds': trial_ids
+    }
+    
+    curve = None
+    if len(df_f) > 0:
+        mean_curve = np.mean(df_f, axis=0)
+        sem_curve = np.std(df_f, axis=0) / np.sqrt(len(df_f)) if len(df_f) > 1 else np.zeros_like(mean_curve)
         
-        if baseline_std > 1e-10:
-            df_f_trial = (warped_signal - baseline_mean) / baseline_std
-        else:
-            df_f_trial = warped_signal - baseline_mean
+        curve = {
+            'key': key,
+            'mean': mean_curve.tolist(),
+            'sem': sem_curve.tolist(),
+            'xAxis': time_axis.tolist()
+        }
         
-        df_f_list.append(df_f_trial)
-        trial_ids.append(f"trial_{group_idx}")
-    
-    if not df_f_list:
-        raise ValueError("No valid trial groups could be processed")
+        if params is not None and params.bootstrap_resamples > 0:
+            ci_lower, ci_upper = bootstrap_ci(
+                df_f,
+                params.bootstrap_resamples,
+                params.bootstrap_confidence,
+                curve_rng(params.bootstrap_seed, key)
+            )
+            curve['ciLower'] = ci_lower.tolist()
+            curve['ciUpper'] = ci_upper.tolist()
     
-    # 确保所有试次长度一致
-    max_len = max(len(trial) for trial in df_f_list)
-    df_f_padded = []
-    for trial in df_f_list:
-        if len(trial) < max_len:
-            padded = np.pad(trial, (0, max_len - len(trial)), mode='edge')
+    return matrix, curve, (key, df_f, time_axis)
+
+
+def _channel_cell_worker(
+    cell_func,
+    refs: Dict[str, SharedArrayRef],
+    names: Union[str, List[str]],
+    *args
+):
+    """
+    子进程入口：挂载共享内存中的通道（或多通道块）数组后执行单元计算
+    """
+    with attach_shared_arrays(refs) as arrays:
+        if isinstance(names, str):
+            source = Channel(name=names, baseline_410=arrays['410'], signal_470=arrays['470'])
         else:
-            padded = trial[:max_len]
-        df_f_padded.append(padded)
-    
-    df_f_matrix = np.vstack(df_f_padded)
+            source = ChannelBlock(names=names, data_410=arrays['410'], data_470=arrays['470'])
+        return cell_func(source, *args)
+
+
+def _execute_cells(cells: List[Tuple[Any, ...]], cell_func, params: AnalysisParams) -> List[Any]:
+    """
+    执行 (channel 或 channel_block, ...) 计算单元
     
-    # 归一化时间轴 (0 到 1)
-    time_axis = np.linspace(0, 1, max_len)
+    串行时直接调用；开启 params.parallel 时将各单元分发到进程池，
+    通道数组经共享内存传递（每个通道/块只拷贝一次），结果按 cells 顺序返回
+    """
+    if not params.parallel or len(cells) < 2:
+        return [cell_func(*cell) for cell in cells]
+    
+    logger.info(f"Running {len(cells)} analysis cells in parallel (workers={resolve_worker_count(params.max_workers)})")
+    
+    with SharedArrayPool() as pool:
+        shared = {}
+        tasks = []
+        for source, *args in cells:
+            if isinstance(source, ChannelBlock):
+                arrays, names = (source.data_410, source.data_470), list(source.names)
+            else:
+                arrays, names = (source.baseline_410, source.signal_470), source.name
+            if id(source) not in shared:
+                shared[id(source)] = {
+                    '410': pool.share(arrays[0]),
+                    '470': pool.share(arrays[1]),
+                }
+            tasks.append((cell_func, shared[id(source)], names, *args))
+        return run_in_process_pool(_channel_cell_worker, tasks, params.max_workers)
+
+
+def _warping_cell(
+    block: ChannelBlock,
+    event_sequences: List[np.ndarray],
+    group_name: str,
+    params: AnalysisParams
+) -> List[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Tuple[str, np.ndarray, np.ndarray]]]:
+    """
+    单个 (组, 数据集) 所有通道的 time warping 计算，按通道顺序返回结果条目
+    """
+    if not event_sequences:
+        for _ in block.names:
+            logger.warning(f"No valid event sequences for group '{group_name}'")
+        return []
     
-    return {
-        'df_f': df_f_matrix,
-        'time_axis': time_axis,
-        'trial_ids': trial_ids
-    }
+    try:
+        results = calculate_df_f_warping_block(
+            block=block,
+            event_groups=event_sequences,
+            fps=params.fps,
+            response_window=params.response_window if params.response_window else (0, 6),
+            target_segment_length=100
+        )
+    except Exception as e:
+        for channel_name in block.names:
+            logger.error(f"Error processing group '{group_name}' for channel {channel_name}: {e}")
+        return []
+    
+    return [
+        _build_result_entries(
+            f"{channel_name}/{group_name}",
+            result['df_f'],
+            result['time_axis'],
+            result['trial_ids'],
+            params
+        )
+        for channel_name, result in zip(block.names, results)
+    ]
 
 
 def time_warp_alignment(
@@ -550,9 +1936,10 @@ def time_warp_alignment(
     """
     logger.info(f"Time warping alignment for {len(groups)} groups")
     
-    matrices = []
-    curves = []
+    # 每个数据集的事件表只构建一次，各组复用其时间索引
+    event_tables = [as_event_table(dataset.events) for dataset in datasets]
     
+    cells = []
     for group in groups:
         group_name = group.get('groupName') or group.get('name')
         event_labels = group.get('events', [])
@@ -560,76 +1947,159 @@ def time_warp_alignment(
         logger.debug(f"Processing group '{group_name}' with events: {event_labels}")
         
         # 遍历每个数据集
-        for dataset in datasets:
-            # 为每个组筛选事件并组织成序列
-            event_sequences = []
-            
+        for dataset_idx, dataset in enumerate(datasets):
             # 找出符合当前组定义的事件序列
-            # 简化策略：将所有匹配标签的连续事件作为一个序列
-            current_sequence = []
-            for event in sorted(dataset.events, key=lambda e: e.start_time):
-                if event.label in event_labels:
-                    current_sequence.append(event)
-                else:
-                    if len(current_sequence) >= 2:
-                        event_sequences.append(current_sequence)
-                    current_sequence = []
-            
-            if len(current_sequence) >= 2:
-                event_sequences.append(current_sequence)
+            # 简化策略：将所有匹配标签的连续事件作为一个序列（基于事件表的时间索引）
+            table = event_tables[dataset_idx]
+            event_sequences = [
+                table.start_times[indices]
+                for indices in table.label_sequences(event_labels, min_length=2)
+            ]
             
-            for channel in dataset.channels:
-                if not event_sequences:
-                    logger.warning(f"No valid event sequences for group '{group_name}'")
-                    continue
-                
-                try:
-                    result = calculate_df_f_warping(
-                        channel=channel,
-                        event_groups=event_sequences,
-                        fps=params.fps,
-                        response_window=params.response_window if params.response_window else (0, 6),
-                        target_segment_length=100
-                    )
-                    
-                    df_f = result['df_f']
-                    time_axis = result['time_axis']
-                    trial_ids = result['trial_ids']
-                    
-                    # 添加矩阵
-                    matrices.append({
-                        'key': f"{channel.name}/{group_name}",
-                        'heatmap': df_f.tolist(),
-                        'xAxis': time_axis.tolist(),
-                        'trialIds': trial_ids
-                    })
-                    
-                    # 添加曲线
-                    if len(df_f) > 0:
-                        mean_curve = np.mean(df_f, axis=0)
-                        sem_curve = np.std(df_f, axis=0) / np.sqrt(len(df_f)) if len(df_f) > 1 else np.zeros_like(mean_curve)
-                        
-                        curves.append({
-                            'key': f"{channel.name}/{group_name}",
-                            'mean': mean_curve.tolist(),
-                            'sem': sem_curve.tolist(),
-                            'xAxis': time_axis.tolist()
-                        })
-                
-                except Exception as e:
-                    logger.error(f"Error processing group '{group_name}' for channel {channel.name}: {e}")
-                    continue
+            # 数据集的所有通道作为一个块一次计算
+            cells.append((as_channel_block(dataset), event_sequences, group_name, params))
+    
+    matrices = []
+    curves = []
+    trials = []
+    for block_entries in _execute_cells(cells, _warping_cell, params):
+        for matrix, curve, trial_set in block_entries:
+            matrices.append(matrix)
+            trials.append(trial_set)
+            if curve is not None:
+                curves.append(curve)
     
     return AnalysisResult(
         matrices=matrices,
         curves=curves,
+        trials=trials,
         metadata={'mode': 'multi', 'groups': [g.get('groupName') or g.get('name') for g in groups]}
     )
 
 
+def _single_event_cell(
+    block: ChannelBlock,
+    events: EventTable,
+    event_label: str,
+    params: AnalysisParams,
+    algorithm: str,
+    cache: Optional[TrialCacheSession] = None,
+    cache_scope: Optional[str] = None
+) -> List[Tuple[Any, Optional[TrialSummary], Optional[Dict[str, Any]]]]:
+    """
+    单个 (数据集, 事件标签) 所有通道的 ΔF/F 计算，
+    按通道顺序返回 (结果条目, 试次累加量, 响应指标表)
+    """
+    results = calculate_df_f_block(
+        block=block,
+        events=events,
+        baseline_window=params.baseline_window,
+        response_window=params.response_window,
+        fps=params.fps,
+        event_filter=[event_label],
+        algorithm=algorithm,
+        cache=cache,
+        cache_scope=cache_scope,
+        rolling=params.rolling_baseline
+    )
+    
+    return [
+        (
+            single_event_entries(channel_name, event_label, result, params, algorithm),
+            single_event_summary(channel_name, event_label, result, params, algorithm),
+            single_event_metrics(channel_name, event_label, result, params, algorithm)
+        )
+        for channel_name, result in zip(block.names, results)
+    ]
+
+
+def single_event_entries(
+    channel_name: str,
+    event_label: str,
+    result: Dict[str, Any],
+    params: AnalysisParams,
+    algorithm: str
+) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Tuple[str, np.ndarray, np.ndarray]]]:
+    """
+    将单事件 ΔF/F 结果转换为矩阵与曲线条目（内存与流式路径共用）
+    """
+    df_f = result['df_f']
+    time_axis = result['time_axis']
+    trial_ids = result['trial_ids']
+    
+    if len(df_f) == 0:
+        logger.warning(f"No data for {channel_name}/{event_label}")
+        return None
+    
+    return _build_result_entries(
+        f"{channel_name}/{event_label}", _output_df_f(df_f, params, algorithm), time_axis, trial_ids, params
+    )
+
+
+def _output_df_f(df_f: np.ndarray, params: AnalysisParams, algorithm: str) -> np.ndarray:
+    """
+    输出用的 ΔF/F 矩阵（按需额外计算 z-score；zscore 与 rolling 的结果本身已是 z 值）
+    """
+    if params.output_zscore and algorithm not in ('zscore', 'rolling'):
+        return calculate_zscore(df_f)
+    return df_f
+
+
+def single_event_metrics(
+    channel_name: str,
+    event_label: str,
+    result: Dict[str, Any],
+    params: AnalysisParams,
+    algorithm: str
+) -> Optional[Dict[str, Any]]:
+    """
+    单个 (通道, 事件) 的逐试次响应指标表（未开启或没有试次时返回 None）
+    """
+    if params.metric_windows is None or len(result['df_f']) == 0:
+        return None
+    
+    key = f"{channel_name}/{event_label}"
+    df_f = _output_df_f(result['df_f'], params, algorithm)
+    windows = []
+    for name, start, end in params.metric_windows:
+        metrics = window_metrics(df_f, result['time_axis'], (start, end), params.fps)
+        if metrics is None:
+            logger.warning(f"Metric window '{name}' ({start}, {end}) has no samples for {key}")
+            continue
+        windows.append({
+            'name': name,
+            'start': start,
+            'end': end,
+            **{metric: values.tolist() for metric, values in metrics.items()}
+        })
+    
+    return {'key': key, 'trialIds': result['trial_ids'], 'windows': windows}
+
+
+def single_event_summary(
+    channel_name: str,
+    event_label: str,
+    result: Dict[str, Any],
+    params: AnalysisParams,
+    algorithm: str,
+    dataset_idx: int = -1
+) -> Optional[TrialSummary]:
+    """
+    队列聚合所需的试次累加量（未开启聚合或没有试次时返回 None）
+    
+    dataset_idx 由调用方在汇总时填写
+    """
+    if params.cohort_weighting is None or len(result['df_f']) == 0:
+        return None
+    return TrialSummary.from_trials(
+        dataset_idx, channel_name, event_label, _output_df_f(result['df_f'], params, algorithm), result['time_axis']
+    )
+
+
 def analyze_single_event(
     datasets: List[Dataset],
-    params: AnalysisParams
+    params: AnalysisParams,
+    trial_cache: Optional[TrialCacheSession] = None
 ) -> AnalysisResult:
     """
     单事件模式分析
@@ -637,6 +2107,7 @@ def analyze_single_event(
     Args:
         datasets: 数据集列表
         params: 分析参数
+        trial_cache: 可选的试次缓存会话，命中/未命中次数写入结果 metadata
     
     Returns:
         分析结果
@@ -647,60 +2118,275 @@ def analyze_single_event(
     # 确定算法类型
     algorithm = getattr(params, 'algorithm_type', 'zscore')
     
+    # 缓存位于父进程内存中，进程池执行时不使用
+    if trial_cache is not None and params.parallel:
+        logger.info("Trial cache is not used in parallel mode")
+        trial_cache = None
+    
+    # 每个 (数据集, 事件类型) 为一个独立计算单元，单元内所有通道作为一个块一次计算
+    cells = []
+    for dataset in datasets:
+        # 事件表按标签建立索引，每个标签的筛选为 O(k)
+        events = as_event_table(dataset.events)
+        block = as_channel_block(dataset)
+        cache_scope = dataset_cache_scope(dataset, params, algorithm) if trial_cache is not None else None
+        for event_label in params.events:
+            cells.append((block, events, event_label, params, algorithm, trial_cache, cache_scope))
+    
+    cell_results = _execute_cells(cells, _single_event_cell, params)
+    
+    # 按 数据集 → 通道 → 事件类型 的顺序输出
     matrices = []
     curves = []
+    trials = []
+    summaries = []
+    metrics = []
+    n_labels = len(params.events)
+    for dataset_idx, dataset in enumerate(datasets):
+        dataset_results = cell_results[dataset_idx * n_labels:(dataset_idx + 1) * n_labels]
+        for channel_idx in range(len(as_channel_block(dataset))):
+            for label_results in dataset_results:
+                entries, summary, table = label_results[channel_idx]
+                if table is not None:
+                    metrics.append(table)
+                if summary is not None:
+                    summary.dataset_idx = dataset_idx
+                    summaries.append(summary)
+                if entries is None:
+                    continue
+                matrix, curve, trial_set = entries
+                matrices.append(matrix)
+                trials.append(trial_set)
+                if curve is not None:
+                    curves.append(curve)
     
-    # 遍历每个数据集
-    for dataset in datasets:
-        for channel in dataset.channels:
-            # 对每个事件类型分别计算
-            for event_label in params.events:
-                result = calculate_df_f(
-                    channel=channel,
-                    events=dataset.events,
-                    baseline_window=params.baseline_window,
-                    response_window=params.response_window,
-                    fps=params.fps,
-                    event_filter=[event_label],
-                    algorithm=algorithm
-                )
-                
-                df_f = result['df_f']
-                time_axis = result['time_axis']
-                trial_ids = result['trial_ids']
-                
+    metadata = {'mode': 'single', 'events': params.events, 'algorithm': algorithm}
+    if trial_cache is not None:
+        metadata['trialCache'] = trial_cache.stats()
+    
+    return AnalysisResult(
+        matrices=matrices,
+        curves=curves,
+        metadata=metadata,
+        cohort=cohort_curves(summaries, datasets, params),
+        metrics=metrics,
+        trials=trials
+    )
+
+
+def cohort_curves(
+    summaries: List[TrialSummary],
+    datasets: List[Dataset],
+    params: AnalysisParams
+) -> List[Dict[str, Any]]:
+    """
+    按 params 的聚合设置计算队列曲线（未开启时返回空列表）
+    """
+    if params.cohort_weighting is None:
+        return []
+    return aggregate_cohort(
+        summaries,
+        datasets,
+        weighting=params.cohort_weighting,
+        group_by=params.cohort_group_by,
+        labels=params.events
+    )
+
+
+def window_metrics(
+    df_f: np.ndarray,
+    time_axis: np.ndarray,
+    window: Tuple[float, float],
+    fps: float
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    所有试次在 [start, end) 窗口内的响应指标（一次数组运算）
+    
+    Args:
+        df_f: shape (n_trials, n_samples)
+        time_axis: 时间轴
+        window: (start, end) 相对事件的时间（秒）
+        fps: 采样率（梯形积分步长 1/fps）
+    
+    Returns:
+        {'peak', 'peakTime', 'auc', 'mean'}，各为 shape (n_trials,)；窗口内没有样本时返回 None
+    """
+    in_window = (time_axis >= window[0]) & (time_axis < window[1])
+    if not in_window.any():
+        return None
+    
+    values = df_f[:, in_window]
+    times = time_axis[in_window]
+    peak_idx = np.argmax(values, axis=1)
+    
+    # 等间距梯形积分
+    if values.shape[1] > 1:
+        auc = (values[:, 1:] + values[:, :-1]).sum(axis=1) / (2 * fps)
+    else:
+        auc = np.zeros(len(values), dtype=values.dtype)
+    
+    return {
+        'peak': values[np.arange(len(values)), peak_idx],
+        'peakTime': times[peak_idx],
+        'auc': auc,
+        'mean': values.mean(axis=1)
+    }
+
+
+def summarize_response(
+    mean_curve: np.ndarray,
+    time_axis: np.ndarray,
+    response_window: Tuple[float, float],
+    fps: float
+) -> Dict[str, Optional[float]]:
+    """
+    均值曲线在响应窗口内的峰值、峰值时间与曲线下面积
+    """
+    metrics = window_metrics(mean_curve[None, :], time_axis, response_window, fps)
+    if metrics is None:
+        return {'peak': None, 'peakTime': None, 'auc': None}
+    
+    return {name: float(metrics[name][0]) for name in ('peak', 'peakTime', 'auc')}
+
+
+def _sweep_cell(
+    block: ChannelBlock,
+    events: EventTable,
+    params: AnalysisParams,
+    algorithm: str
+) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Tuple[str, np.ndarray, np.ndarray]]]]:
+    """
+    单个数据集所有 (通道, 事件标签) 在所有扫描窗口上的计算
+    
+    多通道块的基线前缀和在各标签、各窗口间共享（并行时每个数据集只构建一次），
+    每个窗口的基线统计为 O(1)；rolling 算法的整段归一化曲线同样只计算一次，各窗口仅切片
+    
+    Returns:
+        (summaries, full_entries)，按 通道 → 事件标签 → 窗口 的顺序
+    """
+    full_results = set(params.sweep_full_results or [])
+    prefix_sums = None if algorithm == 'rolling' else block.baseline_prefix_sums()
+    
+    # outputs[标签下标][通道下标] = (summaries, full_entries)
+    outputs = [[([], []) for _ in block.names] for _ in params.events]
+    for label_idx, event_label in enumerate(params.events):
+        selected = events.select([event_label])
+        event_times = events.start_times[selected]
+        labels = events.labels[selected]
+        if len(selected) == 0:
+            logger.warning(f"No events found matching filter {[event_label]}")
+            continue
+        
+        for window_idx, (baseline_window, response_window) in enumerate(params.sweep_windows):
+            window_start = min(baseline_window[0], response_window[0])
+            window_end = max(baseline_window[1], response_window[1])
+            try:
+                if algorithm == 'rolling':
+                    df_f_block, time_axis, valid_block = calculate_df_f_rolling_block(
+                        block, params.fps, params.rolling_baseline, baseline_window[0], baseline_window[1],
+                        event_times, window_start, window_end
+                    )
+                else:
+                    df_f_block, time_axis, valid_block = calculate_df_f_zscore_block(
+                        block, params.fps, baseline_window[0], baseline_window[1],
+                        event_times, window_start, window_end, prefix_sums=prefix_sums
+                    )
+            except ValueError as e:
+                logger.warning(f"Skipping sweep window {window_idx} for {event_label}: {e}")
+                continue
+            
+            for channel_idx, name in enumerate(block.names):
+                key = f"{name}/{event_label}"
+                valid = valid_block[channel_idx]
+                df_f = df_f_block[channel_idx][valid]
                 if len(df_f) == 0:
-                    logger.warning(f"No data for {channel.name}/{event_label}")
+                    logger.warning(f"No valid trials for {key} in sweep window {window_idx}")
                     continue
                 
-                # 是否额外计算 z-score
-                if params.output_zscore and algorithm != 'zscore':
+                if params.output_zscore and algorithm not in ('zscore', 'rolling'):
                     df_f = calculate_zscore(df_f)
                 
-                # 添加矩阵
-                matrices.append({
-                    'key': f"{channel.name}/{event_label}",
-                    'heatmap': df_f.tolist(),
+                summaries, full_entries = outputs[label_idx][channel_idx]
+                mean_curve = np.mean(df_f, axis=0)
+                summary = {
+                    'windowIndex': window_idx,
+                    'key': key,
+                    'baselineWindow': {'start': baseline_window[0], 'end': baseline_window[1]},
+                    'responseWindow': {'start': response_window[0], 'end': response_window[1]},
+                    'nTrials': int(len(df_f)),
+                    'mean': mean_curve.tolist(),
                     'xAxis': time_axis.tolist(),
-                    'trialIds': trial_ids
-                })
+                }
+                summary.update(summarize_response(mean_curve, time_axis, response_window, params.fps))
+                summaries.append(summary)
                 
-                # 添加曲线
-                if len(df_f) > 0:
-                    mean_curve = np.mean(df_f, axis=0)
-                    sem_curve = np.std(df_f, axis=0) / np.sqrt(len(df_f)) if len(df_f) > 1 else np.zeros_like(mean_curve)
-                    
-                    curves.append({
-                        'key': f"{channel.name}/{event_label}",
-                        'mean': mean_curve.tolist(),
-                        'sem': sem_curve.tolist(),
-                        'xAxis': time_axis.tolist()
-                    })
+                if window_idx in full_results:
+                    trial_ids = [f"trial_{i}_{labels[i]}" for i in np.flatnonzero(valid)]
+                    full_entries.append(_build_result_entries(f"{key}@{window_idx}", df_f, time_axis, trial_ids, params))
+    
+    summaries, full_entries = [], []
+    for channel_idx in range(len(block)):
+        for label_outputs in outputs:
+            summaries.extend(label_outputs[channel_idx][0])
+            full_entries.extend(label_outputs[channel_idx][1])
+    return summaries, full_entries
+
+
+def analyze_window_sweep(
+    datasets: List[Dataset],
+    params: AnalysisParams
+) -> AnalysisResult:
+    """
+    单事件模式的窗口参数扫描
+    
+    在一个任务内对 params.sweep_windows 中的每组 (基线窗口, 响应窗口) 计算
+    每个 (通道, 事件) 的均值曲线、峰值与 AUC；
+    仅 params.sweep_full_results 指定的窗口返回完整矩阵与曲线（key 后缀 "@窗口下标"）。
+    每个数据集的多通道块与基线前缀和只加载/计算一次，供所有标签与窗口复用。
+    
+    Args:
+        datasets: 数据集列表
+        params: 分析参数
+    
+    Returns:
+        分析结果（sweep 字段为各窗口摘要）
+    """
+    logger.info(f"Window sweep over {len(params.sweep_windows)} window pair(s) for {len(datasets)} dataset(s)")
+    
+    algorithm = getattr(params, 'algorithm_type', 'zscore')
+    
+    # 每个数据集的所有通道与事件标签作为一个单元（多通道块，前缀和只构建一次）
+    cells = [
+        (as_channel_block(dataset), as_event_table(dataset.events), params, algorithm)
+        for dataset in datasets
+    ]
+    
+    matrices = []
+    curves = []
+    trials = []
+    sweep = []
+    for summaries, full_entries in _execute_cells(cells, _sweep_cell, params):
+        sweep.extend(summaries)
+        for matrix, curve, trial_set in full_entries:
+            matrices.append(matrix)
+            trials.append(trial_set)
+            if curve is not None:
+                curves.append(curve)
+    
+    # 按窗口下标稳定排序，便于前端按窗口分组展示
+    sweep.sort(key=lambda item: item['windowIndex'])
     
     return AnalysisResult(
         matrices=matrices,
         curves=curves,
-        metadata={'mode': 'single', 'events': params.events, 'algorithm': algorithm}
+        metadata={
+            'mode': 'single',
+            'events': params.events,
+            'algorithm': algorithm,
+            'sweepWindows': len(params.sweep_windows)
+        },
+        sweep=sweep,
+        trials=trials
     )
 
 
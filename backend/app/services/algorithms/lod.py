@@ -0,0 +1,167 @@
+"""
+结果多分辨率（LOD）降采样
+- 热力图：沿时间轴均值池化
+- 曲线（均值曲线、扫描摘要、队列曲线）：按区间保留均值曲线的最小/最大点（保留峰值形状），
+  sem、置信区间与 xAxis 取相同位置
+- 置换检验：按区间保留 t 值的最小/最大点，p 值与 xAxis 取相同位置，簇下标映射到降采样后的时间轴
+金字塔第 k 级的池化因子为 2^k，第 0 级即全分辨率
+降采样结果为 ndarray（数值按结果精度 dtype 输出，xAxis 为 float64）
+"""
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+# 金字塔最粗一级的最小宽度
+LOD_MIN_WIDTH = 64
+
+
+def lod_factors(full_width: int, min_width: int = LOD_MIN_WIDTH) -> List[int]:
+    """
+    金字塔各级（不含全分辨率）的池化因子：2, 4, 8, ...，直到宽度低于 min_width
+    """
+    factors = []
+    factor = 2
+    while math.ceil(full_width / factor) >= min_width:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def choose_lod_factor(full_width: int, target_width: int) -> int:
+    """
+    选择使宽度不超过 target_width 的最细一级；target_width <= 0 表示全分辨率
+    """
+    if target_width <= 0 or full_width <= target_width:
+        return 1
+    factors = lod_factors(full_width)
+    for factor in factors:
+        if math.ceil(full_width / factor) <= target_width:
+            return factor
+    return factors[-1] if factors else 1
+
+
+def _bin_starts(width: int, factor: int) -> np.ndarray:
+    return np.arange(0, width, factor)
+
+
+def mean_pool(values: np.ndarray, factor: int) -> np.ndarray:
+    """
+    沿最后一维按 factor 个样本一组求均值（末尾不足一组的按实际样本数平均）
+    """
+    if factor <= 1 or values.shape[-1] == 0:
+        return values
+    starts = _bin_starts(values.shape[-1], factor)
+    counts = np.diff(np.append(starts, values.shape[-1]))
+    return np.add.reduceat(values, starts, axis=-1) / counts
+
+
+def minmax_indices(values: np.ndarray, factor: int) -> np.ndarray:
+    """
+    按 2 * factor 个样本分区，返回每个区间最小值与最大值的位置（升序、去重）
+    输出点数约为 len(values) / factor
+    """
+    n = len(values)
+    if factor <= 1 or n == 0:
+        return np.arange(n)
+
+    bin_size = 2 * factor
+    n_bins = math.ceil(n / bin_size)
+    padded = np.full(n_bins * bin_size, np.nan)
+    padded[:n] = values
+    bins = padded.reshape(n_bins, bin_size)
+    # 末尾区间的填充位置不参与比较
+    offsets = np.arange(n_bins) * bin_size
+    lows = offsets + np.argmin(np.where(np.isnan(bins), np.inf, bins), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(bins), -np.inf, bins), axis=1)
+    return np.unique(np.concatenate((lows, highs)))
+
+
+def downsample_matrix(matrix: Dict[str, Any], factor: int, dtype: str = 'float64') -> Dict[str, Any]:
+    """
+    热力图矩阵降采样（试次维不变）
+    """
+    if factor <= 1:
+        return matrix
+    heatmap = np.asarray(matrix['heatmap'], dtype=float)
+    x_axis = np.asarray(matrix['xAxis'], dtype=float)
+    if heatmap.ndim != 2:
+        heatmap = heatmap.reshape(len(heatmap), -1)
+    return {
+        **matrix,
+        'heatmap': mean_pool(heatmap, factor).astype(dtype),
+        'xAxis': mean_pool(x_axis, factor),
+    }
+
+
+def downsample_curve(curve: Dict[str, Any], factor: int, dtype: str = 'float64') -> Dict[str, Any]:
+    """
+    均值曲线降采样（保留最小/最大点）
+    """
+    if factor <= 1:
+        return curve
+    mean = np.asarray(curve['mean'], dtype=float)
+    indices = minmax_indices(mean, factor)
+    downsampled = {
+        **curve,
+        'mean': mean[indices].astype(dtype),
+        'xAxis': np.asarray(curve['xAxis'], dtype=float)[indices],
+    }
+    for band in ('sem', 'ciLower', 'ciUpper'):
+        if curve.get(band) is not None:
+            downsampled[band] = np.asarray(curve[band], dtype=float)[indices].astype(dtype)
+    return downsampled
+
+
+def downsample_comparison(comparison: Dict[str, Any], factor: int, dtype: str = 'float64') -> Dict[str, Any]:
+    """
+    置换检验结果降采样（保留 t 值的最小/最大点，簇下标映射到保留的时间点）
+    """
+    if factor <= 1:
+        return comparison
+    t_values = np.asarray(comparison['tValues'], dtype=float)
+    indices = minmax_indices(t_values, factor)
+    last = max(len(indices) - 1, 0)
+    clusters = []
+    for cluster in comparison.get('clusters', []):
+        start = min(int(np.searchsorted(indices, cluster['startIndex'], side='left')), last)
+        end = int(np.searchsorted(indices, cluster['endIndex'], side='right')) - 1
+        clusters.append({**cluster, 'startIndex': start, 'endIndex': max(end, start)})
+    return {
+        **comparison,
+        'tValues': t_values[indices].astype(dtype),
+        'pValues': np.asarray(comparison['pValues'], dtype=float)[indices].astype(dtype),
+        'xAxis': np.asarray(comparison['xAxis'], dtype=float)[indices],
+        'clusters': clusters,
+    }
+
+
+# 结果中沿时间轴的数组字段
+TIME_AXIS_FIELDS = ('matrices', 'curves', 'sweep', 'cohort', 'statistics')
+
+
+def result_width(data: Dict[str, Any]) -> int:
+    """
+    结果中最宽的时间轴长度
+    """
+    widths = [len(entry['xAxis']) for field in TIME_AXIS_FIELDS for entry in data.get(field) or []]
+    return max(widths) if widths else 0
+
+
+def downsample_result(data: Dict[str, Any], factor: int, dtype: str = 'float64') -> Dict[str, Any]:
+    """
+    按同一池化因子降采样结果中全部沿时间轴的数组（矩阵、曲线、扫描摘要、队列曲线与置换检验）
+
+    Returns:
+        降采样后的结果字典（lodFactor 为 factor）
+    """
+    return {
+        **data,
+        'matrices': [downsample_matrix(matrix, factor, dtype) for matrix in data.get('matrices') or []],
+        'curves': [downsample_curve(curve, factor, dtype) for curve in data.get('curves') or []],
+        'sweep': [downsample_curve(item, factor, dtype) for item in data.get('sweep') or []],
+        'cohort': [downsample_curve(item, factor, dtype) for item in data.get('cohort') or []],
+        'statistics': [downsample_comparison(item, factor, dtype) for item in data.get('statistics') or []],
+        'lodFactor': factor,
+    }
@@ -0,0 +1,158 @@
+"""
+算法层并行执行工具
+- 通道数组放入共享内存，子进程按名称挂载，避免逐任务 pickle 大数组
+- 进程池按提交顺序返回结果，保证输出顺序确定
+- 工作进程以 forkserver（不可用时 spawn）启动，不继承父进程的线程与锁；
+  process_pool 块内的各并行阶段复用同一个进程池
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# forkserver 启动时预先导入的模块（各工作进程由其 fork，无需各自重新导入）
+WORKER_PRELOAD_MODULES = [
+    'app.services.algorithms.fluorescence_algo',
+    'app.services.algorithms.permutation',
+]
+
+_active_executor: ContextVar[Optional[ProcessPoolExecutor]] = ContextVar('active_executor', default=None)
+
+
+@dataclass(frozen=True)
+class SharedArrayRef:
+    """共享内存数组引用（可 pickle，传给子进程）"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedArrayPool:
+    """
+    共享内存数组池
+    在 with 块内创建的共享内存会在退出时统一释放
+    """
+
+    def __init__(self):
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+    def share(self, array: np.ndarray) -> SharedArrayRef:
+        """
+        将数组拷贝到新的共享内存块并返回引用
+        """
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        self._blocks.append(block)
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        return SharedArrayRef(name=block.name, shape=array.shape, dtype=array.dtype.str)
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> 'SharedArrayPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextmanager
+def attach_shared_arrays(refs: Dict[str, SharedArrayRef]) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    在子进程中挂载共享内存数组（只读视图），退出时断开
+    """
+    blocks = []
+    arrays = {}
+    try:
+        for key, ref in refs.items():
+            # track=False：由父进程负责 unlink，避免子进程的资源跟踪器提前回收
+            try:
+                block = shared_memory.SharedMemory(name=ref.name, track=False)
+            except TypeError:  # Python < 3.13 不支持 track 参数
+                block = shared_memory.SharedMemory(name=ref.name)
+            blocks.append(block)
+            array = np.ndarray(ref.shape, dtype=np.dtype(ref.dtype), buffer=block.buf)
+            array.flags.writeable = False
+            arrays[key] = array
+        yield arrays
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def resolve_worker_count(max_workers: Optional[int] = None) -> int:
+    """
+    解析工作进程数：未指定时使用 CPU 核数
+    """
+    if max_workers and max_workers > 0:
+        return max_workers
+    return os.cpu_count() or 1
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """
+    进程池启动方式：forkserver 优先，否则 spawn
+    不使用 fork：在 FastAPI 线程池中 fork 会复制其他线程持有的锁（如 logging 锁），子进程可能死锁
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(WORKER_PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+@contextmanager
+def process_pool(max_workers: Optional[int] = None) -> Iterator[ProcessPoolExecutor]:
+    """
+    在 with 块内共用同一个进程池（工作进程按需启动）；
+    块内的 run_in_process_pool 调用均提交到该进程池，不再各自创建
+    """
+    executor = ProcessPoolExecutor(max_workers=resolve_worker_count(max_workers), mp_context=_pool_context())
+    token = _active_executor.set(executor)
+    try:
+        yield executor
+    finally:
+        _active_executor.reset(token)
+        executor.shutdown()
+
+
+def run_in_process_pool(
+    func: Callable[..., Any],
+    tasks: Sequence[Tuple[Any, ...]],
+    max_workers: Optional[int] = None
+) -> List[Any]:
+    """
+    在进程池中执行任务，按 tasks 顺序返回结果
+
+    Args:
+        func: 模块级函数（需可 pickle，所在模块可在工作进程中单独导入）
+        tasks: 每个任务的位置参数元组
+        max_workers: 工作进程数，默认 CPU 核数（在 process_pool 块内时使用该进程池）
+
+    Returns:
+        与 tasks 一一对应的结果列表；任一任务抛出的异常会在此重新抛出
+    """
+    if not tasks:
+        return []
+
+    executor = _active_executor.get()
+    if executor is not None:
+        futures = [executor.submit(func, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+    workers = min(resolve_worker_count(max_workers), len(tasks))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+        futures = [executor.submit(func, *task) for task in tasks]
+        return [future.result() for future in futures]
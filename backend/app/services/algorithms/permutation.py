@@ -0,0 +1,317 @@
+"""
+条件间置换检验（cluster-based permutation test）
+- 统计量：逐时间点 Welch t 值；簇形成阈值取 Welch–Satterthwaite 自由度（由观测方差计算）下的 t 分位数
+- 每批置换生成 (batch, n_trials) 的 0/1 分组矩阵，与合并试次矩阵（及其平方）相乘一次
+  得到该批全部置换的组内和与平方和
+- 簇质量：超过阈值且符号相同的连续时间点 |t| 之和；以每次置换的最大簇质量作为零分布
+- 置换按固定大小分成任务，每个任务的随机数流由 (seed, 任务序号) 派生，
+  串行与进程池并行结果一致
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import stats
+
+from app.constants import PERMUTATION_CHUNK_MB
+from app.services.algorithms.parallel import (
+    SharedArrayPool,
+    SharedArrayRef,
+    attach_shared_arrays,
+    run_in_process_pool,
+)
+from app.utils.logger import algo_logger as logger
+
+
+# 每个置换任务的置换次数（决定随机数流的划分，与工作进程数无关）
+PERMUTATION_TASK_SIZE = 1000
+
+
+def welch_t(
+    sum_a: np.ndarray,
+    sumsq_a: np.ndarray,
+    sum_b: np.ndarray,
+    sumsq_b: np.ndarray,
+    n_a: int,
+    n_b: int
+) -> np.ndarray:
+    """
+    由组内和与平方和计算 Welch t 值（方差为 0 的位置记为 0）
+    """
+    mean_a = sum_a / n_a
+    mean_b = sum_b / n_b
+    var_a = np.maximum(sumsq_a - sum_a * mean_a, 0.0) / (n_a - 1)
+    var_b = np.maximum(sumsq_b - sum_b * mean_b, 0.0) / (n_b - 1)
+    denom = np.sqrt(var_a / n_a + var_b / n_b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_values = (mean_a - mean_b) / denom
+    return np.where(denom > 0, t_values, 0.0)
+
+
+def welch_df(trials_a: np.ndarray, trials_b: np.ndarray) -> float:
+    """
+    Welch–Satterthwaite 自由度（两条件各自的方差取全部时间点的均值）
+
+    两组方差均为 0 时退化为 n_a + n_b - 2
+    """
+    n_a, n_b = len(trials_a), len(trials_b)
+    scaled_a = float(np.var(trials_a, axis=0, ddof=1).mean()) / n_a
+    scaled_b = float(np.var(trials_b, axis=0, ddof=1).mean()) / n_b
+    denom = scaled_a ** 2 / (n_a - 1) + scaled_b ** 2 / (n_b - 1)
+    if denom <= 0:
+        return float(n_a + n_b - 2)
+    return (scaled_a + scaled_b) ** 2 / denom
+
+
+def max_cluster_mass(t_values: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    每行（每次置换）的最大簇质量
+
+    连续超阈值段的累加和 = 累积和 - 段起点前的累积和（累积和单调不减，
+    段起点前的值可用 maximum.accumulate 向前传播）
+    """
+    masses = np.zeros(t_values.shape[:-1], dtype=t_values.dtype)
+    for signed in (t_values, -t_values):
+        supra = np.where(signed > threshold, signed, 0.0)
+        cumulative = np.cumsum(supra, axis=-1)
+        base = np.maximum.accumulate(np.where(supra == 0, cumulative, 0.0), axis=-1)
+        masses = np.maximum(masses, (cumulative - base).max(axis=-1))
+    return masses
+
+
+def find_clusters(t_values: np.ndarray, threshold: float) -> List[Tuple[int, int, float]]:
+    """
+    观测 t 值中的簇
+
+    Returns:
+        [(起始下标, 结束下标（含）, 簇质量), ...]
+    """
+    sign = np.where(t_values > threshold, 1, np.where(t_values < -threshold, -1, 0))
+    # 符号变化处即为段边界
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], sign, [0]))) != 0)
+    clusters = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if sign[start] != 0:
+            clusters.append((int(start), int(stop - 1), float(np.abs(t_values[start:stop]).sum())))
+    return clusters
+
+
+def _batch_size(n_trials: int, n_samples: int, chunk_bytes: int) -> int:
+    # 每次置换占用：随机键 + 分组矩阵各一行，组内和/平方和与 t 值若干行
+    per_permutation = (2 * n_trials + 6 * n_samples) * 8
+    return max(1, chunk_bytes // per_permutation)
+
+
+def _permutation_task(
+    pooled: np.ndarray,
+    n_a: int,
+    n_permutations: int,
+    threshold: float,
+    observed_abs: np.ndarray,
+    seed_sequence: np.random.SeedSequence,
+    chunk_bytes: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    执行一个置换任务
+
+    Returns:
+        (各时间点 |t| 不小于观测值的次数, 每次置换的最大簇质量)
+    """
+    rng = np.random.default_rng(seed_sequence)
+    n_trials, n_samples = pooled.shape
+    n_b = n_trials - n_a
+    squared = pooled * pooled
+    total = pooled.sum(axis=0)
+    total_sq = squared.sum(axis=0)
+
+    exceed = np.zeros(n_samples, dtype=np.int64)
+    masses = np.empty(n_permutations, dtype=np.float64)
+    batch = _batch_size(n_trials, n_samples, chunk_bytes)
+
+    for start in range(0, n_permutations, batch):
+        stop = min(start + batch, n_permutations)
+        size = stop - start
+        # 随机键排序取前 n_a 个作为 A 组，得到每行恰有 n_a 个 1 的分组矩阵
+        members = np.argpartition(rng.random((size, n_trials)), n_a - 1, axis=1)[:, :n_a]
+        assign = np.zeros((size, n_trials), dtype=pooled.dtype)
+        np.put_along_axis(assign, members, 1.0, axis=1)
+
+        sum_a = assign @ pooled
+        sumsq_a = assign @ squared
+        t_values = welch_t(sum_a, sumsq_a, total - sum_a, total_sq - sumsq_a, n_a, n_b)
+
+        exceed += (np.abs(t_values) >= observed_abs).sum(axis=0)
+        masses[start:stop] = max_cluster_mass(t_values, threshold)
+
+    return exceed, masses
+
+
+def _permutation_task_worker(refs: Dict[str, SharedArrayRef], *args):
+    """
+    子进程入口：挂载共享内存中的合并试次矩阵后执行置换任务
+    """
+    with attach_shared_arrays(refs) as arrays:
+        return _permutation_task(arrays['pooled'], *args)
+
+
+def permutation_test(
+    trials_a: np.ndarray,
+    trials_b: np.ndarray,
+    n_permutations: int = 1000,
+    cluster_alpha: float = 0.05,
+    seed: Optional[int] = None,
+    parallel: bool = False,
+    max_workers: Optional[int] = None,
+    chunk_bytes: int = PERMUTATION_CHUNK_MB * 1024 * 1024
+) -> Dict[str, Any]:
+    """
+    两条件试次矩阵的置换检验
+
+    Args:
+        trials_a: 条件 A，shape (n_a, n_samples)
+        trials_b: 条件 B，shape (n_b, n_samples)
+        n_permutations: 置换次数
+        cluster_alpha: 簇形成阈值对应的双侧显著性水平（自由度见 welch_df）
+        seed: 随机种子
+        parallel: 是否将置换任务分发到进程池
+        max_workers: 工作进程数
+        chunk_bytes: 每批中间数组的内存上限
+
+    Returns:
+        {'tValues', 'pValues'（逐点、未校正）, 'threshold', 'clusters'}
+    """
+    pooled = np.concatenate([trials_a, trials_b]).astype(np.float64, copy=False)
+    n_a, n_b = len(trials_a), len(trials_b)
+    threshold = float(stats.t.ppf(1 - cluster_alpha / 2, df=welch_df(trials_a, trials_b)))
+
+    observed = welch_t(
+        trials_a.sum(axis=0), (trials_a * trials_a).sum(axis=0),
+        trials_b.sum(axis=0), (trials_b * trials_b).sum(axis=0),
+        n_a, n_b
+    )
+    observed_abs = np.abs(observed)
+
+    n_tasks = math.ceil(n_permutations / PERMUTATION_TASK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(n_tasks)
+    sizes = [min(PERMUTATION_TASK_SIZE, n_permutations - idx * PERMUTATION_TASK_SIZE) for idx in range(n_tasks)]
+    task_args = [
+        (n_a, size, threshold, observed_abs, task_seed, chunk_bytes)
+        for size, task_seed in zip(sizes, seeds)
+    ]
+
+    if parallel and n_tasks > 1:
+        with SharedArrayPool() as pool:
+            refs = {'pooled': pool.share(pooled)}
+            outputs = run_in_process_pool(
+                _permutation_task_worker, [(refs, *args) for args in task_args], max_workers
+            )
+    else:
+        outputs = [_permutation_task(pooled, *args) for args in task_args]
+
+    exceed = np.sum([output[0] for output in outputs], axis=0)
+    null_masses = np.concatenate([output[1] for output in outputs])
+
+    clusters = [
+        {
+            'startIndex': start,
+            'endIndex': end,
+            'sign': 1 if observed[start] > 0 else -1,
+            'mass': mass,
+            'pValue': float((1 + np.count_nonzero(null_masses >= mass)) / (1 + n_permutations)),
+        }
+        for start, end, mass in find_clusters(observed, threshold)
+    ]
+
+    return {
+        'tValues': observed,
+        'pValues': (1 + exceed) / (1 + n_permutations),
+        'threshold': threshold,
+        'clusters': clusters,
+    }
+
+
+def _condition_trials(
+    trial_sets: List[Tuple[str, np.ndarray, np.ndarray]],
+    channel: str,
+    condition: str
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    合并所有数据集中同一 (通道, 条件) 的试次数组；时间轴不一致的数组跳过
+    """
+    key = f"{channel}/{condition}"
+    selected = [(trials, x_axis) for set_key, trials, x_axis in trial_sets if set_key == key and len(trials) > 0]
+    if not selected:
+        return None, None
+
+    x_axis = selected[0][1]
+    aligned = [trials for trials, axis in selected if np.array_equal(axis, x_axis)]
+    if len(aligned) < len(selected):
+        logger.warning(f"Skipping {len(selected) - len(aligned)} trial array(s) with mismatched time axis for {key}")
+    return np.concatenate(aligned).astype(np.float64, copy=False), np.asarray(x_axis, dtype=np.float64)
+
+
+def compare_conditions(
+    trial_sets: List[Tuple[str, np.ndarray, np.ndarray]],
+    comparisons: List[Tuple[str, str]],
+    n_permutations: int = 1000,
+    cluster_alpha: float = 0.05,
+    alpha: float = 0.05,
+    seed: Optional[int] = None,
+    parallel: bool = False,
+    max_workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    对每个通道执行各组条件（事件标签或分组）之间的置换检验
+
+    Args:
+        trial_sets: 分析结果中各矩阵的内存试次数组 [(key '{通道}/{条件}', 试次数组, 时间轴), ...]
+        comparisons: [(条件 A, 条件 B), ...]
+        alpha: 簇显著性水平（标记 significant）
+
+    Returns:
+        比较结果列表
+    """
+    channels = list(dict.fromkeys(key.split('/', 1)[0] for key, _, _ in trial_sets))
+
+    results = []
+    for channel in channels:
+        for condition_a, condition_b in comparisons:
+            key = f"{channel}/{condition_a}-vs-{condition_b}"
+            trials_a, x_axis = _condition_trials(trial_sets, channel, condition_a)
+            trials_b, x_axis_b = _condition_trials(trial_sets, channel, condition_b)
+
+            if trials_a is None or trials_b is None:
+                logger.warning(f"Skipping comparison {key}: missing trials")
+                continue
+            if len(trials_a) < 2 or len(trials_b) < 2:
+                logger.warning(f"Skipping comparison {key}: at least 2 trials per condition required")
+                continue
+            if not np.array_equal(x_axis, x_axis_b):
+                logger.warning(f"Skipping comparison {key}: mismatched time axis")
+                continue
+
+            test = permutation_test(
+                trials_a, trials_b, n_permutations, cluster_alpha, seed, parallel, max_workers
+            )
+            for cluster in test['clusters']:
+                cluster['start'] = float(x_axis[cluster['startIndex']])
+                cluster['end'] = float(x_axis[cluster['endIndex']])
+                cluster['significant'] = cluster['pValue'] < alpha
+
+            results.append({
+                'key': key,
+                'channel': channel,
+                'conditionA': condition_a,
+                'conditionB': condition_b,
+                'nA': int(len(trials_a)),
+                'nB': int(len(trials_b)),
+                'nPermutations': n_permutations,
+                'threshold': test['threshold'],
+                'tValues': test['tValues'].tolist(),
+                'pValues': test['pValues'].tolist(),
+                'xAxis': x_axis.tolist(),
+                'clusters': test['clusters'],
+            })
+
+    logger.info(f"Computed {len(results)} permutation comparison(s) ({n_permutations} permutations)")
+    return results
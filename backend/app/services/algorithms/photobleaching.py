@@ -0,0 +1,142 @@
+"""
+整段记录的光漂白校正
+- 所有通道的 410 与 470 曲线堆叠为 (n_traces, n_samples)，一次向量化求解全部拟合
+- biexp：y = c0 + c1·exp(-t/τ1) + c2·exp(-t/τ2)。τ 取对数网格，固定 (τ1, τ2) 时为线性最小二乘；
+  所有网格组合与所有曲线的正规方程一起批量求解，每条曲线取残差最小的组合
+- poly：归一化时间上的多项式最小二乘
+- 拟合在降采样（分箱均值）后的曲线上进行，再在完整时间轴上求值；
+  校正为减去拟合曲线并加回其均值（保持信号水平，避免除以接近 0 的拟合值）
+"""
+import math
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+
+# 拟合使用的最大分箱数
+BLEACH_FIT_POINTS = 4096
+# biexp 时间常数网格（相对记录时长）
+BLEACH_TAU_GRID = np.logspace(-3, 1, 25)
+# poly 默认阶数
+BLEACH_POLY_DEGREE = 3
+
+BLEACH_METHODS = ('biexp', 'poly')
+
+
+def fit_parameters(method: str) -> Dict[str, Any]:
+    """
+    影响校正结果的拟合参数（用作校正结果存储的校验信息）
+    """
+    if method == 'poly':
+        return {'method': method, 'degree': BLEACH_POLY_DEGREE, 'points': BLEACH_FIT_POINTS}
+    return {
+        'method': method,
+        'tauGrid': [float(tau) for tau in BLEACH_TAU_GRID],
+        'points': BLEACH_FIT_POINTS,
+    }
+
+
+def _binned(traces: np.ndarray, time_axis: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    沿时间分箱求均值，仅保留所有曲线均有有限值的分箱
+
+    Returns:
+        (分箱时间 (n_bins,), 分箱值 (n_traces, n_bins))
+    """
+    n_samples = traces.shape[-1]
+    factor = max(1, math.ceil(n_samples / BLEACH_FIT_POINTS))
+    starts = np.arange(0, n_samples, factor)
+
+    finite = np.isfinite(traces)
+    counts = np.add.reduceat(finite, starts, axis=-1)
+    sums = np.add.reduceat(np.where(finite, traces, 0.0), starts, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = sums / counts
+    bin_times = np.add.reduceat(time_axis, starts) / np.diff(np.append(starts, n_samples))
+
+    valid = (counts > 0).all(axis=0)
+    return bin_times[valid], values[:, valid]
+
+
+def _fit_biexp(traces: np.ndarray, time_axis: np.ndarray) -> np.ndarray:
+    """
+    双指数拟合（网格 τ × 批量正规方程）
+    """
+    bin_times, values = _binned(traces, time_axis)
+    duration = max(float(time_axis[-1] - time_axis[0]), 1e-12)
+    taus = BLEACH_TAU_GRID * duration
+    tau_fast, tau_slow = np.triu_indices(len(taus), k=1)
+
+    # bases: (n_pairs, n_bins, 3)
+    t = bin_times - time_axis[0]
+    bases = np.stack([
+        np.ones((len(tau_fast), len(t))),
+        np.exp(-t[None, :] / taus[tau_fast, None]),
+        np.exp(-t[None, :] / taus[tau_slow, None]),
+    ], axis=-1)
+
+    gram = np.swapaxes(bases, 1, 2) @ bases                     # (n_pairs, 3, 3)
+    rhs = np.swapaxes(bases, 1, 2) @ values.T                   # (n_pairs, 3, n_traces)
+    coefs = np.linalg.pinv(gram) @ rhs                          # (n_pairs, 3, n_traces)
+    residuals = ((bases @ coefs - values.T[None]) ** 2).sum(axis=1)  # (n_pairs, n_traces)
+
+    best = np.argmin(residuals, axis=0)
+    trace_idx = np.arange(len(traces))
+    coef = coefs[best, :, trace_idx]                            # (n_traces, 3)
+    t_full = (time_axis - time_axis[0])[None, :]
+    return (
+        coef[:, :1]
+        + coef[:, 1:2] * np.exp(-t_full / taus[tau_fast[best], None])
+        + coef[:, 2:3] * np.exp(-t_full / taus[tau_slow[best], None])
+    )
+
+
+def _fit_poly(traces: np.ndarray, time_axis: np.ndarray) -> np.ndarray:
+    """
+    多项式拟合（归一化时间，所有曲线共用一次最小二乘）
+    """
+    bin_times, values = _binned(traces, time_axis)
+    start, end = float(time_axis[0]), float(time_axis[-1])
+    scale = max(end - start, 1e-12) / 2
+
+    def vander(times: np.ndarray) -> np.ndarray:
+        return np.vander((times - start) / scale - 1.0, BLEACH_POLY_DEGREE + 1)
+
+    coefs, *_ = np.linalg.lstsq(vander(bin_times), values.T, rcond=None)
+    return (vander(time_axis) @ coefs).T
+
+
+def fit_photobleaching(traces: np.ndarray, fps: float, method: str = 'biexp') -> np.ndarray:
+    """
+    拟合每条曲线的光漂白趋势
+
+    Args:
+        traces: shape (n_traces, n_samples)，可含 NaN
+        fps: 采样率
+        method: 'biexp' 或 'poly'
+
+    Returns:
+        拟合曲线，shape 与 traces 相同（float64）
+    """
+    if method not in BLEACH_METHODS:
+        raise ValueError(f"Unknown photobleaching correction method: {method}")
+
+    traces = np.asarray(traces, dtype=np.float64)
+    time_axis = np.arange(traces.shape[-1]) / fps
+    if traces.shape[-1] < BLEACH_POLY_DEGREE + 2:
+        raise ValueError("Not enough samples for photobleaching correction")
+
+    if method == 'poly':
+        return _fit_poly(traces, time_axis)
+    return _fit_biexp(traces, time_axis)
+
+
+def correct_photobleaching(traces: np.ndarray, fps: float, method: str = 'biexp') -> np.ndarray:
+    """
+    减去拟合的光漂白趋势并加回其均值
+
+    Returns:
+        校正后的曲线（float64）
+    """
+    fit = fit_photobleaching(traces, fps, method)
+    return np.asarray(traces, dtype=np.float64) - fit + fit.mean(axis=-1, keepdims=True)
@@ -0,0 +1,72 @@
+"""
+采样率对齐（polyphase 重采样）
+- 分析采样率与原始采样率之比取有理近似 up/down（分母不超过 RESAMPLE_MAX_DENOMINATOR）
+- 所有通道的 410 与 470 曲线堆叠为 (n_traces, n_samples)，一次 resample_poly 调用完成
+- 首尾以线性外推延拓（padtype='line'），减小边界振铃
+- 非有限样本先线性插值后重采样，输出中对应时刻（最近的原始样本）恢复为 NaN
+"""
+from fractions import Fraction
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from scipy import signal
+
+from app.services.algorithms.filtering import fill_nonfinite
+
+
+# 重采样比例有理近似的最大分母
+RESAMPLE_MAX_DENOMINATOR = 1000
+RESAMPLE_PADTYPE = 'line'
+
+
+def resample_ratio(source_fps: float, target_fps: float) -> Tuple[int, int]:
+    """
+    重采样比例 target_fps / source_fps 的有理近似 (up, down)
+
+    Raises:
+        ValueError: 采样率无效
+    """
+    if source_fps <= 0 or target_fps <= 0:
+        raise ValueError(f"Invalid sampling rates for resampling: {source_fps} -> {target_fps}")
+    ratio = (Fraction(target_fps) / Fraction(source_fps)).limit_denominator(RESAMPLE_MAX_DENOMINATOR)
+    if ratio == 0:
+        raise ValueError(f"Resampling ratio {target_fps}/{source_fps} is too small")
+    return ratio.numerator, ratio.denominator
+
+
+def resample_parameters(source_fps: float, target_fps: float) -> Dict[str, Any]:
+    """
+    影响重采样结果的参数（用作重采样结果存储的校验信息）
+    """
+    up, down = resample_ratio(source_fps, target_fps)
+    return {
+        'sourceFps': float(source_fps),
+        'targetFps': float(target_fps),
+        'up': up,
+        'down': down,
+        'padtype': RESAMPLE_PADTYPE,
+    }
+
+
+def resample_traces(traces: np.ndarray, source_fps: float, target_fps: float) -> np.ndarray:
+    """
+    将所有曲线从 source_fps 重采样到 target_fps
+
+    Args:
+        traces: shape (n_traces, n_samples)，可含 NaN
+        source_fps: 原始采样率
+        target_fps: 分析采样率
+
+    Returns:
+        shape (n_traces, ceil(n_samples · up / down)) 的曲线（float64）
+    """
+    up, down = resample_ratio(source_fps, target_fps)
+    traces = np.array(traces, dtype=np.float64)
+    nonfinite = fill_nonfinite(traces)
+
+    resampled = signal.resample_poly(traces, up, down, axis=-1, padtype=RESAMPLE_PADTYPE)
+
+    if nonfinite is not None:
+        nearest = np.rint(np.arange(resampled.shape[-1]) * down / up).astype(np.int64)
+        resampled[nonfinite[:, np.minimum(nearest, traces.shape[-1] - 1)]] = np.nan
+    return resampled
@@ -0,0 +1,184 @@
+"""
+滑动基线归一化（rolling 算法）
+F = 470 - k·410（k 为整段通道有限样本回归），每个样本以此前 window 个样本（含当前样本）为基线：
+- mean：(F - 滑动均值) / 滑动标准差；累积和求窗口和，O(n)
+- percentile：(F - 滑动分位数) / 滑动标准差；scipy.ndimage.percentile_filter 的一维实现
+  （SciPy >= 1.15）以双堆维护窗口，O(n log w)
+会话开始处此前样本不足 window - 1 个时，两种方法均以每行首个有限样本延拓窗口；
+窗口跨块携带尾部（window - 1 个样本），整段计算与连续曲线的分块计算结果一致
+"""
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from scipy import ndimage
+
+from app.services.algorithms.filtering import fill_nonfinite
+
+
+ROLLING_METHODS = ('mean', 'percentile')
+
+
+@dataclass(frozen=True)
+class RollingBaseline:
+    """滑动基线参数"""
+    window: float               # 窗口长度（秒）
+    method: str = 'mean'        # 'mean' 或 'percentile'
+    percentile: float = 10.0    # 基线分位数（仅 percentile）
+
+    def window_samples(self, fps: float) -> int:
+        return max(int(round(self.window * fps)), 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def isosbestic_fit(data_410: np.ndarray, data_470: np.ndarray) -> np.ndarray:
+    """
+    F = 470 - k·410，k 为各通道有限样本上 470 对 410 的回归斜率（样本不足或 410 方差为 0 时为 1）
+
+    Args:
+        data_410/data_470: shape (n_channels, n_samples)
+
+    Returns:
+        F，shape (n_channels, n_samples)（float64）
+    """
+    data_410 = np.asarray(data_410, dtype=np.float64)
+    data_470 = np.asarray(data_470, dtype=np.float64)
+    finite = np.isfinite(data_410) & np.isfinite(data_470)
+    n = finite.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x = np.where(finite, data_410 - (np.where(finite, data_410, 0.0).sum(axis=1) / n)[:, None], 0.0)
+        y = np.where(finite, data_470 - (np.where(finite, data_470, 0.0).sum(axis=1) / n)[:, None], 0.0)
+        var = np.einsum('ij,ij->i', x, x)
+        k = np.einsum('ij,ij->i', x, y) / var
+    k = np.where((n > 1) & (var > 0), k, 1.0)
+    return data_470 - k[:, None] * data_410
+
+
+def _pad_session_start(extended: np.ndarray, n_tail: int, window: int) -> Tuple[np.ndarray, int]:
+    """
+    会话开始处（此前样本不足 window - 1 个）以每行首个有限样本延拓，使每个位置都有完整窗口
+
+    Returns:
+        (延拓后的数组, 延拓后的尾部长度)
+    """
+    missing = window - 1 - n_tail
+    if missing <= 0 or extended.shape[1] == 0:
+        return extended, n_tail
+    finite = np.isfinite(extended)
+    first = extended[np.arange(len(extended)), finite.argmax(axis=1)]
+    first = np.where(finite.any(axis=1), first, np.nan)
+    padding = np.repeat(first[:, None], missing, axis=1).astype(extended.dtype, copy=False)
+    return np.concatenate([padding, extended], axis=1), n_tail + missing
+
+
+def _window_moments(extended: np.ndarray, n_tail: int, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    extended[:, n_tail:] 各位置此前 window 个样本（忽略 NaN）的 (个数, 均值, 标准差)
+    """
+    finite = np.isfinite(extended)
+    filled = np.where(finite, extended, 0.0)
+    hi = np.arange(n_tail, extended.shape[1]) + 1
+    lo = np.maximum(hi - window, 0)
+
+    def window_sums(array: np.ndarray) -> np.ndarray:
+        cumulative = np.zeros((array.shape[0], array.shape[1] + 1), dtype=np.float64)
+        np.cumsum(array, axis=1, out=cumulative[:, 1:])
+        return cumulative[:, hi] - cumulative[:, lo]
+
+    count = window_sums(finite.astype(np.float64))
+    total = window_sums(filled)
+    total_sq = window_sums(filled * filled)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+    return count, mean, std
+
+
+def _window_percentile(extended: np.ndarray, n_tail: int, window: int, percentile: float) -> np.ndarray:
+    """
+    extended[:, n_tail:] 各位置此前 window 个样本的分位数
+
+    非有限样本先线性插值（extended 已含完整的前置窗口，见 _pad_session_start）
+    """
+    filled = np.array(extended, dtype=np.float64)
+    fill_nonfinite(filled)
+    # origin 将居中窗口左移为 [i - window + 1, i]
+    origin = (window - 1) // 2
+    baseline = np.empty((filled.shape[0], filled.shape[1] - n_tail), dtype=np.float64)
+    for row in range(filled.shape[0]):
+        baseline[row] = ndimage.percentile_filter(
+            filled[row], percentile, size=window, origin=origin, mode='nearest'
+        )[n_tail:]
+    return baseline
+
+
+def rolling_normalize(
+    values: np.ndarray,
+    tail: np.ndarray,
+    window: int,
+    method: str = 'mean',
+    percentile: float = 10.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    以此前 window 个样本（含当前样本）为基线归一化
+
+    Args:
+        values: 当前块 shape (n_channels, chunk_len)
+        tail: 上一块返回的尾部（window - 1 个样本，会话开始时为空）
+        window: 窗口样本数
+        method: 'mean' 或 'percentile'
+        percentile: 基线分位数（仅 percentile）
+
+    Returns:
+        (归一化结果（窗口内有效样本不足 2 个或标准差为 0 处为 NaN）, 新的尾部)
+    """
+    if method not in ROLLING_METHODS:
+        raise ValueError(f"Unknown rolling baseline method: {method}")
+
+    extended, n_tail = _pad_session_start(np.concatenate([tail, values], axis=1), tail.shape[1], window)
+    count, mean, std = _window_moments(extended, n_tail, window)
+    baseline = _window_percentile(extended, n_tail, window, percentile) if method == 'percentile' else mean
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized = np.where((count > 1) & (std > 1e-10), (values - baseline) / std, np.nan)
+
+    return normalized, extended[:, -(window - 1):] if window > 1 else extended[:, :0]
+
+
+def rolling_trace(
+    data_410: np.ndarray,
+    data_470: np.ndarray,
+    fps: float,
+    baseline: RollingBaseline,
+    dtype: Optional[np.dtype] = None
+) -> np.ndarray:
+    """
+    整段通道的滑动基线归一化曲线
+
+    Args:
+        data_410/data_470: shape (n_channels, n_samples)
+        fps: 采样率
+        baseline: 滑动基线参数
+        dtype: 输出精度（默认与 data_470 相同）
+
+    Returns:
+        shape (n_channels, n_samples)，非有限样本处为 NaN
+    """
+    fitted = isosbestic_fit(data_410, data_470)
+    # 先减去整段均值（滑动统计对平移不变，可减小累积和的舍入误差）
+    finite = np.isfinite(fitted)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        center = np.where(finite, fitted, 0.0).sum(axis=1) / finite.sum(axis=1)
+    fitted -= np.nan_to_num(center)[:, None]
+    normalized, _ = rolling_normalize(
+        fitted,
+        np.empty((len(fitted), 0)),
+        baseline.window_samples(fps),
+        baseline.method,
+        baseline.percentile
+    )
+    return normalized.astype(dtype or np.asarray(data_470).dtype, copy=False)
@@ -0,0 +1,249 @@
+"""
+流式（out-of-core）单事件分析
+按块读取荧光文件，只保留事件窗口（含基线）覆盖的样本，
+内存占用与 窗口长度 × 事件数 成正比，与记录长度无关；
+输出与内存路径 analyze_single_event 一致
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.logger import algo_logger as logger
+from app.utils.channel_store import iter_channel_chunks
+from app.services.algorithms.fluorescence_algo import (
+    AnalysisParams,
+    AnalysisResult,
+    Dataset,
+    as_event_table,
+    build_keep_mask,
+    cohort_curves,
+    collect_trials,
+    event_window_layout,
+    merge_mask_intervals,
+    normalize_zscore_windows,
+    pair_channel_columns,
+    single_event_entries,
+    single_event_metrics,
+    single_event_summary,
+)
+
+
+# 默认每块读取的样本数
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def chunk_intervals(intervals: np.ndarray, chunk_start: int, chunk_len: int) -> np.ndarray:
+    """
+    将全局掩码区间裁剪并平移到当前块的局部坐标
+    """
+    if len(intervals) == 0:
+        return intervals
+    local = np.clip(intervals - chunk_start, 0, chunk_len)
+    return local[local[:, 0] < local[:, 1]]
+
+
+def stream_event_windows(
+    file_path: str,
+    fps: float,
+    starts: np.ndarray,
+    n_samples: int,
+    masks: Optional[List[Tuple[float, float]]] = None,
+    mask_mode: str = 'remove',
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    dtype: str = 'float64'
+) -> Tuple[Dict[str, Tuple[np.ndarray, np.ndarray]], np.ndarray]:
+    """
+    按块读取荧光文件，收集每个事件窗口的 410/470 样本
+
+    样本坐标与 load_fluorescence_data 一致：remove 模式下为删除掩码后的坐标，
+    nan 模式下掩码样本以 NaN 填充。
+
+    Args:
+        file_path: 荧光 CSV 文件路径
+        fps: 采样率
+        starts: 每个事件窗口的起始样本（可能越界）
+        n_samples: 窗口样本数
+        masks: 掩码时间范围列表
+        mask_mode: 'remove' 或 'nan'
+        chunk_rows: 每块样本数
+        dtype: 窗口数据精度，'float64' 或 'float32'
+
+    Returns:
+        ({通道名: (windows_410, windows_470)}, in_range)
+        windows_*: shape (n_events, n_samples)，越界部分为 NaN
+        in_range: 窗口完整落在记录内的事件掩码
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    order = np.argsort(starts, kind='stable')
+    sorted_starts = starts[order]
+
+    # 掩码区间需基于原始长度计算；流式时长度未知，先按无上限合并
+    intervals = merge_mask_intervals(masks, fps, np.iinfo(np.int64).max) if masks else np.empty((0, 2), dtype=np.int64)
+
+    windows: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    channel_cols = None
+    raw_offset = 0   # 当前块在原始记录中的起点
+    kept_offset = 0  # 当前块在（掩码后）分析坐标中的起点
+
+    for chunk in iter_channel_chunks(file_path, chunk_rows, dtype=dtype):
+        if channel_cols is None:
+            channel_cols = pair_channel_columns(list(chunk))
+            if not channel_cols:
+                raise ValueError("No valid channel pairs found in CSV file")
+            for ch_num in channel_cols:
+                windows[f"CH{ch_num}"] = (
+                    np.full((len(starts), n_samples), np.nan, dtype=dtype),
+                    np.full((len(starts), n_samples), np.nan, dtype=dtype),
+                )
+
+        chunk_len = len(next(iter(chunk.values())))
+        local_intervals = chunk_intervals(intervals, raw_offset, chunk_len)
+
+        # 块内保留样本的原始位置（remove 模式）或 NaN 位置（nan 模式）
+        if mask_mode == 'nan' or len(local_intervals) == 0:
+            kept_positions = None
+            kept_len = chunk_len
+            nan_mask = build_keep_mask(local_intervals, chunk_len) if len(local_intervals) else None
+        else:
+            kept_positions = np.flatnonzero(build_keep_mask(local_intervals, chunk_len))
+            kept_len = len(kept_positions)
+            nan_mask = None
+
+        # 与本块重叠的事件：start ∈ (kept_offset - n_samples, kept_offset + kept_len)
+        lo = np.searchsorted(sorted_starts, kept_offset - n_samples + 1, side='left')
+        hi = np.searchsorted(sorted_starts, kept_offset + kept_len, side='left')
+
+        for event_idx in order[lo:hi]:
+            begin = max(starts[event_idx], kept_offset)
+            end = min(starts[event_idx] + n_samples, kept_offset + kept_len)
+            if begin >= end:
+                continue
+            cols = slice(begin - starts[event_idx], end - starts[event_idx])
+            local = np.arange(begin - kept_offset, end - kept_offset)
+            source = local if kept_positions is None else kept_positions[local]
+
+            for ch_num, wavelengths in channel_cols.items():
+                windows_410, windows_470 = windows[f"CH{ch_num}"]
+                windows_410[event_idx, cols] = chunk[wavelengths['410']][source]
+                windows_470[event_idx, cols] = chunk[wavelengths['470']][source]
+                if nan_mask is not None:
+                    masked = ~nan_mask[source]
+                    windows_410[event_idx, cols][masked] = np.nan
+                    windows_470[event_idx, cols][masked] = np.nan
+
+        raw_offset += chunk_len
+        kept_offset += kept_len
+
+    if channel_cols is None:
+        raise ValueError("No valid channel pairs found in CSV file")
+
+    in_range = (starts >= 0) & (starts + n_samples <= kept_offset)
+    logger.debug(f"Streamed {raw_offset} samples from {file_path}, kept windows for {len(starts)} event(s)")
+    return windows, in_range
+
+
+def analyze_single_event_streaming(
+    datasets: List[Dataset],
+    params: AnalysisParams,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> AnalysisResult:
+    """
+    单事件模式的流式分析
+
+    datasets 中的通道无需预先加载（channels 可为空），
+    掩码从 dataset.metadata 的 'masks' / 'maskMode' 读取。
+
+    Args:
+        datasets: 数据集列表
+        params: 分析参数
+        chunk_rows: 每块样本数
+
+    Returns:
+        分析结果
+    """
+    logger.info(f"Streaming single event analysis for {len(datasets)} dataset(s)")
+
+    algorithm = getattr(params, 'algorithm_type', 'zscore')
+    baseline_window = params.baseline_window
+    response_window = params.response_window
+    window_start = min(baseline_window[0], response_window[0])
+    window_end = max(baseline_window[1], response_window[1])
+
+    window_offset, n_samples, baseline_lo, baseline_hi, time_axis = event_window_layout(
+        params.fps, baseline_window[0], baseline_window[1], window_start, window_end
+    )
+
+    matrices = []
+    curves = []
+    trials = []
+    summaries = []
+    metrics = []
+
+    for dataset_idx, dataset in enumerate(datasets):
+        metadata = dataset.metadata or {}
+        table = as_event_table(dataset.events)
+
+        # 所有请求标签的事件一次性收集窗口，各标签再按行切分
+        selected = table.select(params.events)
+        starts = (table.start_times[selected] * params.fps).astype(np.int64) + window_offset
+
+        windows, in_range = stream_event_windows(
+            dataset.fluorescence_file,
+            params.fps,
+            starts,
+            n_samples,
+            masks=metadata.get('masks'),
+            mask_mode=metadata.get('maskMode', 'remove'),
+            chunk_rows=chunk_rows,
+            dtype=params.precision
+        )
+
+        for channel_name, (windows_410, windows_470) in windows.items():
+            for event_label in params.events:
+                rows = np.flatnonzero(np.isin(selected, table.indices_for_label(event_label)))
+                if len(rows) == 0:
+                    logger.warning(f"No events found matching filter {[event_label]}")
+                    logger.warning(f"No data for {channel_name}/{event_label}")
+                    continue
+
+                valid = in_range[rows].copy()
+                df_f, finite = normalize_zscore_windows(
+                    windows_410[rows[valid]],
+                    windows_470[rows[valid]],
+                    baseline_lo,
+                    baseline_hi
+                )
+                valid[np.flatnonzero(valid)[~finite]] = False
+
+                result = collect_trials(
+                    table.labels[selected[rows]],
+                    table.start_times[selected[rows]],
+                    df_f,
+                    time_axis,
+                    valid
+                )
+
+                summary = single_event_summary(channel_name, event_label, result, params, algorithm, dataset_idx)
+                if summary is not None:
+                    summaries.append(summary)
+                metrics_table = single_event_metrics(channel_name, event_label, result, params, algorithm)
+                if metrics_table is not None:
+                    metrics.append(metrics_table)
+
+                entries = single_event_entries(channel_name, event_label, result, params, algorithm)
+                if entries is None:
+                    continue
+                matrix, curve, trial_set = entries
+                matrices.append(matrix)
+                trials.append(trial_set)
+                if curve is not None:
+                    curves.append(curve)
+
+    return AnalysisResult(
+        matrices=matrices,
+        curves=curves,
+        metadata={'mode': 'single', 'events': params.events, 'algorithm': algorithm, 'streaming': True},
+        cohort=cohort_curves(summaries, datasets, params),
+        metrics=metrics,
+        trials=trials
+    )
@@ -0,0 +1,135 @@
+"""
+试次级结果缓存
+- 以 (源文件标识 + 分析参数) 作为作用域，(作用域, 通道, 事件开始时间) 作为键
+- 进程内 LRU，按字节数限制容量（每个条目另计固定开销，空的无效试次条目同样占用容量）
+- 每个任务使用一个 TrialCacheSession 统计命中/未命中次数
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.constants import TRIAL_CACHE_MAX_MB
+from app.utils.channel_store import read_channel_store_header
+
+
+# 每个缓存条目在数组数据之外的估计开销（键元组、数组对象与 LRU 链表节点）
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def source_digest(file_path: str) -> str:
+    """
+    荧光文件的缓存标识，不读取文件内容
+
+    优先使用上传时生成的通道存储 header（列、样本数与源文件大小/修改时间），
+    无存储时使用 (大小, 修改时间)；两者均与绝对路径一起摘要
+    """
+    path = os.path.abspath(file_path)
+    store_header = read_channel_store_header(path)
+    if store_header is not None:
+        identity = {key: store_header.get(key) for key in ("version", "nSamples", "columns", "source")}
+    else:
+        stat = os.stat(path)
+        identity = {"size": stat.st_size, "mtimeNs": stat.st_mtime_ns}
+    payload = json.dumps({"path": path, **identity}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_scope(source_id: str, **params: Any) -> str:
+    """
+    由源文件标识与影响试次结果的参数生成缓存作用域
+    """
+    payload = json.dumps({"file": source_id, **params}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class TrialCache:
+    """
+    试次向量 LRU 缓存（线程安全）
+
+    值为单个试次的 ΔF/F 向量；空数组表示该试次无效（越界或含 NaN），
+    同样缓存以免重复计算；容量按 数组字节数 + ENTRY_OVERHEAD_BYTES 计
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get_many(self, keys: Sequence[Hashable]) -> List[Optional[np.ndarray]]:
+        """
+        批量查询，命中的条目移到最近使用端
+        """
+        values = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                values.append(value)
+        return values
+
+    def put_many(self, items: Sequence[Tuple[Hashable, np.ndarray]]):
+        """
+        批量写入，超出容量时淘汰最久未使用的条目
+        """
+        with self._lock:
+            for key, value in items:
+                value = np.array(value, copy=True)
+                value.flags.writeable = False
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._nbytes -= old.nbytes + ENTRY_OVERHEAD_BYTES
+                self._entries[key] = value
+                self._nbytes += value.nbytes + ENTRY_OVERHEAD_BYTES
+
+            while self._entries and self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+
+class TrialCacheSession:
+    """
+    单个任务对试次缓存的访问，记录命中/未命中次数
+    """
+
+    def __init__(self, cache: TrialCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, keys: Sequence[Hashable]) -> List[Optional[np.ndarray]]:
+        values = self.cache.get_many(keys)
+        hits = sum(value is not None for value in values)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(values) - hits
+        return values
+
+    def store(self, items: Sequence[Tuple[Hashable, np.ndarray]]):
+        self.cache.put_many(items)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# 全局单例
+trial_cache = TrialCache(max_bytes=TRIAL_CACHE_MAX_MB * 1024 * 1024)
@@ -3,12 +3,17 @@
 负责业务逻辑编排、数据选择、任务管理
 """
 import os
+import io
 import json
 import uuid
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
 from sqlalchemy.orm import Session
 
+from app.constants import TRACE_EXPORT_CHUNK_ROWS
+
 from app.utils.logger import service_logger as logger
 
 from app.models.data_item import DataItem
@@ -21,20 +26,47 @@ from app.schemas.fluorescence import (
     ResultMeta,
     MatrixResult,
     CurveResult,
+    SweepSummary,
+    CohortCurve,
+    MetricsTable,
+    ComparisonResult,
+    TraceInfo,
 )
 from app.services.job_registry import job_registry, JobStatus
 from app.services.algorithms.fluorescence_algo import (
     Dataset,
     Channel,
     LabelEvent,
+    EventTable,
     AnalysisParams,
     AnalysisResult,
-    load_fluorescence_data,
-    load_label_data,
+    load_fluorescence_block,
+    load_label_table,
+    read_sidecar_fps,
     analyze_single_event,
     analyze_multi_event,
+    analyze_window_sweep,
 )
+from app.services.algorithms.continuous import iter_continuous_trace
+from app.services.algorithms.filtering import FilterSpec, design_sos
+from app.services.algorithms.rolling import RollingBaseline
+from app.services.algorithms.streaming import analyze_single_event_streaming
+from app.services.algorithms.trial_cache import TrialCacheSession, trial_cache
+from app.services.algorithms.permutation import compare_conditions
+from app.services.algorithms.lod import choose_lod_factor, downsample_result, lod_factors, result_width
+from app.services.algorithms.parallel import process_pool
 from app.utils.tag_selector import select_by_tags, get_data_items_by_ids
+from app.utils.result_artifact import (
+    ARTIFACT_FILE,
+    MANIFEST_FILE,
+    dumps_result,
+    has_result_artifact,
+    json_safe,
+    read_result_artifact,
+    read_result_manifest,
+    result_dtype,
+    write_result_artifact,
+)
 
 
 def resolve_data_items(
@@ -63,24 +95,53 @@ def resolve_data_items(
         return []
 
 
+def resolve_source_fps(data_items: List[DataItem], request: AnalyzeRequest) -> Dict[int, float]:
+    """
+    各荧光数据项的原始采样率
+    优先级：请求中的 datasetFps > 同名 JSON 旁注文件的 "fps" > 请求的 fps
+    
+    Returns:
+        {dataItemId: 原始采样率}
+    """
+    source_fps = {}
+    for item in data_items:
+        if not is_fluorescence_file(item):
+            continue
+        fps = request.datasetFps.get(str(item.dataItemId))
+        if fps is None:
+            fps = read_sidecar_fps(os.path.join("uploads", item.filePath))
+        source_fps[item.dataItemId] = fps if fps is not None else request.fps
+    
+    resampled = {item_id: fps for item_id, fps in source_fps.items() if fps != request.fps}
+    if resampled:
+        logger.info(f"Resampling {len(resampled)} dataset(s) to {request.fps} Hz: {resampled}")
+    return source_fps
+
+
 def build_datasets(
     db: Session,
     data_items: List[DataItem],
-    request: AnalyzeRequest
+    request: AnalyzeRequest,
+    source_fps: Optional[Dict[int, float]] = None,
+    filter_spec: Optional[FilterSpec] = None
 ) -> List[Dataset]:
     """
     构建数据集列表
-    为每个荧光文件关联打标文件，并加载数据
+    为每个荧光文件关联打标文件，并加载数据（原始采样率不同的记录重采样到 request.fps）
     
     Args:
         db: 数据库会话
         data_items: 数据项列表
         request: 分析请求
+        source_fps: 各数据项的原始采样率（resolve_source_fps；缺省为 request.fps）
+        filter_spec: 滤波参数（filter_spec_from_request）
     
     Returns:
         Dataset 列表
     """
     datasets = []
+    source_fps = source_fps or {}
+    streaming = use_streaming(request, source_fps)
     
     # 按目录分组，找出荧光文件与打标文件的对应关系
     # 简化策略：同一目录下的所有 CSV 文件视为相关
@@ -104,23 +165,41 @@ def build_datasets(
                 for mr in mask_ranges:
                     masks.append((mr.start, mr.end))
         
-        try:
-            channels = load_fluorescence_data(fluor_path, request.fps, masks if masks else None)
-        except Exception as e:
-            logger.error(f"Failed to load fluorescence data from {fluor_path}: {e}")
+        # 流式与连续曲线模式下不整体加载通道，分析时按块读取
+        item_fps = source_fps.get(fluor_item.dataItemId, request.fps)
+        block = None
+        if not streaming and request.mode != 'continuous':
+            try:
+                block = load_fluorescence_block(
+                    fluor_path,
+                    request.fps,
+                    masks if masks else None,
+                    mask_mode=request.maskMode,
+                    dtype=request.precision,
+                    bleach_correction=request.bleachCorrection,
+                    filter_spec=filter_spec,
+                    source_fps=item_fps
+                )
+            except Exception as e:
+                logger.error(f"Failed to load fluorescence data from {fluor_path}: {e}")
+                continue
+        elif not os.path.exists(fluor_path):
+            logger.error(f"Fluorescence file not found: {fluor_path}")
             continue
         
-        # 加载打标数据
-        all_events = []
+        # 加载打标数据（连续曲线模式不需要事件）
+        event_tables = []
+        if request.mode == 'continuous':
+            label_items = []
         for label_item in label_items:
             try:
                 label_path = os.path.join("uploads", label_item.filePath)
-                events = load_label_data(
+                events = load_label_table(
                     label_path,
                     column_map=request.columnMap.model_dump(),
                     label_mapping=request.labelMapping
                 )
-                all_events.extend(events)
+                event_tables.append(events)
             except Exception as e:
                 logger.error(f"Failed to load label data from {label_path}: {e}")
                 continue
@@ -129,10 +208,18 @@ def build_datasets(
             data_item_id=fluor_item.dataItemId,
             fluorescence_file=fluor_path,
             label_files=[os.path.join("uploads", item.filePath) for item in label_items],
-            channels=channels,
-            events=all_events,
+            channels=block.channels() if block is not None else [],
+            events=EventTable.concat(event_tables),
             fps=request.fps,
-            metadata={'projectId': fluor_item.projectId}
+            metadata={
+                'projectId': fluor_item.projectId,
+                'masks': masks if masks else None,
+                'maskMode': request.maskMode,
+                'sourceFps': item_fps,
+                'subjectId': fluor_item.subjectId,
+                'tagIds': fluor_item.tagIds or []
+            },
+            block=block
         )
         
         datasets.append(dataset)
@@ -140,6 +227,45 @@ def build_datasets(
     return datasets
 
 
+def use_streaming(request: AnalyzeRequest, source_fps: Optional[Dict[int, float]] = None) -> bool:
+    """
+    是否使用流式分析（目前仅支持 single 模式；光漂白校正、滤波、rolling 算法与重采样需要整段记录，不支持流式）
+    """
+    return (
+        request.streaming and request.mode == 'single' and not request.sweep
+        and not request.bleachCorrection and not request.filter
+        and request.algorithmType != 'rolling'
+        and all(fps == request.fps for fps in (source_fps or {}).values())
+    )
+
+
+def filter_spec_from_request(
+    request: AnalyzeRequest,
+    source_fps: Optional[Dict[int, float]] = None
+) -> Optional[FilterSpec]:
+    """
+    请求中的滤波参数
+    滤波在各记录的原始采样率下进行（重采样之前），截止频率按最低的原始采样率校验
+
+    Args:
+        source_fps: 各数据项的原始采样率（resolve_source_fps；缺省为 request.fps）
+
+    Raises:
+        ValueError: 截止频率无效（不低于 Nyquist 频率等）
+    """
+    if not request.filter:
+        return None
+    spec = FilterSpec(
+        kind=request.filter.type,
+        high_hz=request.filter.highHz,
+        low_hz=request.filter.lowHz,
+        order=request.filter.order
+    )
+    # 参数无效时在加载数据前失败
+    design_sos(spec, min(source_fps.values()) if source_fps else request.fps)
+    return spec
+
+
 def is_fluorescence_file(item: DataItem) -> bool:
     """
     判断是否为荧光文件
@@ -243,7 +369,11 @@ def execute_analysis(
         
         # 2. 构建数据集
         job_registry.update_job(job_id, progress=20, message="Building datasets...")
-        datasets = build_datasets(db, data_items, request)
+        source_fps = resolve_source_fps(data_items, request)
+        if request.mode == 'continuous' and len(set(source_fps.values())) > 1:
+            raise ValueError(f"Continuous mode requires all recordings at one sampling rate, got {sorted(set(source_fps.values()))} Hz")
+        filter_spec = filter_spec_from_request(request, source_fps)
+        datasets = build_datasets(db, data_items, request, source_fps, filter_spec)
         
         if not datasets:
             raise ValueError("No valid datasets could be built")
@@ -255,29 +385,98 @@ def execute_analysis(
             mode=request.mode,
             fps=request.fps,
             algorithm_type=request.algorithmType,
+            precision=request.precision,
+            bleach_correction=request.bleachCorrection,
+            filter_spec=filter_spec,
             output_df_f=request.outputs.df_f,
             output_zscore=request.outputs.zscore,
-            output_warping=request.outputs.warping
+            output_warping=request.outputs.warping,
+            parallel=request.parallel,
+            max_workers=request.maxWorkers
         )
         
+        if request.algorithmType == 'rolling':
+            params.rolling_baseline = RollingBaseline(
+                window=request.rolling.windowSeconds,
+                method=request.rolling.method,
+                percentile=request.rolling.percentile
+            )
+        
+        if request.bootstrap:
+            params.bootstrap_resamples = request.bootstrap.iterations
+            params.bootstrap_confidence = request.bootstrap.confidence
+            params.bootstrap_seed = request.bootstrap.seed
+        
         if request.mode == 'single':
             params.events = [e.label for e in request.events]
             params.baseline_window = (request.baselineWindow.start, request.baselineWindow.end)
             params.response_window = (request.responseWindow.start, request.responseWindow.end)
             if request.offsetWindow:
                 params.offset_window = (request.offsetWindow.start, request.offsetWindow.end)
-        else:  # multi
+            if request.sweep:
+                params.sweep_windows = [
+                    (
+                        (pair.baselineWindow.start, pair.baselineWindow.end),
+                        (pair.responseWindow.start, pair.responseWindow.end)
+                    )
+                    for pair in request.sweep.windows
+                ]
+                params.sweep_full_results = list(request.sweep.fullResults)
+            if request.metrics:
+                params.metric_windows = [('response', request.responseWindow.start, request.responseWindow.end)] + [
+                    (window.name, window.start, window.end) for window in request.metrics.windows
+                ]
+            if request.cohort:
+                params.cohort_weighting = request.cohort.weighting
+                params.cohort_group_by = request.cohort.groupBy
+        elif request.mode == 'multi':
             params.groups = [g.model_dump() for g in request.groups]
+        else:  # continuous（rolling 算法的滑动基线优先于 continuous 选项）
+            if params.rolling_baseline is None and request.continuous.normalization == 'rolling':
+                params.rolling_baseline = RollingBaseline(window=request.continuous.windowSeconds)
         
         # 4. 执行分析
         job_registry.update_job(job_id, progress=50, message="Running analysis algorithm...")
         
-        if request.mode == 'single':
-            result = analyze_single_event(datasets, params)
-        else:
-            result = analyze_multi_event(datasets, params)
+        # 并行时整个任务（分析单元与置换检验）共用一个进程池
+        with process_pool(request.maxWorkers) if request.parallel else nullcontext():
+            traces = []
+            if request.mode == 'continuous':
+                traces = write_continuous_traces(project_id, job_id, datasets, params)
+                result = AnalysisResult(matrices=[], curves=[], metadata={})
+            elif request.mode == 'single' and request.sweep:
+                result = analyze_window_sweep(datasets, params)
+            elif use_streaming(request, source_fps):
+                result = analyze_single_event_streaming(datasets, params)
+            elif request.mode == 'single':
+                cache_session = TrialCacheSession(trial_cache) if request.trialCache else None
+                result = analyze_single_event(datasets, params, trial_cache=cache_session)
+            else:
+                if request.streaming:
+                    logger.warning("Streaming mode is not supported for multi mode, using in-memory analysis")
+                result = analyze_multi_event(datasets, params)
         
-        job_registry.update_job(job_id, progress=80, message="Analysis completed, formatting results...")
+            # 条件间置换检验（基于各条件的试次矩阵）
+            statistics = []
+            if request.statistics:
+                job_registry.update_job(job_id, progress=70, message="Running permutation tests...")
+                statistics = compare_conditions(
+                    result.trials,
+                    [(pair.conditionA, pair.conditionB) for pair in request.statistics.comparisons],
+                    n_permutations=request.statistics.permutations,
+                    cluster_alpha=request.statistics.clusterAlpha,
+                    alpha=request.statistics.alpha,
+                    seed=request.statistics.seed,
+                    parallel=request.parallel,
+                    max_workers=request.maxWorkers
+                )
+        
+        job_registry.update_job(
+            job_id,
+            progress=80,
+            message="Analysis completed, formatting results...",
+            metadata={'trialCache': result.metadata['trialCache']} if 'trialCache' in result.metadata else None
+        )
         
         # 5. 格式化结果
         # 提取使用的标签ID（从数据选择中获取）
@@ -304,12 +503,21 @@ def execute_analysis(
         
         matrices = [MatrixResult(**m) for m in result.matrices]
         curves = [CurveResult(**c) for c in result.curves]
+        sweep = [SweepSummary(**item) for item in result.sweep]
+        cohort = [CohortCurve(**item) for item in result.cohort]
+        metrics = [MetricsTable(**item) for item in result.metrics]
+        comparisons = [ComparisonResult(**item) for item in statistics]
         
         response = ResultResponse(
             jobId=job_id,
             meta=meta,
             matrices=matrices,
             curves=curves,
+            sweep=sweep,
+            cohort=cohort,
+            metrics=metrics,
+            statistics=comparisons,
+            traces=[TraceInfo(**item) for item in traces],
             assets={}
         )
         
@@ -339,14 +547,32 @@ def execute_analysis(
 
 def save_result(project_id: int, job_id: str, result: ResultResponse):
     """
-    保存结果到 JSON 文件
+    保存结果到二进制存储（result.npz + manifest.json；写出失败时退回 result.json），
+    并生成多分辨率金字塔（lod/x{因子}.json + lod/index.json）；
+    非有限值（NaN、±inf）保存为 null
     """
-    result_dir = Path(f"uploads/projects/{project_id}/fluorescence/jobs/{job_id}")
+    result_dir = get_result_dir(project_id, job_id)
     result_dir.mkdir(parents=True, exist_ok=True)
     
-    result_file = result_dir / "result.json"
-    with open(result_file, "w", encoding="utf-8") as f:
-        json.dump(result.model_dump(), f, indent=2, ensure_ascii=False)
+    data = json_safe(result.model_dump())
+    try:
+        write_result_artifact(result_dir, data)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to write result artifact for job {job_id}, falling back to result.json: {e}")
+        (result_dir / "result.json").write_bytes(dumps_result(data))
+    
+    # 各级别文件为紧凑 JSON，查询时原样返回
+    lod_dir = result_dir / "lod"
+    lod_dir.mkdir(exist_ok=True)
+    full_width = result_width(data)
+    factors = lod_factors(full_width)
+    for factor in factors:
+        level = downsample_result(data, factor, result_dtype(data))
+        (lod_dir / f"x{factor}.json").write_bytes(dumps_result(level))
+    
+    # 索引最后写，存在时各级别文件已完整
+    with open(lod_dir / "index.json", "w", encoding="utf-8") as f:
+        json.dump({'fullWidth': full_width, 'factors': factors}, f)
 
 
 def list_project_jobs(project_id: int, skip: int = 0, limit: int = 50) -> List[JobStatusResponse]:
@@ -384,6 +610,7 @@ def list_project_jobs(project_id: int, skip: int = 0, limit: int = 50) -> List[J
             progress=job["progress"],
             message=job["message"],
             error=job.get("error"),
+            metadata=job.get("metadata", {}),
             createdAt=job["createdAt"],
             updatedAt=job["updatedAt"]
         )
@@ -406,24 +633,215 @@ def get_job_status(job_id: str) -> Optional[JobStatusResponse]:
         progress=job["progress"],
         message=job["message"],
         error=job.get("error"),
+        metadata=job.get("metadata", {}),
         createdAt=job["createdAt"],
         updatedAt=job["updatedAt"]
     )
 
 
-def get_job_result(project_id: int, job_id: str) -> Optional[ResultResponse]:
+def get_job_result(project_id: int, job_id: str, width: int = 0) -> Optional[bytes]:
     """
-    获取任务结果
+    获取任务结果（已序列化的 ResultResponse JSON，不经模型校验）
+    
+    Args:
+        project_id: 项目 ID
+        job_id: 任务 ID
+        width: 时间轴宽度上限；0 返回全分辨率
+    
+    Returns:
+        结果 JSON 字节；有预生成的金字塔时原样返回对应级别文件，
+        全分辨率由 npz 数组直接序列化，早期任务从全分辨率结果即时降采样
     """
-    result_file = Path(f"uploads/projects/{project_id}/fluorescence/jobs/{job_id}/result.json")
+    result_dir = get_result_dir(project_id, job_id)
+    if not (result_dir / "result.json").exists() and not has_result_artifact(result_dir):
+        return None
     
-    if not result_file.exists():
+    if width > 0:
+        index_file = result_dir / "lod" / "index.json"
+        if index_file.exists():
+            with open(index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            factor = choose_lod_factor(index['fullWidth'], width)
+            level_file = result_dir / "lod" / f"x{factor}.json"
+            if factor > 1 and level_file.exists():
+                return level_file.read_bytes()
+    
+    data = load_result_data(result_dir, as_arrays=True)
+    
+    if width > 0 and not (result_dir / "lod" / "index.json").exists():
+        # 早期任务没有金字塔，即时降采样
+        factor = choose_lod_factor(result_width(data), width)
+        if factor > 1:
+            data = downsample_result(data, factor, result_dtype(data))
+    
+    return dumps_result(data)
+
+
+def get_result_dir(project_id: int, job_id: str) -> Path:
+    """
+    任务结果目录
+    """
+    return Path(f"uploads/projects/{project_id}/fluorescence/jobs/{job_id}")
+
+
+def load_result_data(result_dir: Path, as_arrays: bool = False) -> Dict[str, Any]:
+    """
+    读取全分辨率结果字典（优先二进制存储，不存在时读取 result.json）
+    
+    Args:
+        as_arrays: 二进制存储的数值字段保留为 ndarray
+    """
+    data = read_result_artifact(result_dir, as_arrays=as_arrays)
+    if data is not None:
+        return data
+    
+    with open(result_dir / "result.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_result_summary(result_dir: Path) -> Optional[Dict[str, Any]]:
+    """
+    读取结果中除矩阵与曲线外的字段（优先 manifest.json，不存在时读取 result.json）
+    """
+    manifest = read_result_manifest(result_dir)
+    if manifest is not None:
+        return manifest
+    if not (result_dir / "result.json").exists():
+        return None
+    with open(result_dir / "result.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def trace_file_path(project_id: int, job_id: str, data_item_id: int) -> Path:
+    """
+    连续曲线二进制文件路径（shape (n_samples, n_channels)，行优先）
+    """
+    return get_result_dir(project_id, job_id) / "traces" / f"{data_item_id}.bin"
+
+
+def write_continuous_traces(
+    project_id: int,
+    job_id: str,
+    datasets: List[Dataset],
+    params: AnalysisParams
+) -> List[Dict[str, Any]]:
+    """
+    计算各数据集的连续 ΔF/F 曲线并按块写入任务目录
+    （曲线不做事件窗口对齐，按原始采样率输出（execute_analysis 已保证各数据集相同），采样率记录在曲线信息中）
+
+    Returns:
+        曲线信息列表（TraceInfo 字段）
+
+    Raises:
+        ValueError: 没有任何数据集生成曲线
+    """
+    baseline = params.rolling_baseline
+    traces = []
+    for dataset in datasets:
+        metadata = dataset.metadata or {}
+        trace_file = trace_file_path(project_id, job_id, dataset.data_item_id)
+        trace_file.parent.mkdir(parents=True, exist_ok=True)
+        fps = metadata.get('sourceFps', params.fps)
+        try:
+            names, chunks = iter_continuous_trace(
+                dataset.fluorescence_file,
+                fps,
+                masks=metadata.get('masks'),
+                baseline=baseline,
+                dtype=params.precision
+            )
+            n_samples = 0
+            with open(trace_file, "wb") as f:
+                for chunk in chunks:
+                    chunk.tofile(f)
+                    n_samples += len(chunk)
+        except Exception as e:
+            logger.error(f"Failed to compute continuous trace for {dataset.fluorescence_file}: {e}")
+            trace_file.unlink(missing_ok=True)
+            continue
+        
+        traces.append({
+            'dataItemId': dataset.data_item_id,
+            'channels': names,
+            'nSamples': n_samples,
+            'fps': fps,
+            'dtype': np.dtype(params.precision).newbyteorder('<').str,
+            'normalization': 'rolling' if baseline else 'global',
+            'windowSeconds': baseline.window if baseline else None,
+            'method': baseline.method if baseline else None,
+            'percentile': baseline.percentile if baseline and baseline.method == 'percentile' else None,
+        })
+    
+    if not traces:
+        raise ValueError("No continuous traces could be computed")
+    return traces
+
+
+def iter_trace_export(
+    project_id: int,
+    job_id: str,
+    data_item_id: int,
+    fmt: str = "binary",
+    start: float = 0.0,
+    end: Optional[float] = None
+) -> Optional[Tuple[TraceInfo, int, int, Iterator[bytes]]]:
+    """
+    分块导出连续曲线（内存映射读取，每次输出 TRACE_EXPORT_CHUNK_ROWS 个样本）
+
+    Args:
+        fmt: 'binary' 原始小端数组（按样本行优先），'csv' 带时间列的文本
+        start: 起始时间（秒）
+        end: 结束时间（秒，None 为记录末尾）
+
+    Returns:
+        (曲线信息, 起始样本, 结束样本, 字节块迭代器)；曲线不存在时返回 None
+    """
+    summary = load_result_summary(get_result_dir(project_id, job_id))
+    if summary is None:
+        return None
+    
+    traces = summary.get("traces") or []
+    info = next((TraceInfo(**item) for item in traces if item["dataItemId"] == data_item_id), None)
+    trace_file = trace_file_path(project_id, job_id, data_item_id)
+    if info is None or not trace_file.exists():
         return None
     
-    with open(result_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    first = min(max(int(start * info.fps), 0), info.nSamples)
+    last = info.nSamples if end is None else min(max(int(end * info.fps), first), info.nSamples)
+    
+    def chunks() -> Iterator[bytes]:
+        if info.nSamples == 0:
+            return
+        data = np.memmap(trace_file, dtype=np.dtype(info.dtype), mode="r", shape=(info.nSamples, len(info.channels)))
+        if fmt == "csv":
+            yield (",".join(["time"] + info.channels) + "\n").encode("utf-8")
+        for lo in range(first, last, TRACE_EXPORT_CHUNK_ROWS):
+            hi = min(lo + TRACE_EXPORT_CHUNK_ROWS, last)
+            if fmt == "csv":
+                buffer = io.StringIO()
+                rows = np.column_stack((np.arange(lo, hi) / info.fps, data[lo:hi]))
+                np.savetxt(buffer, rows, delimiter=",", fmt="%.6g")
+                yield buffer.getvalue().encode("utf-8")
+            else:
+                yield np.ascontiguousarray(data[lo:hi]).tobytes()
+    
+    return info, first, last, chunks()
+
+
+def get_result_artifact_file(project_id: int, job_id: str, part: str = "data") -> Optional[Path]:
+    """
+    获取结果二进制存储文件路径
+    
+    Args:
+        part: 'data' 返回 result.npz，'manifest' 返回 manifest.json
     
-    return ResultResponse(**data)
+    Returns:
+        文件路径；任务没有二进制存储时返回 None
+    """
+    result_dir = get_result_dir(project_id, job_id)
+    if not has_result_artifact(result_dir):
+        return None
+    return result_dir / (MANIFEST_FILE if part == "manifest" else ARTIFACT_FILE)
 
 
 def save_label_map(project_id: int, mapping: Dict[str, str]):
@@ -75,10 +75,14 @@ class JobRegistry:
         status: Optional[JobStatus] = None,
         progress: Optional[int] = None,
         message: Optional[str] = None,
-        error: Optional[str] = None
+        error: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
     ) -> Optional[Dict[str, Any]]:
         """
         更新任务状态
+        
+        Args:
+            metadata: 合并到任务 metadata 的附加信息（如缓存统计）
         """
         job = self._jobs.get(job_id)
         if not job:
@@ -92,6 +96,8 @@ class JobRegistry:
             job["message"] = message
         if error is not None:
             job["error"] = error
+        if metadata:
+            job.setdefault("metadata", {}).update(metadata)
         
         job["updatedAt"] = datetime.utcnow().isoformat()
         
@@ -0,0 +1,370 @@
+"""
+荧光通道二进制列存储
+上传荧光 CSV 时生成旁路目录 `<file>.channels/`：
+- header.json：列名、样本数、数据类型以及源文件的大小与修改时间
+- 每个 CHx-410 / CHx-470 列一个原始 float64 二进制文件
+分析时通过 np.memmap 打开，避免每个任务重新解析整份 CSV
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.utils.csv_reader import sniff_csv_header, read_csv_columns, iter_csv_columns
+from app.utils.logger import service_logger as logger
+
+
+# 通道列名模式（CHx-410 / CHx-470）
+CHANNEL_COLUMN_PATTERN = re.compile(r'^CH(\d+)-(410|470)$', re.IGNORECASE)
+
+STORE_SUFFIX = ".channels"
+HEADER_FILE = "header.json"
+STORE_VERSION = 1
+STORE_DTYPE = "float64"
+
+
+def get_store_dir(csv_path: str) -> Path:
+    """
+    获取 CSV 文件对应的旁路存储目录
+    """
+    path = Path(csv_path)
+    return path.with_name(path.name + STORE_SUFFIX)
+
+
+def _source_signature(csv_path: Path) -> Dict[str, int]:
+    """
+    源文件签名（大小 + 修改时间），用于判断旁路存储是否过期
+    """
+    stat = csv_path.stat()
+    return {"size": stat.st_size, "mtimeNs": stat.st_mtime_ns}
+
+
+def is_channel_header(row: List[str]) -> bool:
+    """
+    判断 CSV 某一行是否为包含通道列的表头
+    """
+    return any(CHANNEL_COLUMN_PATTERN.match(col.strip()) for col in row)
+
+
+def read_channel_columns(csv_path: str, dtype: str = STORE_DTYPE) -> Dict[str, np.ndarray]:
+    """
+    从荧光 CSV 中只解析 CHx-410 / CHx-470 列
+
+    Args:
+        csv_path: 荧光 CSV 文件路径
+        dtype: 读取的数值类型（float64 或 float32）
+
+    Returns:
+        {列名: 数组}；文件中没有通道列时返回空字典
+    """
+    try:
+        header_row, header, encoding = sniff_csv_header(csv_path, is_header=is_channel_header)
+    except ValueError:
+        return {}
+
+    channel_cols = [col for col in header if CHANNEL_COLUMN_PATTERN.match(col.strip())]
+    df = read_csv_columns(
+        csv_path,
+        columns=channel_cols,
+        dtypes={col: dtype for col in channel_cols},
+        header_row=header_row,
+        encoding=encoding,
+    )
+    return {col: df[col].to_numpy(dtype=dtype) for col in channel_cols}
+
+
+def _column_file(column: str) -> str:
+    """
+    列名对应的二进制文件名
+    """
+    return f"{column.strip().upper()}.bin"
+
+
+def _write_header(
+    store_dir: Path,
+    columns: List[str],
+    n_samples: int,
+    source_path: Path,
+    extra: Optional[Dict] = None
+) -> None:
+    """
+    写出 header（数据文件须已完整写入）
+    """
+    store_header = {
+        "version": STORE_VERSION,
+        "dtype": STORE_DTYPE,
+        "nSamples": n_samples,
+        "columns": {col.strip(): _column_file(col) for col in columns},
+        "source": _source_signature(source_path),
+        **(extra or {}),
+    }
+    with open(store_dir / HEADER_FILE, "w", encoding="utf-8") as f:
+        json.dump(store_header, f, indent=2, ensure_ascii=False)
+
+
+def _write_store(
+    store_dir: Path,
+    column_data: Dict[str, np.ndarray],
+    source_path: Path,
+    extra: Optional[Dict] = None
+) -> Path:
+    """
+    将各列写为原始二进制文件，最后写 header（header 存在时数据文件已完整）
+    """
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    n_samples = 0
+    for col, data in column_data.items():
+        np.ascontiguousarray(data, dtype=STORE_DTYPE).tofile(store_dir / _column_file(col))
+        n_samples = len(data)
+
+    _write_header(store_dir, list(column_data), n_samples, source_path, extra)
+    return store_dir
+
+
+def _read_header(
+    store_dir: Path,
+    csv_path: str,
+    extra: Optional[Dict] = None
+) -> Optional[Dict]:
+    """
+    读取存储 header；不存在、版本或附加信息不符、源文件已变化时返回 None
+    """
+    header_file = store_dir / HEADER_FILE
+    if not header_file.exists():
+        return None
+
+    try:
+        with open(header_file, "r", encoding="utf-8") as f:
+            store_header = json.load(f)
+
+        if store_header.get("version") != STORE_VERSION:
+            return None
+        if any(store_header.get(key) != value for key, value in (extra or {}).items()):
+            return None
+        if store_header.get("source") != _source_signature(Path(csv_path)):
+            logger.info(f"Store {store_dir} is stale, falling back to source")
+            return None
+        return store_header
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to read store header {header_file}: {e}")
+        return None
+
+
+def _open_store(
+    store_dir: Path,
+    csv_path: str,
+    extra: Optional[Dict] = None
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    以内存映射方式打开存储目录；不存在、版本或附加信息不符、源文件已变化时返回 None
+    """
+    store_header = _read_header(store_dir, csv_path, extra)
+    if store_header is None:
+        return None
+
+    try:
+        n_samples = store_header["nSamples"]
+        dtype = np.dtype(store_header["dtype"])
+        arrays = {}
+        for col, file_name in store_header["columns"].items():
+            if n_samples == 0:
+                arrays[col] = np.empty(0, dtype=dtype)
+                continue
+            arrays[col] = np.memmap(store_dir / file_name, dtype=dtype, mode="r", shape=(n_samples,))
+        return arrays
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Failed to open store {store_dir}: {e}")
+        return None
+
+
+def build_channel_store(csv_path: str) -> Optional[Path]:
+    """
+    解析荧光 CSV 并写出二进制列存储
+
+    Args:
+        csv_path: 荧光 CSV 文件路径
+
+    Returns:
+        存储目录；文件中没有通道列时返回 None
+    """
+    path = Path(csv_path)
+    if path.suffix.lower() != ".csv":
+        return None
+
+    column_data = read_channel_columns(csv_path)
+    if not column_data:
+        return None
+
+    store_dir = _write_store(get_store_dir(csv_path), column_data, path)
+
+    n_samples = len(next(iter(column_data.values())))
+    logger.info(f"Built channel store for {csv_path} ({len(column_data)} columns, {n_samples} samples)")
+    return store_dir
+
+
+def open_channel_store(csv_path: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    以内存映射方式打开二进制列存储
+
+    Args:
+        csv_path: 荧光 CSV 文件路径
+
+    Returns:
+        {列名: 只读 memmap}；存储不存在、版本不符或已过期时返回 None
+    """
+    return _open_store(get_store_dir(csv_path), csv_path)
+
+
+def read_channel_store_header(csv_path: str) -> Optional[Dict]:
+    """
+    读取二进制列存储的 header（列、样本数与源文件签名），不读取数据
+
+    Returns:
+        header 字典；存储不存在、版本不符或已过期时返回 None
+    """
+    return _read_header(get_store_dir(csv_path), csv_path)
+
+
+def get_derived_store_dir(csv_path: str, name: str) -> Path:
+    """
+    预处理（光漂白校正、滤波等）结果的存储目录（位于旁路存储目录下）
+    """
+    return get_store_dir(csv_path) / name
+
+
+def write_derived_store(
+    csv_path: str,
+    name: str,
+    column_data: Dict[str, np.ndarray],
+    spec: Dict
+) -> Optional[Path]:
+    """
+    写出预处理后的通道，供后续任务复用
+
+    Args:
+        csv_path: 荧光 CSV 文件路径
+        name: 存储名（如 'bleach-biexp'）
+        column_data: {列名: 预处理后数组}
+        spec: 影响结果的预处理参数（打开时须一致）
+
+    Returns:
+        存储目录；写入失败时返回 None
+    """
+    try:
+        return _write_store(get_derived_store_dir(csv_path, name), column_data, Path(csv_path), {"spec": spec})
+    except OSError as e:
+        logger.warning(f"Failed to write derived channel store '{name}' for {csv_path}: {e}")
+        return None
+
+
+def allocate_derived_store(
+    csv_path: str,
+    name: str,
+    columns: List[str],
+    n_samples: int
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    为预处理结果分配可写 memmap，供按块写入（写完后调用 finish_derived_store 写出 header）
+
+    Args:
+        csv_path: 荧光 CSV 文件路径
+        name: 存储名（如 'filter-<hash>'）
+        columns: 列名
+        n_samples: 每列样本数
+
+    Returns:
+        {列名: 可写 memmap}；创建失败时返回 None
+    """
+    store_dir = get_derived_store_dir(csv_path, name)
+    try:
+        store_dir.mkdir(parents=True, exist_ok=True)
+        # 旧 header 先删除，写入过程中存储视为不存在
+        (store_dir / HEADER_FILE).unlink(missing_ok=True)
+        arrays = {}
+        for col in columns:
+            if n_samples == 0:
+                (store_dir / _column_file(col)).write_bytes(b"")
+                arrays[col] = np.empty(0, dtype=STORE_DTYPE)
+                continue
+            arrays[col] = np.memmap(store_dir / _column_file(col), dtype=STORE_DTYPE, mode="w+", shape=(n_samples,))
+        return arrays
+    except OSError as e:
+        logger.warning(f"Failed to allocate derived channel store '{name}' for {csv_path}: {e}")
+        return None
+
+
+def finish_derived_store(
+    csv_path: str,
+    name: str,
+    column_data: Dict[str, np.ndarray],
+    spec: Dict
+) -> Optional[Path]:
+    """
+    刷新 allocate_derived_store 分配的 memmap 并写出 header
+
+    Returns:
+        存储目录；写入失败时返回 None
+    """
+    store_dir = get_derived_store_dir(csv_path, name)
+    try:
+        for data in column_data.values():
+            if isinstance(data, np.memmap):
+                data.flush()
+        n_samples = len(next(iter(column_data.values()))) if column_data else 0
+        _write_header(store_dir, list(column_data), n_samples, Path(csv_path), {"spec": spec})
+        return store_dir
+    except OSError as e:
+        logger.warning(f"Failed to finish derived channel store '{name}' for {csv_path}: {e}")
+        return None
+
+
+def open_derived_store(csv_path: str, name: str, spec: Dict) -> Optional[Dict[str, np.ndarray]]:
+    """
+    打开预处理后的通道存储
+
+    Returns:
+        {列名: 只读 memmap}；不存在、预处理参数不符或已过期时返回 None
+    """
+    return _open_store(get_derived_store_dir(csv_path, name), csv_path, {"spec": spec})
+
+
+def iter_channel_chunks(
+    csv_path: str,
+    chunk_rows: int,
+    dtype: str = STORE_DTYPE
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    按块迭代通道列数据
+
+    有二进制列存储时返回 memmap 切片（未被访问的页不会读入），
+    否则按块解析 CSV 的通道列。
+
+    Args:
+        csv_path: 荧光 CSV 文件路径
+        chunk_rows: 每块样本数
+        dtype: CSV 回退路径的读取类型
+
+    Yields:
+        {列名: 该块的数组}
+    """
+    store = open_channel_store(csv_path)
+    if store is not None:
+        n_samples = len(next(iter(store.values()))) if store else 0
+        for start in range(0, n_samples, chunk_rows):
+            yield {col: data[start:start + chunk_rows] for col, data in store.items()}
+        return
+
+    header_row, header, encoding = sniff_csv_header(csv_path, is_header=is_channel_header)
+    channel_cols = [col for col in header if CHANNEL_COLUMN_PATTERN.match(col.strip())]
+    for chunk in iter_csv_columns(
+        csv_path,
+        columns=channel_cols,
+        dtypes={col: dtype for col in channel_cols},
+        chunk_rows=chunk_rows,
+        header_row=header_row,
+        encoding=encoding,
+    ):
+        yield {col: chunk[col].to_numpy(dtype=dtype) for col in channel_cols}
@@ -3,10 +3,23 @@ CSV 读取与预览工具
 - 限制行数防止内存溢出
 - 自动探测编码
 - 返回列名与数据行
+- 按列裁剪、带类型的数值读取（荧光/打标文件分析用）
 """
 import csv
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    FAST_CSV_ENGINE = "pyarrow"
+except ImportError:
+    FAST_CSV_ENGINE = "c"
+
+# 表头探测时尝试的编码与最大扫描行数
+SNIFF_ENCODINGS = ["utf-8-sig", "gbk", "latin-1"]
+SNIFF_MAX_LINES = 20
 
 
 def preview_csv(
@@ -132,3 +145,113 @@ def detect_columns(
     """
     result = preview_csv(file_path, max_rows=0, encoding=encoding)
     return result["columns"]
+
+
+def sniff_csv_header(
+    file_path: str,
+    is_header: Optional[Callable[[List[str]], bool]] = None,
+    max_lines: int = SNIFF_MAX_LINES
+) -> Tuple[int, List[str], str]:
+    """
+    探测 CSV 表头所在行与列名，不读取数据部分
+
+    部分采集软件会在表头前写入一行设备配置，因此允许通过 is_header
+    判断哪一行才是真正的表头；未提供时取第一行。
+
+    Args:
+        file_path: CSV 文件路径
+        is_header: 判断某一行是否为表头的函数
+        max_lines: 最多扫描的行数
+
+    Returns:
+        (表头行号, 列名列表, 编码)
+
+    Raises:
+        ValueError: 文件为空或未找到表头
+    """
+    last_error = None
+    for enc in SNIFF_ENCODINGS:
+        try:
+            with open(file_path, "r", encoding=enc, newline="") as f:
+                reader = csv.reader(f)
+                for row_idx, row in enumerate(reader):
+                    if row_idx >= max_lines:
+                        break
+                    if is_header is None or is_header(row):
+                        return row_idx, row, enc
+            raise ValueError(f"No header row found in first {max_lines} lines of {file_path}")
+        except (UnicodeDecodeError, UnicodeError) as e:
+            last_error = e
+            continue
+    
+    raise ValueError(f"Failed to decode file with encodings: {SNIFF_ENCODINGS}. Last error: {last_error}")
+
+
+def read_csv_columns(
+    file_path: str,
+    columns: List[str],
+    dtypes: Dict[str, Any],
+    header_row: int = 0,
+    encoding: str = "utf-8"
+) -> pd.DataFrame:
+    """
+    仅解析指定列，并按给定类型读取
+
+    辅助列（时间戳、LED 状态、TTL 等）不会被解析，
+    数值列可直接按 float32 读取以减少内存。
+
+    Args:
+        file_path: CSV 文件路径
+        columns: 需要读取的列名（须与表头完全一致）
+        dtypes: 列名到 dtype 的映射
+        header_row: 表头所在行号（由 sniff_csv_header 得到）
+        encoding: 文件编码
+
+    Returns:
+        仅包含指定列的 DataFrame
+    """
+    return pd.read_csv(
+        file_path,
+        usecols=columns,
+        dtype={col: dtypes[col] for col in columns if col in dtypes},
+        skiprows=header_row,
+        encoding=encoding,
+        engine=FAST_CSV_ENGINE,
+    )
+
+
+def iter_csv_columns(
+    file_path: str,
+    columns: List[str],
+    dtypes: Dict[str, Any],
+    chunk_rows: int,
+    header_row: int = 0,
+    encoding: str = "utf-8"
+) -> Iterator[pd.DataFrame]:
+    """
+    按块读取指定列（用于超出内存的大文件）
+
+    pyarrow 引擎不支持分块，这里固定使用 C 引擎。
+
+    Args:
+        file_path: CSV 文件路径
+        columns: 需要读取的列名
+        dtypes: 列名到 dtype 的映射
+        chunk_rows: 每块行数
+        header_row: 表头所在行号
+        encoding: 文件编码
+
+    Yields:
+        每块仅包含指定列的 DataFrame
+    """
+    with pd.read_csv(
+        file_path,
+        usecols=columns,
+        dtype={col: dtypes[col] for col in columns if col in dtypes},
+        skiprows=header_row,
+        encoding=encoding,
+        engine="c",
+        chunksize=chunk_rows,
+    ) as reader:
+        for chunk in reader:
+            yield chunk
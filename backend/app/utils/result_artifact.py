@@ -0,0 +1,223 @@
+"""
+分析结果二进制存储
+任务目录下与 result.json 并存：
+- result.npz：每个矩阵/曲线的数值数组（未压缩，np.load 可直接内存映射读取）
+- manifest.json：元信息、key、trialIds、扫描摘要，以及各数组在 npz 中的名称
+存在二进制存储时不再写出 result.json；结果接口直接由 npz 数组序列化 JSON
+"""
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.utils.logger import service_logger as logger
+
+# orjson 可直接序列化 ndarray（可选）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+ARTIFACT_FILE = "result.npz"
+MANIFEST_FILE = "manifest.json"
+ARTIFACT_VERSION = 1
+
+# 曲线上可选的带状数组（与 mean 等长）
+CURVE_BANDS = ("sem", "ciLower", "ciUpper")
+
+# 保存在 manifest 中的数值结果（float32 精度时按 float32 输出）
+SUMMARY_FIELDS = ("sweep", "cohort", "metrics", "statistics")
+
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+def json_safe(value: Any) -> Any:
+    """
+    转换为可严格序列化为 JSON 的结构：数组转为列表，非有限浮点数（NaN、±inf）转为 None
+    """
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, np.ndarray):
+        if value.dtype == np.float32:
+            # 按 float32 的最短十进制表示输出（tolist 会展开为 float64 的完整位数）
+            value = value.astype(str).astype(np.float64)
+        return json_safe(value.tolist())
+    if isinstance(value, (float, np.floating)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def dumps_result(data: Dict[str, Any]) -> bytes:
+    """
+    将结果序列化为紧凑的 JSON 字节（数组可为 ndarray，非有限值输出为 null）
+    有 orjson 时直接序列化 ndarray，否则转换为列表后由标准库序列化；
+    两种方式下 float32 数组均按 float32 精度输出
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(json_safe(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def result_dtype(data: Dict[str, Any]) -> str:
+    """
+    按分析精度存储与序列化（float32 结果无损保存为 float32）
+    """
+    params = (data.get("meta") or {}).get("params") or {}
+    return "float32" if params.get("precision") == "float32" else "float64"
+
+
+def float32_values(value: Any) -> Any:
+    """
+    将浮点数转换为其 float32 值的最短十进制表示（序列化时不输出 float64 的多余位数）
+    """
+    if isinstance(value, dict):
+        return {key: float32_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [float32_values(item) for item in value]
+    if isinstance(value, float) and math.isfinite(value) and abs(value) <= FLOAT32_MAX:
+        return float(str(np.float32(value)))
+    return value
+
+
+def write_result_artifact(result_dir: Path, data: Dict[str, Any]) -> Path:
+    """
+    写出结果的二进制存储
+
+    Args:
+        result_dir: 任务结果目录
+        data: ResultResponse.model_dump() 的结果
+
+    Returns:
+        manifest 文件路径
+    """
+    dtype = result_dtype(data)
+    arrays: Dict[str, np.ndarray] = {}
+
+    matrices = []
+    for idx, matrix in enumerate(data.get("matrices", [])):
+        arrays[f"matrix_{idx}_heatmap"] = np.asarray(matrix["heatmap"], dtype=dtype)
+        arrays[f"matrix_{idx}_xAxis"] = np.asarray(matrix["xAxis"], dtype=np.float64)
+        matrices.append({
+            "key": matrix["key"],
+            "trialIds": matrix["trialIds"],
+            "heatmap": f"matrix_{idx}_heatmap",
+            "xAxis": f"matrix_{idx}_xAxis",
+        })
+
+    curves = []
+    for idx, curve in enumerate(data.get("curves", [])):
+        arrays[f"curve_{idx}_mean"] = np.asarray(curve["mean"], dtype=dtype)
+        arrays[f"curve_{idx}_xAxis"] = np.asarray(curve["xAxis"], dtype=np.float64)
+        entry = {"key": curve["key"], "mean": f"curve_{idx}_mean", "xAxis": f"curve_{idx}_xAxis"}
+        for band in CURVE_BANDS:
+            entry[band] = None
+            if curve.get(band) is not None:
+                entry[band] = f"curve_{idx}_{band}"
+                arrays[entry[band]] = np.asarray(curve[band], dtype=dtype)
+        curves.append(entry)
+
+    np.savez(result_dir / ARTIFACT_FILE, **arrays)
+
+    manifest = {
+        key: float32_values(value) if dtype == "float32" and key in SUMMARY_FIELDS else value
+        for key, value in data.items()
+        if key not in ("matrices", "curves")
+    }
+    manifest.update({
+        "version": ARTIFACT_VERSION,
+        "dtype": dtype,
+        "matrices": matrices,
+        "curves": curves,
+    })
+
+    # manifest 最后写，存在时 npz 已完整
+    manifest_file = result_dir / MANIFEST_FILE
+    with open(manifest_file, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    return manifest_file
+
+
+def has_result_artifact(result_dir: Path) -> bool:
+    return (result_dir / MANIFEST_FILE).exists() and (result_dir / ARTIFACT_FILE).exists()
+
+
+def read_result_manifest(result_dir: Path) -> Optional[Dict[str, Any]]:
+    """
+    读取 manifest（结果中除矩阵与曲线外的全部字段）
+
+    Returns:
+        manifest 字典；不存在或版本不符时返回 None
+    """
+    manifest_file = result_dir / MANIFEST_FILE
+    if not manifest_file.exists():
+        return None
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to read result manifest in {result_dir}: {e}")
+        return None
+    return manifest if manifest.get("version") == ARTIFACT_VERSION else None
+
+
+def read_result_artifact(result_dir: Path, as_arrays: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    从二进制存储重建与 ResultResponse 相同结构的结果字典
+
+    Args:
+        result_dir: 任务结果目录
+        as_arrays: 数值字段保留为 ndarray（供 dumps_result 直接序列化），否则转换为列表
+
+    Returns:
+        结果字典；存储不存在或版本不符时返回 None
+    """
+    if not has_result_artifact(result_dir):
+        return None
+    manifest = read_result_manifest(result_dir)
+    if manifest is None:
+        return None
+
+    def load(arrays, name: str):
+        return arrays[name] if as_arrays else arrays[name].tolist()
+
+    try:
+        with np.load(result_dir / ARTIFACT_FILE) as arrays:
+            matrices = [
+                {
+                    "key": entry["key"],
+                    "heatmap": load(arrays, entry["heatmap"]),
+                    "xAxis": load(arrays, entry["xAxis"]),
+                    "trialIds": entry["trialIds"],
+                }
+                for entry in manifest["matrices"]
+            ]
+            curves = [
+                {
+                    "key": entry["key"],
+                    "mean": load(arrays, entry["mean"]),
+                    **{
+                        band: load(arrays, entry[band]) if entry.get(band) else None
+                        for band in CURVE_BANDS
+                    },
+                    "xAxis": load(arrays, entry["xAxis"]),
+                }
+                for entry in manifest["curves"]
+            ]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Failed to read result artifact in {result_dir}: {e}")
+        return None
+
+    data = {
+        key: value for key, value in manifest.items()
+        if key not in ("version", "dtype", "matrices", "curves")
+    }
+    data["matrices"] = matrices
+    data["curves"] = curves
+    return data
@@ -0,0 +1,9 @@
+"""
+测试公共配置：将 backend 目录加入导入路径
+"""
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
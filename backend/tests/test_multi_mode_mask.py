@@ -0,0 +1,78 @@
+"""
+多事件模式（time warping）在 NaN 掩码下的结果
+"""
+import json
+
+import numpy as np
+import pytest
+
+from app.services.algorithms.fluorescence_algo import (
+    AnalysisParams,
+    Dataset,
+    EventTable,
+    analyze_multi_event,
+    load_fluorescence_block,
+)
+from app.utils.result_artifact import json_safe
+
+
+FPS = 50.0
+DURATION = 120.0
+# 试次 k 为事件 a（20k 秒）到 b（20k + 5 秒），事件 x（20k + 12 秒）分隔相邻试次；
+# 掩码与第 1、3、5 个试次重叠
+MASKS = [(22.0, 24.0), (62.0, 64.0), (102.0, 104.0)]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    n = int(DURATION * FPS)
+    time_ms = np.arange(n) / FPS * 1000.0
+    columns = {'TimeStamp': time_ms, 'Events': [''] * n}
+    for channel in ('CH1', 'CH2'):
+        columns[f'{channel}-410'] = 10.0 + rng.normal(0, 0.1, n)
+        columns[f'{channel}-470'] = 5.0 + np.sin(time_ms / 3000.0) + rng.normal(0, 0.1, n)
+
+    path = tmp_path / 'recording.csv'
+    header = list(columns)
+    with open(path, 'w') as f:
+        f.write(','.join(header) + ',\n')
+        for i in range(n):
+            f.write(','.join(str(columns[key][i]) for key in header) + ',\n')
+
+    block = load_fluorescence_block(str(path), FPS, masks=MASKS, mask_mode='nan')
+    starts = [20.0 * k + offset for k in range(6) for offset in (0.0, 5.0, 12.0)]
+    events = EventTable(
+        categories=['a', 'b', 'x'],
+        codes=np.tile([0, 1, 2], 6),
+        start_times=np.array(starts),
+        stop_times=np.array(starts),
+        is_point=np.ones(len(starts), dtype=bool),
+    )
+    return Dataset(1, str(path), [], block.channels(), events, FPS, block=block)
+
+
+def test_masked_trials_are_dropped(dataset):
+    params = AnalysisParams(
+        mode='multi',
+        fps=FPS,
+        algorithm_type='warping',
+        groups=[{'groupName': 'g', 'events': ['a', 'b']}],
+    )
+    result = analyze_multi_event([dataset], params)
+
+    assert result.matrices and result.curves
+    for matrix in result.matrices:
+        heatmap = np.asarray(matrix['heatmap'], dtype=np.float64)
+        assert heatmap.shape[0] == 3
+        assert np.isfinite(heatmap).all()
+        assert len(matrix['trialIds']) == 3
+    for curve in result.curves:
+        assert np.isfinite(np.asarray(curve['mean'], dtype=np.float64)).all()
+
+    json.dumps(json_safe({'matrices': result.matrices, 'curves': result.curves}), allow_nan=False)
+
+
+def test_json_safe_replaces_nonfinite():
+    data = {'mean': np.array([1.0, np.nan, np.inf]), 'sem': [np.float32(-np.inf), 2]}
+    assert json_safe(data) == {'mean': [1.0, None, None], 'sem': [None, 2]}